@@ -1,13 +1,23 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
 import random
 import os
-import openai  # Adicionado import
 import json # Adicionado para parsear resposta da API
 import re # Adicionado para extrair JSON
+import uuid
+import cliente_openai
+import busca
+import dados
+from dados import carregar_dados, obter_historico, obter_indice_busca, obter_indice_citacoes, obter_resumos, preparar_dados
+import exportacao
+import ingestao
+import metricas
+from perguntas import criar_contexto, encontrar_registros_relevantes, parametros_pergunta, resumo_noticia
+import resumos
+import revisao
+import roteamento
+import telemetria
 
 # Configuração da página
 st.set_page_config(
@@ -17,55 +27,30 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Função para configurar a API da OpenAI
+# Função para configurar a API da OpenAI (retorna o cliente compartilhado ou None)
 def configurar_openai():
     try:
         # Tenta obter a chave dos segredos
-        api_key = st.secrets.get("openai", {}).get("api_key")
+        config_openai = st.secrets.get("openai", {})
+        api_key = config_openai.get("api_key")
         if api_key:
-            openai.api_key = api_key
-            return True
+            # base_url opcional permite apontar para um servidor local (mock)
+            return cliente_openai.obter_cliente(api_key, config_openai.get("base_url"))
         else:
             # Chave não encontrada ou seção [openai] ausente
-            return False
+            return None
     except Exception as e:
         st.error(f"Erro ao configurar a API da OpenAI: {e}")
-        return False
+        return None
 
-# Função para carregar os dados (corrigida para Streamlit Cloud)
-@st.cache_data
-def carregar_dados():
-    # Caminho relativo para o arquivo de dados
-    arquivo_final = 'data/informativos_stf_2021_2025.xlsx'
-    
-    try:
-        # Verificar se o arquivo existe
-        if not os.path.exists(arquivo_final):
-            st.error(f"Arquivo de dados não encontrado em: {arquivo_final}")
-            return None
-            
-        # Carregar o arquivo Excel
-        df = pd.read_excel(arquivo_final)
-        
-        # Converter a coluna de data para datetime
-        df["Data Julgamento"] = pd.to_datetime(df["Data Julgamento"], format="%d/%m/%Y", errors="coerce")
-        
-        # Garantir que as novas colunas existam, preenchendo com NaN se não existirem
-        if 'Legislação' not in df.columns:
-            df['Legislação'] = pd.NA
-        if 'Notícia completa' not in df.columns:
-            df['Notícia completa'] = pd.NA
-            
-        # Garantir que a coluna Matéria exista e preencher NaNs
-        if 'Matéria' not in df.columns:
-            df['Matéria'] = 'Não especificada'
-        else:
-            df['Matéria'] = df['Matéria'].fillna('Não especificada')
-            
+# Arquivo de dados em uso (ver dados.arquivo_dados)
+ARQUIVO_DADOS = dados.arquivo_dados()
+
+# Função para manter um registro por grupo de decisões quase duplicadas
+def colapsar_duplicatas(df):
+    if "ID Canônico" not in df.columns:
         return df
-    except Exception as e:
-        st.error(f"Erro ao carregar os dados: {str(e)}")
-        return None
+    return df.drop_duplicates("ID Canônico")
 
 # Estilo CSS personalizado
 def aplicar_estilo():
@@ -172,6 +157,7 @@ def aplicar_estilo():
     """, unsafe_allow_html=True)
 
 # Função para gerar assertivas (SIMULAÇÃO - será substituída pela API)
+@metricas.medido()
 def gerar_assertivas_simuladas(df, materias_selecionadas=None, num_assertivas=5):
     assertivas = []
     
@@ -181,8 +167,8 @@ def gerar_assertivas_simuladas(df, materias_selecionadas=None, num_assertivas=5)
     else:
         df_filtrado_materia = df
         
-    # Filtrar apenas registros com resumo não nulo
-    df_com_resumo = df_filtrado_materia[df_filtrado_materia["Resumo"].notna()]
+    # Filtrar apenas registros com resumo não nulo (um por grupo de duplicatas)
+    df_com_resumo = colapsar_duplicatas(df_filtrado_materia[df_filtrado_materia["Resumo"].notna()])
     
     if len(df_com_resumo) < 1:
         return [{"texto": "Não há dados suficientes para gerar assertivas com os filtros selecionados.", "resposta": None, "explicacao": ""}]
@@ -269,7 +255,9 @@ def gerar_assertivas_simuladas(df, materias_selecionadas=None, num_assertivas=5)
         assertivas.append({
             "texto": texto_assertiva,
             "resposta": e_verdadeira,
-            "explicacao": f"Informativo {informativo}: {resumo_parcial}"
+            "explicacao": f"Informativo {informativo}: {resumo_parcial}",
+            "informativo": informativo,
+            "materia": registro["Matéria"] if pd.notna(registro["Matéria"]) else None,
         })
         count += 1
         
@@ -296,13 +284,18 @@ def extrair_json(texto):
         return None
 
 # Função para gerar assertivas usando a API do ChatGPT (Refinada)
+@metricas.medido()
 def gerar_assertivas_api(df, materias_selecionadas=None, num_assertivas=5):
     # Configurar a API
-    api_configurada = configurar_openai()
-    if not api_configurada:
+    cliente = configurar_openai()
+    if not cliente:
+        telemetria.registrar_fallback("assertivas", telemetria.SEM_CHAVE)
         st.warning("A chave da API da OpenAI não está configurada. Usando a simulação de assertivas.")
         return gerar_assertivas_simuladas(df, materias_selecionadas, num_assertivas)
 
+    # Modelo, max_tokens e tamanho do contexto escolhidos a partir da telemetria das chamadas anteriores
+    rota = roteamento.rota("assertivas")
+
     # Filtrar por matéria se selecionado
     if materias_selecionadas and 'Todas' not in materias_selecionadas:
         df_filtrado_materia = df[df['Matéria'].isin(materias_selecionadas)]
@@ -310,11 +303,12 @@ def gerar_assertivas_api(df, materias_selecionadas=None, num_assertivas=5):
         df_filtrado_materia = df
         
     # Selecionar alguns informativos relevantes aleatoriamente
-    df_com_resumo = df_filtrado_materia[df_filtrado_materia["Resumo"].notna() | df_filtrado_materia["Tese Julgado"].notna()]
+    df_com_resumo = colapsar_duplicatas(
+        df_filtrado_materia[df_filtrado_materia["Resumo"].notna() | df_filtrado_materia["Tese Julgado"].notna()])
     if len(df_com_resumo) < 1:
         return [{"texto": "Não há dados suficientes para gerar assertivas com os filtros selecionados.", "resposta": None, "explicacao": ""}]
         
-    num_exemplos = min(len(df_com_resumo), 5) # Usar até 5 informativos como base
+    num_exemplos = min(len(df_com_resumo), rota.max_registros) # Usar até 5 informativos como base (menos se a latência passar do SLO)
     indices = random.sample(range(len(df_com_resumo)), num_exemplos)
     registros_selecionados = df_com_resumo.iloc[indices]
     
@@ -337,35 +331,42 @@ def gerar_assertivas_api(df, materias_selecionadas=None, num_assertivas=5):
     1. O texto da assertiva.
     2. A resposta correta (True para VERDADEIRO, False para FALSO).
     3. Uma breve explicação baseada no informativo correspondente.
+    4. O número do informativo em que a assertiva se baseia.
     
-    Formate a resposta EXATAMENTE como um JSON contendo uma lista de objetos, onde cada objeto tem as chaves "texto", "resposta" e "explicacao".
+    Formate a resposta EXATAMENTE como um JSON contendo uma lista de objetos, onde cada objeto tem as chaves "texto", "resposta", "explicacao" e "informativo".
     Exemplo de formato JSON:
     [
-      {{"texto": "Assertiva 1...", "resposta": True, "explicacao": "Conforme Informativo X..."}},
-      {{"texto": "Assertiva 2...", "resposta": False, "explicacao": "Segundo o Informativo Y..."}}
+      {{"texto": "Assertiva 1...", "resposta": True, "explicacao": "Conforme Informativo X...", "informativo": 1001}},
+      {{"texto": "Assertiva 2...", "resposta": False, "explicacao": "Segundo o Informativo Y...", "informativo": 1002}}
     ]
     
     IMPORTANTE: Sua resposta deve conter APENAS o código JSON válido, começando com '[' e terminando com ']', sem nenhum texto introdutório, comentários ou explicações adicionais fora do JSON.
     """
 
+    chamada = telemetria.Chamada("assertivas", rota.modelo, rota.nivel_contexto)
     try:
         # Chamar a API da OpenAI
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo", # Ou gpt-4 se disponível e preferível
-            messages=[
-                {"role": "system", "content": "Você é um especialista em criar questões de concurso sobre jurisprudência do STF. Responda APENAS com o JSON solicitado."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1500, # Aumentar tokens para comportar JSON e contexto
-            temperature=0.6, # Um pouco menos de criatividade para focar no formato
-            # response_format={ "type": "json_object" } # Remover se causar problemas ou não for suportado consistentemente
-        )
+        with metricas.medir("openai_assertivas"):
+            response = cliente_openai.criar_chat_completion(
+                cliente,
+                detalhes=chamada.detalhes,
+                model=rota.modelo, # Ver roteamento.POLITICAS
+                messages=[
+                    {"role": "system", "content": "Você é um especialista em criar questões de concurso sobre jurisprudência do STF. Responda APENAS com o JSON solicitado."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=rota.max_tokens, # Até 1500 para comportar o JSON; ajustado pelos tokens observados
+                temperature=rota.temperatura, # Um pouco menos de criatividade para focar no formato
+                # response_format={ "type": "json_object" } # Remover se causar problemas ou não for suportado consistentemente
+            )
+        chamada.resposta(response)
         resposta_bruta = response.choices[0].message.content.strip()
         
         # Tentar extrair o JSON da resposta bruta
         json_extraido_str = extrair_json(resposta_bruta)
         
         if not json_extraido_str:
+            chamada.fallback(telemetria.JSON_AUSENTE)
             st.error(f"Não foi possível encontrar um bloco JSON na resposta da API. Resposta recebida: '{resposta_bruta[:200]}...'. Usando simulação.")
             print(f"JSON não encontrado. Resposta bruta: {resposta_bruta}") # Log para debug
             return gerar_assertivas_simuladas(df, materias_selecionadas, num_assertivas)
@@ -377,168 +378,135 @@ def gerar_assertivas_api(df, materias_selecionadas=None, num_assertivas=5):
         if isinstance(assertivas_api, list) and all(isinstance(item, dict) and all(key in item for key in ["texto", "resposta", "explicacao"]) for item in assertivas_api):
             # Verificar se o número de assertivas é razoável (evitar listas vazias ou muito grandes)
             if 1 <= len(assertivas_api) <= num_assertivas * 2: # Permite alguma flexibilidade
-                 return assertivas_api[:num_assertivas] # Retorna no máximo o número solicitado
+                 assertivas_api = assertivas_api[:num_assertivas] # Retorna no máximo o número solicitado
+                 # Matéria de cada assertiva pelo informativo citado (usada pelo filtro do histórico)
+                 materias_por_informativo = {}
+                 for _, row in registros_selecionados.iterrows():
+                     if pd.notna(row['Matéria']):
+                         materias_por_informativo.setdefault(int(row['Informativo']), row['Matéria'])
+                 for item in assertivas_api:
+                     numero = re.search(r"\d+", str(item.get("informativo") or ""))
+                     item["informativo"] = int(numero.group()) if numero else None
+                     item["materia"] = materias_por_informativo.get(item["informativo"])
+                 return assertivas_api
             else:
+                 chamada.fallback(telemetria.QUANTIDADE_INESPERADA)
                  st.warning(f"API retornou um número inesperado de assertivas ({len(assertivas_api)}). Usando simulação.")
                  print(f"Número inesperado de assertivas. JSON: {json_extraido_str}") # Log
                  return gerar_assertivas_simuladas(df, materias_selecionadas, num_assertivas)
         else:
+            chamada.fallback(telemetria.FORMATO_INVALIDO)
             st.error("A resposta da API não continha uma lista válida de assertivas no formato JSON esperado. Usando simulação.")
             print(f"Resposta JSON inválida recebida: {json_extraido_str}") # Log para debug
             return gerar_assertivas_simuladas(df, materias_selecionadas, num_assertivas)
             
     except json.JSONDecodeError:
+        chamada.fallback(telemetria.JSON_INVALIDO)
         st.error(f"Erro ao decodificar o JSON extraído da API. JSON extraído: '{json_extraido_str[:200]}...'. Usando simulação.")
         print(f"Erro JSONDecodeError. JSON extraído: {json_extraido_str}") # Log para debug
         return gerar_assertivas_simuladas(df, materias_selecionadas, num_assertivas)
-    except openai.AuthenticationError:
+    except cliente_openai.ErroAutenticacao as e:
+        chamada.fallback(telemetria.AUTENTICACAO, e)
         st.error("Erro de autenticação com a API da OpenAI. Verifique sua chave de API. Usando simulação.")
         return gerar_assertivas_simuladas(df, materias_selecionadas, num_assertivas)
     except Exception as e:
+        chamada.fallback(telemetria.ERRO_API, e)
         st.error(f"Erro ao chamar a API da OpenAI para gerar assertivas: {e}. Usando simulação.")
         print(f"Erro Exception na API: {e}") # Log para debug
         return gerar_assertivas_simuladas(df, materias_selecionadas, num_assertivas)
+    finally:
+        chamada.registrar()
 
-# Função para encontrar registros relevantes para a pergunta
-def encontrar_registros_relevantes(pergunta, df, max_registros=3):
-    # Palavras-chave para buscar nos dados
-    palavras_chave = [palavra.lower() for palavra in pergunta.split() if len(palavra) > 3]
-    
-    # Se não houver palavras-chave significativas, retornar lista vazia
-    if not palavras_chave:
-        return []
-    
-    # Buscar registros relevantes
-    registros_relevantes = []
-    
-    for _, row in df.iterrows():
-        pontuacao = 0
-        
-        # Verificar título
-        if pd.notna(row["Título"]):
-            for palavra in palavras_chave:
-                if palavra in row["Título"].lower():
-                    pontuacao += 3  # Peso maior para correspondência no título
-        
-        # Verificar resumo
-        if pd.notna(row["Resumo"]):
-            for palavra in palavras_chave:
-                if palavra in row["Resumo"].lower():
-                    pontuacao += 2
-        
-        # Verificar matéria
-        if pd.notna(row["Matéria"]):
-            for palavra in palavras_chave:
-                if palavra in row["Matéria"].lower():
-                    pontuacao += 1
-        
-        # Verificar ramo do direito
-        if pd.notna(row["Ramo Direito"]):
-            for palavra in palavras_chave:
-                if palavra in row["Ramo Direito"].lower():
-                    pontuacao += 1
-                    
-        # Verificar legislação
-        if 'Legislação' in row and pd.notna(row["Legislação"]):
-            for palavra in palavras_chave:
-                if palavra in row["Legislação"].lower():
-                    pontuacao += 1
-                    
-        # Verificar notícia completa
-        if 'Notícia completa' in row and pd.notna(row["Notícia completa"]):
-            for palavra in palavras_chave:
-                if palavra in row["Notícia completa"].lower():
-                    pontuacao += 1
-        
-        # Se houver pontuação, adicionar à lista de registros relevantes
-        if pontuacao > 0:
-            registros_relevantes.append((pontuacao, row))
-    
-    # Ordenar por relevância (pontuação)
-    registros_relevantes.sort(reverse=True, key=lambda x: x[0])
-    
-    # Retornar apenas os registros mais relevantes
-    return [registro for _, registro in registros_relevantes[:max_registros]]
+# Função para identificar o usuário do histórico de assertivas: um identificador anônimo
+# guardado na URL (?usuario=...), que sobrevive ao recarregamento da página
+def identificar_usuario():
+    usuario = st.query_params.get("usuario")
+    if not usuario:
+        usuario = uuid.uuid4().hex
+        st.query_params["usuario"] = usuario
+    return usuario
 
-# Função para criar um contexto baseado nos registros relevantes
-def criar_contexto(registros_relevantes):
-    if not registros_relevantes:
-        return ""
+# Função para escolher as assertivas da rodada por revisão espaçada (ver revisao.py): sorteia do
+# banco persistente, com peso maior para as que o usuário erra e as que não vê há mais tempo.
+# Só gera assertivas novas (API ou simulação) quando faltam inéditas e há pouco para revisar.
+@metricas.medido()
+def sortear_assertivas(df, materias_selecionadas=None, num_assertivas=5, usuario=None):
+    materias = [] if not materias_selecionadas or 'Todas' in materias_selecionadas else sorted(materias_selecionadas)
+    banco = obter_historico()
     
-    contexto = "Contexto dos informativos do STF:\n\n"
+    # Amostrador do usuário para o filtro atual (recriado quando o filtro muda)
+    chave = (usuario, tuple(materias))
+    amostrador = st.session_state.get("amostrador")
+    if amostrador is None or st.session_state.get("chave_amostrador") != chave:
+        amostrador = revisao.Amostrador(*banco.candidatas(usuario, materias))
+        st.session_state.amostrador = amostrador
+        st.session_state.chave_amostrador = chave
     
-    for i, registro in enumerate(registros_relevantes):
-        informativo = registro["Informativo"]
-        data = registro["Data Julgamento"].strftime("%d/%m/%Y") if pd.notna(registro["Data Julgamento"]) else "data não especificada"
-        titulo = registro["Título"] if pd.notna(registro["Título"]) else "Título não disponível"
-        
-        contexto += f"Informativo {informativo} ({data}): {titulo}\n"
-        
-        if pd.notna(registro["Resumo"]):
-            contexto += f"Resumo: {registro['Resumo']}\n"
-        
-        if pd.notna(registro["Tese Julgado"]):
-            contexto += f"Tese: {registro['Tese Julgado']}\n"
-            
-        if 'Legislação' in registro and pd.notna(registro["Legislação"]):
-            contexto += f"Legislação: {registro['Legislação']}\n"
-            
-        if 'Notícia completa' in registro and pd.notna(registro["Notícia completa"]):
-            contexto += f"Notícia Completa: {registro['Notícia completa']}\n"
-        
-        contexto += "\n"
+    if amostrador.precisa_de_novas(num_assertivas):
+        novas = gerar_assertivas_api(df, materias_selecionadas, num_assertivas)
+        validas = [assertiva for assertiva in novas if assertiva.get("resposta") is not None]
+        if not validas:
+            return novas # Mensagem de dados insuficientes
+        for assertiva in validas:
+            if not assertiva.get("materia") and len(materias) == 1:
+                assertiva["materia"] = materias[0]
+        amostrador.acrescentar(banco.salvar_assertivas(validas))
     
-    return contexto
+    ids = amostrador.sortear(num_assertivas)
+    banco.registrar_vistas(usuario, ids)
+    return banco.assertivas(ids)
+
+# Função para gravar a resposta do usuário no histórico (e no peso da assertiva no amostrador)
+def registrar_resposta_assertiva(usuario, assertiva, resposta):
+    if not assertiva.get("id"):
+        return
+    correta = resposta == assertiva["resposta"]
+    obter_historico().registrar_resposta(usuario, assertiva["id"], resposta, correta)
+    amostrador = st.session_state.get("amostrador")
+    if amostrador is not None:
+        amostrador.registrar_resposta(assertiva["id"], correta)
 
 # Função para obter resposta da API do ChatGPT
+@metricas.medido()
 def obter_resposta_chatgpt(pergunta, df):
     # Configurar a API
-    api_configurada = configurar_openai()
-    if not api_configurada:
+    cliente = configurar_openai()
+    if not cliente:
+        telemetria.registrar_fallback("pergunta", telemetria.SEM_CHAVE)
         st.warning("A chave da API da OpenAI não está configurada. Usando a simulação de resposta.")
         return simular_resposta(pergunta, df)
 
-    # Encontrar registros relevantes e criar contexto
-    registros_relevantes = encontrar_registros_relevantes(pergunta, df)
+    # Encontrar registros relevantes e criar contexto (com menos registros se a latência passar do SLO)
+    rota = roteamento.rota("pergunta")
+    registros_relevantes = encontrar_registros_relevantes(pergunta, df, obter_indice_busca(ARQUIVO_DADOS),
+                                                          max_registros=rota.max_registros)
     contexto = criar_contexto(registros_relevantes)
 
-    # Construir o prompt
-    prompt = f"""Você é um assistente especializado em informativos do Supremo Tribunal Federal do Brasil.
-Responda à pergunta do usuário com base apenas nas informações fornecidas abaixo.
-Se as informações não forem suficientes para responder à pergunta, diga que não há informações suficientes nos informativos entre 2021 e 2025.
-
-CONTEXTO DOS INFORMATIVOS:
-{contexto}
-
-PERGUNTA DO USUÁRIO:
-{pergunta}
-
-RESPOSTA:"""
-
+    chamada = telemetria.Chamada("pergunta", rota.modelo, rota.nivel_contexto)
     try:
         # Chamar a API da OpenAI
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",  # Ou outro modelo de sua preferência
-            messages=[
-                {"role": "system", "content": "Você é um assistente especializado em informativos do STF."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=300,  # Limitar o tamanho da resposta
-            temperature=0.5, # Controlar a criatividade da resposta
-        )
+        with metricas.medir("openai_pergunta"):
+            response = cliente_openai.criar_chat_completion(cliente, detalhes=chamada.detalhes,
+                                                            **parametros_pergunta(pergunta, contexto, rota))
+        chamada.resposta(response)
         resposta_api = response.choices[0].message.content.strip()
         return resposta_api
-    except openai.AuthenticationError:
+    except cliente_openai.ErroAutenticacao as e:
+        chamada.fallback(telemetria.AUTENTICACAO, e)
         st.error("Erro de autenticação com a API da OpenAI. Verifique sua chave de API.")
         return simular_resposta(pergunta, df) # Fallback para simulação
     except Exception as e:
+        chamada.fallback(telemetria.ERRO_API, e)
         st.error(f"Erro ao chamar a API da OpenAI: {e}")
         return simular_resposta(pergunta, df) # Fallback para simulação
+    finally:
+        chamada.registrar()
 
 # Função para simular respostas às perguntas (Fallback)
+@metricas.medido()
 def simular_resposta(pergunta, df):
     # Buscar registros relevantes
-    registros_relevantes = encontrar_registros_relevantes(pergunta, df)
+    registros_relevantes = encontrar_registros_relevantes(pergunta, df, obter_indice_busca(ARQUIVO_DADOS))
     
     # Se não houver registros relevantes, retornar mensagem
     if not registros_relevantes:
@@ -562,16 +530,188 @@ def simular_resposta(pergunta, df):
         if 'Legislação' in registro and pd.notna(registro["Legislação"]):
             resposta += f"**Legislação**: {registro['Legislação']}\n\n"
             
-        if 'Notícia completa' in registro and pd.notna(registro["Notícia completa"]):
-            resposta += f"**Notícia Completa**: {registro['Notícia completa']}\n\n"
+        if resumo_noticia(registro):
+            resposta += f"**Notícia (resumo)**: {resumo_noticia(registro)}\n\n"
         
         if i < len(registros_relevantes) - 1:
             resposta += "---\n\n"
     
     return resposta
 
+# Função para aplicar os filtros gerais da barra lateral
+@metricas.medido()
+def aplicar_filtros(df, informativo_selecionado="Todos", ramo_selecionado="Todos", classe_selecionada="Todos",
+                    repercussao_selecionada="Todos", data_selecionada=()):
+    # Uma máscara sobre as colunas do DataFrame compartilhado e uma única seleção no final
+    # (sem filtros, o próprio DataFrame é devolvido, sem cópia)
+    mascara = None
+    
+    def combinar(condicao):
+        return condicao if mascara is None else mascara & condicao
+    
+    # Filtro por Informativo
+    if informativo_selecionado != "Todos":
+        mascara = combinar(df["Informativo"] == informativo_selecionado)
+    
+    # Filtro por Ramo do Direito
+    if ramo_selecionado != "Todos":
+        mascara = combinar(df["Ramo Direito"] == ramo_selecionado)
+    
+    # Filtro por Classe Processual
+    if classe_selecionada != "Todos":
+        mascara = combinar(df["Classe Processo"] == classe_selecionada)
+    
+    # Filtro por Repercussão Geral
+    if repercussao_selecionada != "Todos":
+        mascara = combinar(df["Repercussão Geral"] == repercussao_selecionada)
+    
+    # Filtro por Data (comparação direta com datetime64, sem criar um objeto date por linha)
+    if len(data_selecionada) == 2:
+        start_date, end_date = data_selecionada
+        mascara = combinar((df["Data Julgamento"] >= pd.Timestamp(start_date)) & 
+                           (df["Data Julgamento"] < pd.Timestamp(end_date) + pd.Timedelta(days=1)))
+    
+    if mascara is None:
+        return df
+    return df[mascara]
+
+# Função para filtrar pelo termo de pesquisa. Aceita a sintaxe de campos do módulo busca
+# (ramo:, classe:, materia:, repercussao:, ano:, data:, informativo:, "frase", -negação);
+# as posições do índice correspondem aos rótulos das linhas do DataFrame carregado
+@metricas.medido()
+def filtrar_por_termo(df_filtrado, termo_pesquisa, indice=None):
+    if indice is None:
+        indice = busca.IndiceBusca(df_filtrado)
+        return df_filtrado.iloc[indice.buscar(termo_pesquisa)]
+    posicoes = indice.buscar(termo_pesquisa, candidatos=df_filtrado.index.to_numpy())
+    return df_filtrado.loc[posicoes]
+
+# Função para filtrar as decisões que citam um dispositivo (consulta exata no índice de citações)
+@metricas.medido()
+def filtrar_por_citacao(df_filtrado, indice, citacao):
+    chaves, posicoes = indice.consultar(citacao)
+    return df_filtrado[df_filtrado.index.isin(posicoes)], chaves
+
+# Função para calcular as contagens usadas na aba de estatísticas
+@metricas.medido()
+def calcular_estatisticas(df):
+    # Contar ocorrências de cada ramo do direito
+    ramo_counts = df["Ramo Direito"].value_counts().reset_index()
+    ramo_counts.columns = ["Ramo do Direito", "Quantidade"]
+    
+    # Contar ocorrências de cada tipo de repercussão geral
+    repercussao_counts = df["Repercussão Geral"].value_counts().reset_index()
+    repercussao_counts.columns = ["Repercussão Geral", "Quantidade"]
+    
+    # Contar ocorrências de cada classe processual
+    classe_counts = df["Classe Processo"].value_counts().reset_index()
+    classe_counts.columns = ["Classe Processual", "Quantidade"]
+    
+    # Extrair o ano da data de julgamento (sem alterar o DataFrame recebido, que é compartilhado)
+    anos = df["Data Julgamento"].dt.year.rename("Ano")
+    
+    # Contar ocorrências de cada ano
+    ano_counts = anos.value_counts().sort_index().reset_index()
+    ano_counts.columns = ["Ano", "Quantidade"]
+    
+    return {
+        "ramos": ramo_counts,
+        "repercussao": repercussao_counts,
+        "classes": classe_counts,
+        "anos": ano_counts,
+    }
+
+# Função para acompanhar a exportação em andamento: o fragmento se atualiza sozinho a cada
+# segundo enquanto o arquivo é gerado, sem rerun da página inteira
+def exibir_progresso_exportacao(acompanhando):
+    tarefa = st.session_state.get("exportacao")
+    if tarefa is None:
+        return
+    if acompanhando and tarefa.concluida:
+        st.rerun()  # recria o fragmento sem a atualização periódica
+    if not tarefa.concluida:
+        st.progress(tarefa.progresso, text=f"Gerando {tarefa.formato}: {tarefa.processadas} de {tarefa.total} informativos...")
+        if st.button("Cancelar exportação"):
+            tarefa.descartar()
+            del st.session_state["exportacao"]
+            st.rerun()
+    elif tarefa.erro:
+        st.error(f"Não foi possível gerar o arquivo: {tarefa.erro}")
+    elif not tarefa.cancelada:
+        with open(tarefa.caminho, "rb") as arquivo:
+            st.download_button(f"Baixar {tarefa.formato} ({tarefa.total} informativos)", data=arquivo,
+                               file_name=tarefa.nome_arquivo, mime=tarefa.mime, on_click="ignore")
+        st.caption(f"Arquivo gerado em {tarefa.duracao_s:.1f}s.")
+
+# Função para exportar a seleção atual (CSV, Parquet ou PDF) em segundo plano
+def exibir_exportacao(df_filtrado):
+    with st.expander("Exportar seleção"):
+        col1, col2 = st.columns(2)
+        with col1:
+            formato = st.selectbox("Formato", list(exportacao.FORMATOS), key="formato_exportacao")
+        with col2:
+            noticia_completa = st.checkbox("Incluir a notícia completa", key="exportar_noticia_completa",
+                                           help="Por padrão, o arquivo traz o resumo da notícia.")
+        if st.button("Gerar arquivo", disabled=df_filtrado.empty):
+            anterior = st.session_state.get("exportacao")
+            if anterior is not None:
+                anterior.descartar()
+            st.session_state["exportacao"] = exportacao.TarefaExportacao(df_filtrado, formato, noticia_completa)
+        tarefa = st.session_state.get("exportacao")
+        em_andamento = tarefa is not None and not tarefa.concluida
+        st.fragment(exibir_progresso_exportacao, run_every=1.0 if em_andamento else None)(em_andamento)
+
+# Função para exibir os tempos do rerun atual (somente com STF_METRICAS=1)
+def exibir_painel_desenvolvedor(spans):
+    with st.sidebar.expander("Desenvolvedor: tempos deste rerun"):
+        if not spans:
+            st.write("Nenhuma etapa medida.")
+            return
+        # Ordenar pelo início de cada etapa para que as aninhadas apareçam abaixo da etapa externa
+        spans = sorted(spans, key=lambda span: span["ts"] - span["duracao_s"])
+        tabela = pd.DataFrame({
+            "Etapa": ["\u2003" * span["profundidade"] + span["etapa"] for span in spans],
+            "Tempo (ms)": [round(span["duracao_s"] * 1000, 2) for span in spans],
+        })
+        st.dataframe(tabela, hide_index=True, use_container_width=True)
+
+# Função para exibir a telemetria das chamadas à API por endpoint/modelo (somente com STF_METRICAS=1)
+def exibir_painel_chamadas():
+    with st.sidebar.expander("Desenvolvedor: chamadas à API"):
+        linhas = telemetria.resumo()
+        if not linhas:
+            st.write("Nenhuma chamada registrada.")
+            return
+        tabela = pd.DataFrame(linhas)
+        tabela["motivos_fallback"] = tabela["motivos_fallback"].map(
+            lambda motivos: ", ".join(f"{motivo}: {n}" for motivo, n in motivos.items()))
+        st.dataframe(tabela.drop(columns="latencia_total_s"), hide_index=True, use_container_width=True)
+        st.caption("Nível de contexto: " + ", ".join(f"{tipo} {nivel}" for tipo, nivel in roteamento.situacao().items()))
+
+# Função para montar as tabelas da aba de estatísticas a partir das contagens agregadas
+# mantidas pela ingestão (evita percorrer o DataFrame quando os dados vêm de um snapshot)
+def estatisticas_de_contagens(contagens):
+    def tabela(nome, colunas, ordenar_por_valor=False):
+        serie = pd.Series(contagens[nome], dtype="int64")
+        serie = serie.sort_index() if ordenar_por_valor else serie.sort_values(ascending=False, kind="stable")
+        df_contagem = serie.reset_index()
+        df_contagem.columns = colunas
+        return df_contagem
+    
+    anos = tabela("anos", ["Ano", "Quantidade"], ordenar_por_valor=True)
+    anos["Ano"] = anos["Ano"].astype(int)
+    return {
+        "ramos": tabela("ramos", ["Ramo do Direito", "Quantidade"]),
+        "repercussao": tabela("repercussao", ["Repercussão Geral", "Quantidade"]),
+        "classes": tabela("classes", ["Classe Processual", "Quantidade"]),
+        "anos": anos.sort_values("Ano", ignore_index=True),
+    }
+
 # Função principal
 def main():
+    # Iniciar a medição das etapas deste rerun (sem efeito se as métricas estiverem desligadas)
+    metricas.iniciar_rerun()
+    
     # Aplicar estilo
     aplicar_estilo()
     
@@ -579,14 +719,14 @@ def main():
     st.markdown('<div class="main-header">Dashboard Informativos STF (2021-2025)</div>', unsafe_allow_html=True)
     
     # Carregar dados
-    df = carregar_dados()
+    df = carregar_dados(ARQUIVO_DADOS)
     
     if df is None:
         st.error("Não foi possível carregar os dados. Por favor, verifique se o arquivo existe.")
         return
     
     # Sidebar para filtros
-    with st.sidebar:
+    with st.sidebar, metricas.medir("barra_lateral"):
         st.header("Filtros Gerais")
         
         # Filtro por Informativo
@@ -621,7 +761,12 @@ def main():
         )
         
         # Barra de pesquisa
-        termo_pesquisa = st.text_input("Pesquisar termo", "")
+        termo_pesquisa = st.text_input("Pesquisar termo", "",
+                                       help='Ex.: ramo:tributário classe:RE ano:2023 "imunidade recíproca" -ICMS')
+        
+        # Filtro por legislação citada
+        citacao = st.text_input("Decisões citando", "",
+                                help="Ex.: Lei 8.112/1990, CF art. 5º, XIII, Súmula Vinculante 13")
         
         # Botão para limpar filtros
         if st.button("Limpar Filtros"):
@@ -631,6 +776,7 @@ def main():
             repercussao_selecionada = "Todos"
             data_selecionada = (min_date, max_date)
             termo_pesquisa = ""
+            citacao = ""
             # Limpar também o estado das assertivas e matérias selecionadas
             if "materias_assertivas" in st.session_state:
                 st.session_state.materias_assertivas = ['Todas']
@@ -641,52 +787,45 @@ def main():
             st.rerun() # Forçar recarregamento da página para aplicar limpeza
     
     # Aplicar filtros gerais
-    df_filtrado = df.copy()
-    
-    # Filtro por Informativo
-    if informativo_selecionado != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["Informativo"] == informativo_selecionado]
-    
-    # Filtro por Ramo do Direito
-    if ramo_selecionado != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["Ramo Direito"] == ramo_selecionado]
-    
-    # Filtro por Classe Processual
-    if classe_selecionada != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["Classe Processo"] == classe_selecionada]
-    
-    # Filtro por Repercussão Geral
-    if repercussao_selecionada != "Todos":
-        df_filtrado = df_filtrado[df_filtrado["Repercussão Geral"] == repercussao_selecionada]
-    
-    # Filtro por Data
-    if len(data_selecionada) == 2:
-        start_date, end_date = data_selecionada
-        df_filtrado = df_filtrado[(df_filtrado["Data Julgamento"].dt.date >= start_date) & 
-                                 (df_filtrado["Data Julgamento"].dt.date <= end_date)]
+    df_filtrado = aplicar_filtros(df, informativo_selecionado, ramo_selecionado, classe_selecionada,
+                                  repercussao_selecionada, data_selecionada)
     
     # Filtro por termo de pesquisa
     if termo_pesquisa:
-        mask = (
-            df_filtrado["Título"].fillna("").str.contains(termo_pesquisa, case=False) |
-            df_filtrado["Resumo"].fillna("").str.contains(termo_pesquisa, case=False) |
-            df_filtrado["Matéria"].fillna("").str.contains(termo_pesquisa, case=False) |
-            df_filtrado["Tese Julgado"].fillna("").str.contains(termo_pesquisa, case=False) |
-            df_filtrado["Legislação"].fillna("").str.contains(termo_pesquisa, case=False) | # Adicionado filtro por Legislação
-            df_filtrado["Notícia completa"].fillna("").str.contains(termo_pesquisa, case=False) # Adicionado filtro por Notícia completa
-        )
-        df_filtrado = df_filtrado[mask]
+        try:
+            indice_busca = obter_indice_busca(ARQUIVO_DADOS)
+            df_filtrado = filtrar_por_termo(df_filtrado, termo_pesquisa, indice_busca)
+            # Termos sem ocorrência foram trocados pelas palavras mais próximas do vocabulário
+            for termo, similares in indice_busca.correcoes(termo_pesquisa).items():
+                if similares:
+                    st.sidebar.caption(f"Nenhuma ocorrência de '{termo}'; buscando por: {', '.join(similares)}")
+        except busca.ErroConsulta as e:
+            st.sidebar.warning(f"Pesquisa inválida: {e}")
+    
+    # Filtro por legislação citada
+    if citacao:
+        indice_citacoes = obter_indice_citacoes(ARQUIVO_DADOS)
+        df_filtrado, chaves_citacao = filtrar_por_citacao(df_filtrado, indice_citacoes, citacao)
+        if chaves_citacao:
+            st.sidebar.caption("Citação interpretada como: " + ", ".join(chaves_citacao))
+        else:
+            st.sidebar.warning("Não foi possível reconhecer a citação. Ex.: Lei 8.112/1990, CF art. 5º")
     
     # Criar abas para as diferentes seções
     tab1, tab2, tab3, tab4 = st.tabs(["Visualização dos Informativos", "Estatísticas Interativas", 
                                       "Assertivas para Estudo", "Pergunte para a Result"])
     
     # Aba 1: Visualização dos Informativos
-    with tab1:
+    with tab1, metricas.medir("aba_visualizacao"):
         st.markdown('<div class="sub-header">Visualização dos Informativos</div>', unsafe_allow_html=True)
         
         # Mostrar número de resultados
         st.write(f"Exibindo {len(df_filtrado)} de {len(df)} informativos.")
+        if "ID Canônico" in df_filtrado.columns and df_filtrado["ID Canônico"].nunique() < len(df_filtrado):
+            st.caption(f"{df_filtrado['ID Canônico'].nunique()} decisões distintas (as demais repetem "
+                       "o mesmo julgamento em outro informativo).")
+        
+        exibir_exportacao(df_filtrado)
         
         # Opções de visualização
         visualizacao = st.radio(
@@ -699,11 +838,14 @@ def main():
             # Tabela interativa
             if not df_filtrado.empty:
                 # Formatar a data para exibição
-                df_exibicao = df_filtrado.copy()
-                df_exibicao["Data Julgamento"] = df_exibicao["Data Julgamento"].dt.strftime("%d/%m/%Y")
+                df_exibicao = df_filtrado.assign(**{"Data Julgamento": df_filtrado["Data Julgamento"].dt.strftime("%d/%m/%Y")})
+                # Resumo da notícia no lugar do texto completo (que fica nos detalhes, sob demanda);
+                # sem a coluna pré-calculada, os resumos são calculados uma vez por arquivo de dados
+                if resumos.COLUNA not in df_exibicao.columns and "Notícia completa" in df_exibicao.columns:
+                    df_exibicao[resumos.COLUNA] = obter_resumos(ARQUIVO_DADOS).loc[df_exibicao.index]
                 
                 # Selecionar colunas para exibição (incluindo as novas colunas)
-                colunas_exibicao = ["Informativo", "Classe Processo", "Data Julgamento", "Título", "Ramo Direito", "Matéria", "Legislação", "Notícia completa"]
+                colunas_exibicao = ["Informativo", "Classe Processo", "Data Julgamento", "Título", "Ramo Direito", "Matéria", "Legislação", resumos.COLUNA]
                 # Filtrar colunas que realmente existem no DataFrame
                 colunas_exibicao_existentes = [col for col in colunas_exibicao if col in df_exibicao.columns]
                 st.dataframe(df_exibicao[colunas_exibicao_existentes], use_container_width=True)
@@ -760,10 +902,12 @@ def main():
                                 st.markdown("**Legislação:**")
                                 st.markdown(f"{informativo_selecionado['Legislação']}")
                                 
-                            # Exibir Notícia Completa
-                            if 'Notícia completa' in informativo_selecionado and pd.notna(informativo_selecionado["Notícia completa"]):
-                                st.markdown("**Notícia Completa:**")
-                                st.markdown(f"{informativo_selecionado['Notícia completa']}")
+                            # Exibir o resumo da notícia (a completa só se pedida)
+                            if resumo_noticia(informativo_selecionado):
+                                st.markdown("**Notícia (resumo):**")
+                                st.markdown(f"{resumo_noticia(informativo_selecionado)}")
+                                if st.checkbox("Ver notícia completa", key=f"noticia_completa_{indice_selecionado}"):
+                                    st.markdown(f"{informativo_selecionado['Notícia completa']}")
                                 
                             st.markdown('</div>', unsafe_allow_html=True)
             else:
@@ -816,21 +960,34 @@ def main():
                         st.markdown("<strong>Legislação:</strong>", unsafe_allow_html=True)
                         st.markdown(f"{row['Legislação']}")
                         
-                    # Exibir Notícia Completa
-                    if 'Notícia completa' in row and pd.notna(row["Notícia completa"]):
-                        st.markdown("<strong>Notícia Completa:</strong>", unsafe_allow_html=True)
-                        st.markdown(f"{row['Notícia completa']}")
+                    # Exibir o resumo da notícia (a completa só se pedida)
+                    if resumo_noticia(row):
+                        st.markdown("<strong>Notícia (resumo):</strong>", unsafe_allow_html=True)
+                        st.markdown(f"{resumo_noticia(row)}")
+                        if st.checkbox("Ver notícia completa", key=f"noticia_completa_card_{row.name}"):
+                            st.markdown(f"{row['Notícia completa']}")
                     
                     st.markdown("</div></div>", unsafe_allow_html=True)
             else:
                 st.warning("Nenhum informativo encontrado com os filtros selecionados.")
     
     # Aba 2: Estatísticas Interativas
-    with tab2:
+    with tab2, metricas.medir("aba_estatisticas"):
         st.markdown('<div class="sub-header">Estatísticas Interativas</div>', unsafe_allow_html=True)
         
         # Verificar se há dados suficientes para gerar estatísticas
         if len(df) > 0:
+            # Importado só aqui (e pré-carregado por iniciar.py): o plotly não entra na importação do app
+            import plotly.express as px
+            
+            unicas = st.checkbox("Contar decisões repetidas em vários informativos uma única vez", value=True)
+            
+            # Calcular as contagens de todos os gráficos (já agregadas no snapshot, se houver)
+            if os.path.isdir(ARQUIVO_DADOS) and (not unicas or "estatisticas_unicas" in ingestao.ler_manifesto(ARQUIVO_DADOS)):
+                estatisticas = estatisticas_de_contagens(ingestao.estatisticas_snapshot(ARQUIVO_DADOS, unicas))
+            else:
+                estatisticas = calcular_estatisticas(colapsar_duplicatas(df) if unicas else df)
+            
             # Layout em colunas para os gráficos
             col1, col2 = st.columns(2)
             
@@ -839,12 +996,8 @@ def main():
                 st.markdown('<div class="card">', unsafe_allow_html=True)
                 st.subheader("Distribuição por Ramo do Direito")
                 
-                # Contar ocorrências de cada ramo do direito
-                ramo_counts = df["Ramo Direito"].value_counts().reset_index()
-                ramo_counts.columns = ["Ramo do Direito", "Quantidade"]
-                
                 # Limitar para os 10 principais ramos
-                top_ramos = ramo_counts.head(10)
+                top_ramos = estatisticas["ramos"].head(10)
                 
                 # Criar gráfico de barras
                 fig = px.bar(
@@ -866,13 +1019,9 @@ def main():
                 st.markdown('<div class="card">', unsafe_allow_html=True)
                 st.subheader("Proporção de Casos com Repercussão Geral")
                 
-                # Contar ocorrências de cada tipo de repercussão geral
-                repercussao_counts = df["Repercussão Geral"].value_counts().reset_index()
-                repercussao_counts.columns = ["Repercussão Geral", "Quantidade"]
-                
                 # Criar gráfico de pizza
                 fig = px.pie(
-                    repercussao_counts, 
+                    estatisticas["repercussao"], 
                     values="Quantidade", 
                     names="Repercussão Geral",
                     hole=0.4,
@@ -887,12 +1036,8 @@ def main():
             st.markdown('<div class="card">', unsafe_allow_html=True)
             st.subheader("Classes Processuais mais Frequentes")
             
-            # Contar ocorrências de cada classe processual
-            classe_counts = df["Classe Processo"].value_counts().reset_index()
-            classe_counts.columns = ["Classe Processual", "Quantidade"]
-            
             # Limitar para as 15 principais classes
-            top_classes = classe_counts.head(15)
+            top_classes = estatisticas["classes"].head(15)
             
             # Criar gráfico de barras
             fig = px.bar(
@@ -911,16 +1056,9 @@ def main():
             st.markdown('<div class="card">', unsafe_allow_html=True)
             st.subheader("Distribuição de Informativos por Ano")
             
-            # Extrair o ano da data de julgamento
-            df["Ano"] = df["Data Julgamento"].dt.year
-            
-            # Contar ocorrências de cada ano
-            ano_counts = df["Ano"].value_counts().sort_index().reset_index()
-            ano_counts.columns = ["Ano", "Quantidade"]
-            
             # Criar gráfico de linha
             fig = px.line(
-                ano_counts, 
+                estatisticas["anos"], 
                 x="Ano", 
                 y="Quantidade",
                 markers=True,
@@ -935,7 +1073,7 @@ def main():
             st.warning("Não há dados suficientes para gerar estatísticas.")
     
     # Aba 3: Assertivas para Estudo
-    with tab3:
+    with tab3, metricas.medir("aba_assertivas"):
         st.markdown('<div class="sub-header">Assertivas para Estudo (Estilo Concurso)</div>', unsafe_allow_html=True)
         
         # Introdução
@@ -945,6 +1083,9 @@ def main():
         Se a API da OpenAI não estiver configurada, será usada uma simulação.
         """)
         
+        # Histórico persistente do usuário (associado ao endereço desta página)
+        usuario = identificar_usuario()
+        
         # Filtro por Matéria
         st.markdown("**Filtre por Matéria(s):**")
         materias_disponiveis = sorted(df['Matéria'].dropna().unique())
@@ -975,7 +1116,8 @@ def main():
         # Inicializar estado da sessão se necessário
         if "assertivas" not in st.session_state:
             with st.spinner("Gerando assertivas..."):
-                st.session_state.assertivas = gerar_assertivas_api(df, st.session_state.materias_assertivas, num_assertivas=5)
+                st.session_state.assertivas = sortear_assertivas(df, st.session_state.materias_assertivas,
+                                                                 num_assertivas=5, usuario=usuario)
         
         if "respostas_usuario" not in st.session_state:
             st.session_state.respostas_usuario = {}
@@ -1014,12 +1156,14 @@ def main():
                     verdadeiro = st.button("Verdadeiro", key=f"v_{i}", disabled=resposta_dada)
                     if verdadeiro:
                         st.session_state.respostas_usuario[i] = True
+                        registrar_resposta_assertiva(usuario, assertiva, True)
                         st.rerun() # Recarregar para mostrar feedback
                 
                 with col2:
                     falso = st.button("Falso", key=f"f_{i}", disabled=resposta_dada)
                     if falso:
                         st.session_state.respostas_usuario[i] = False
+                        registrar_resposta_assertiva(usuario, assertiva, False)
                         st.rerun() # Recarregar para mostrar feedback
                 
                 # Mostrar feedback se o usuário já respondeu
@@ -1058,11 +1202,18 @@ def main():
                         <p>Você acertou {acertos} de {total_respondidas} assertivas respondidas ({acertos/total_respondidas*100:.1f}%).</p>
                     </div>
                     """, unsafe_allow_html=True)
+
+            # Histórico de todas as sessões do usuário
+            resumo_historico = obter_historico().resumo_usuario(usuario)
+            if resumo_historico["respondidas"]:
+                st.caption(f"Seu histórico: {resumo_historico['acertos']} acertos em {resumo_historico['respondidas']} "
+                           f"respostas ({resumo_historico['vistas']} assertivas vistas). As próximas rodadas priorizam "
+                           "as assertivas que você errou e as que não vê há mais tempo.")
         else:
              st.warning("Clique em 'Gerar Novas Assertivas' para começar.")
     
     # Aba 4: Pergunte para a Result
-    with tab4:
+    with tab4, metricas.medir("aba_pergunta"):
         st.markdown('<div class="sub-header">Pergunte para a Result</div>', unsafe_allow_html=True)
         
         st.markdown("""
@@ -1100,6 +1251,12 @@ def main():
     
     # Rodapé
     st.markdown('<div class="footer">Dashboard Informativos STF © 2025</div>', unsafe_allow_html=True)
+    
+    # Encerrar a medição e exibir o painel do desenvolvedor
+    spans = metricas.finalizar_rerun()
+    if metricas.ATIVADO:
+        exibir_painel_desenvolvedor(spans)
+        exibir_painel_chamadas()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,218 @@
+"""Benchmark dos caminhos críticos do app sobre corpora sintéticos crescentes.
+
+Mede tempo de parede e pico de memória (tracemalloc) de cada etapa para cada
+tamanho de corpus e grava o resultado em JSON, para comparar versões.
+
+Uso:
+    python -m benchmarks.caminhos_criticos executar --tamanhos 10000,100000,1000000 \\
+        --saida benchmarks/resultados/atual.json
+    python -m benchmarks.caminhos_criticos comparar base.json atual.json --tolerancia 0.15
+"""
+import argparse
+import datetime
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+import streamlit.logger
+
+import duplicatas
+from benchmarks.corpus_sintetico import gerar_corpus
+
+PERGUNTA_PADRAO = "Quais são as principais teses sobre imunidade tributária recíproca?"
+TERMO_PADRAO = "tributário"
+TERMO_COM_ERRO = "tributaro"
+CONSULTA_COMPOSTA = 'ramo:tributário classe:RE ano:2023 "imunidade recíproca" -ICMS'
+
+
+def _cenarios(app, df_bruto, arquivo_xlsx):
+    # Cada cenário devolve uma função sem argumentos a ser medida
+    df = app.preparar_dados(df_bruto.copy())
+    ramo = df["Ramo Direito"].mode().iat[0]
+    classe = df["Classe Processo"].mode().iat[0]
+    datas = df["Data Julgamento"].dropna()
+    intervalo = (datas.quantile(0.25).date(), datas.quantile(0.75).date())
+    materias = df["Matéria"].value_counts().index[:3].tolist()
+    indice = app.busca.IndiceBusca(df)
+    relevantes = app.encontrar_registros_relevantes(PERGUNTA_PADRAO, df, indice=indice)
+
+    cenarios = {}
+    if arquivo_xlsx:
+        carregar = inspect.unwrap(app.carregar_dados)
+        cenarios["carregar_dados"] = lambda: carregar(arquivo_xlsx)
+        app.carregar_dados(arquivo_xlsx)  # popula o cache para medir o acerto
+        cenarios["carregar_dados_cache"] = lambda: app.carregar_dados(arquivo_xlsx)
+    cenarios["preparar_dados"] = lambda: app.preparar_dados(df_bruto.copy())
+    cenarios["filtros_todos"] = lambda: app.aplicar_filtros(df)
+    cenarios["filtros_combinados"] = lambda: app.aplicar_filtros(df, "Todos", ramo, classe, "Todos", intervalo)
+    cenarios["indice_busca"] = lambda: app.busca.IndiceBusca(df)
+    cenarios["busca_termo"] = lambda: app.filtrar_por_termo(df, TERMO_PADRAO, indice)
+    cenarios["busca_aproximada"] = lambda: (indice._expansoes.clear(), app.filtrar_por_termo(df, TERMO_COM_ERRO, indice))
+    cenarios["busca_consulta_composta"] = lambda: app.filtrar_por_termo(df, CONSULTA_COMPOSTA, indice)
+    cenarios["encontrar_registros_relevantes"] = lambda: app.encontrar_registros_relevantes(PERGUNTA_PADRAO, df, indice=indice)
+    cenarios["criar_contexto"] = lambda: app.criar_contexto(relevantes)
+    cenarios["gerar_assertivas_simuladas"] = lambda: app.gerar_assertivas_simuladas(df, materias, 5)
+    cenarios["estatisticas"] = lambda: app.calcular_estatisticas(df)
+    cenarios["assinaturas_minhash"] = lambda: duplicatas.assinaturas(df)
+    assinaturas = duplicatas.assinaturas(df)
+    cenarios["agrupar_duplicatas"] = lambda: duplicatas.agrupar(assinaturas)
+    # Sem o lru_cache de resumir, para medir o TextRank e não o cache
+    noticias = df["Notícia completa"].dropna().tolist()
+    cenarios["resumos_textrank"] = lambda: [app.resumos.resumir.__wrapped__(t) for t in noticias]
+    return cenarios
+
+
+# Função para medir uma etapa: várias repetições de tempo (sem tracemalloc, que
+# distorce o tempo) e uma execução separada para o pico de memória
+def medir(funcao, repeticoes=3, orcamento_s=30.0):
+    tempos = []
+    inicio_total = time.perf_counter()
+    while len(tempos) < repeticoes:
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+        if time.perf_counter() - inicio_total > orcamento_s:
+            break
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "tempo_s": {
+            "min": round(min(tempos), 6),
+            "mediana": round(statistics.median(tempos), 6),
+            "repeticoes": len(tempos),
+        },
+        "pico_memoria_mb": round((pico - base) / 2**20, 3),
+    }
+
+
+def _metadados():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+    }
+
+
+def executar(args):
+    streamlit.logger.set_log_level("error")
+    # Histórico das assertivas num arquivo temporário (lido na importação do historico.py):
+    # o benchmark não grava no histórico do app
+    os.environ["STF_HISTORICO"] = os.path.join(tempfile.mkdtemp(prefix="stf_bench_"), "historico_assertivas.sqlite3")
+    import app
+
+    tamanhos = [int(t) for t in args.tamanhos.split(",")]
+    etapas = set(args.etapas.split(",")) if args.etapas else None
+    resultado = {"metadados": _metadados(), "resultados": {}}
+
+    for n in tamanhos:
+        print(f"[{n} linhas] gerando corpus...", file=sys.stderr)
+        df_bruto = gerar_corpus(n, args.semente)
+        arquivo_xlsx = None
+        if n <= args.max_linhas_xlsx:
+            arquivo_xlsx = os.path.join(tempfile.mkdtemp(prefix="stf_bench_"), f"corpus_{n}.xlsx")
+            df_bruto.to_excel(arquivo_xlsx, index=False)
+
+        resultado["resultados"][str(n)] = {}
+        for nome, funcao in _cenarios(app, df_bruto, arquivo_xlsx).items():
+            if etapas and nome not in etapas:
+                continue
+            medicao = medir(funcao, args.repeticoes, args.orcamento)
+            resultado["resultados"][str(n)][nome] = medicao
+            print(f"[{n} linhas] {nome}: {medicao['tempo_s']['mediana']:.4f}s, "
+                  f"{medicao['pico_memoria_mb']:.1f} MB", file=sys.stderr)
+
+        if arquivo_xlsx:
+            os.remove(arquivo_xlsx)
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+# Função para comparar dois arquivos de resultado; retorna a lista de regressões
+def comparar_resultados(base, atual, tolerancia=0.15):
+    regressoes = []
+    linhas = []
+    for tamanho, etapas in atual["resultados"].items():
+        for etapa, medicao in etapas.items():
+            anterior = base["resultados"].get(tamanho, {}).get(etapa)
+            if not anterior:
+                continue
+            for metrica, antes, depois in (
+                ("tempo", anterior["tempo_s"]["mediana"], medicao["tempo_s"]["mediana"]),
+                ("memoria", anterior["pico_memoria_mb"], medicao["pico_memoria_mb"]),
+            ):
+                razao = depois / antes if antes else None
+                linhas.append((tamanho, etapa, metrica, antes, depois, razao))
+                if razao is not None and razao > 1 + tolerancia:
+                    regressoes.append((tamanho, etapa, metrica, antes, depois, razao))
+    return linhas, regressoes
+
+
+def comparar(args):
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.atual, encoding="utf-8") as f:
+        atual = json.load(f)
+    linhas, regressoes = comparar_resultados(base, atual, args.tolerancia)
+    for tamanho, etapa, metrica, antes, depois, razao in linhas:
+        marca = "  <-- regressão" if (tamanho, etapa, metrica, antes, depois, razao) in regressoes else ""
+        razao_txt = f"{razao:.2f}x" if razao is not None else "-"
+        print(f"{tamanho:>8} {etapa:<32} {metrica:<8} {antes:>12.4f} {depois:>12.4f} {razao_txt:>7}{marca}")
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}.")
+        sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos críticos do app")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    p_executar = subparsers.add_parser("executar")
+    p_executar.add_argument("--tamanhos", default="10000,100000,1000000")
+    p_executar.add_argument("--etapas", default=None, help="Lista separada por vírgulas (padrão: todas)")
+    p_executar.add_argument("--repeticoes", type=int, default=3)
+    p_executar.add_argument("--orcamento", type=float, default=30.0,
+                            help="Tempo máximo (s) de repetições por etapa")
+    p_executar.add_argument("--max-linhas-xlsx", type=int, default=100000,
+                            help="Acima deste tamanho, carregar_dados (xlsx) não é medido")
+    p_executar.add_argument("--semente", type=int, default=0)
+    p_executar.add_argument("--saida", default=None)
+    p_executar.set_defaults(funcao=executar)
+
+    p_comparar = subparsers.add_parser("comparar")
+    p_comparar.add_argument("base")
+    p_comparar.add_argument("atual")
+    p_comparar.add_argument("--tolerancia", type=float, default=0.15)
+    p_comparar.set_defaults(funcao=comparar)
+
+    args = parser.parse_args(argv)
+    args.funcao(args)
+
+
+if __name__ == "__main__":
+    main()
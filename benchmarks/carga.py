@@ -0,0 +1,175 @@
+"""Teste de carga ponta a ponta dos fluxos de pergunta e de assertivas.
+
+Sobe o servidor mock (ou usa --base-url) e dispara N sessões simuladas
+concorrentes contra as funções do app, sem chamar a API real.
+
+Uso:
+    python -m benchmarks.carga --sessoes 20 --acoes-por-sessao 10 \\
+        --latencia lognormal:-1.5,0.5 --taxa-malformado 0.2 --saida carga.json
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import streamlit.logger
+
+from benchmarks import servidor_mock
+
+PERGUNTAS_EXEMPLO = [
+    "Quais são as principais teses sobre direito tributário julgadas em 2023?",
+    "Resumir os informativos sobre direito administrativo com repercussão geral reconhecida.",
+    "Explicar a tese do informativo sobre matéria constitucional.",
+    "O que o STF decidiu sobre imunidade tributária recíproca?",
+    "Quais decisões tratam de concurso público e nomeação de aprovados?",
+    "Como o STF entende a competência legislativa dos estados sobre trânsito?",
+]
+
+# Fallbacks para simulação são detectados por thread: cada sessão marca se a
+# função simulada foi chamada durante a ação corrente
+_local = threading.local()
+
+
+def _instrumentar_fallbacks(app):
+    original_resposta = app.simular_resposta
+    original_assertivas = app.gerar_assertivas_simuladas
+
+    def simular_resposta(*args, **kwargs):
+        _local.fallback = True
+        return original_resposta(*args, **kwargs)
+
+    def gerar_assertivas_simuladas(*args, **kwargs):
+        _local.fallback = True
+        return original_assertivas(*args, **kwargs)
+
+    app.simular_resposta = simular_resposta
+    app.gerar_assertivas_simuladas = gerar_assertivas_simuladas
+
+
+def _executar_sessao(app, df, materias, id_sessao, acoes_por_sessao, proporcao_perguntas, semente):
+    rng = random.Random(semente * 7919 + id_sessao)
+    resultados = []
+    for _ in range(acoes_por_sessao):
+        _local.fallback = False
+        if rng.random() < proporcao_perguntas:
+            fluxo = "pergunta"
+            inicio = time.perf_counter()
+            app.obter_resposta_chatgpt(rng.choice(PERGUNTAS_EXEMPLO), df)
+        else:
+            fluxo = "assertivas"
+            selecao = ["Todas"] if rng.random() < 0.5 else rng.sample(materias, min(2, len(materias)))
+            inicio = time.perf_counter()
+            app.gerar_assertivas_api(df, selecao, num_assertivas=5)
+        resultados.append((fluxo, time.perf_counter() - inicio, _local.fallback))
+    return resultados
+
+
+def _percentis(latencias):
+    if not latencias:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(np.asarray(latencias) * 1000.0, [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)}
+
+
+# Função para agregar as medições por fluxo
+def resumir(resultados, duracao_total):
+    relatorio = {"duracao_s": round(duracao_total, 3), "fluxos": {}}
+    for fluxo in sorted({r[0] for r in resultados}):
+        do_fluxo = [r for r in resultados if r[0] == fluxo]
+        latencias = [r[1] for r in do_fluxo]
+        fallbacks = sum(1 for r in do_fluxo if r[2])
+        relatorio["fluxos"][fluxo] = {
+            "acoes": len(do_fluxo),
+            "latencia_ms": _percentis(latencias),
+            "vazao_por_s": round(len(do_fluxo) / duracao_total, 3) if duracao_total else None,
+            "taxa_fallback": round(fallbacks / len(do_fluxo), 4),
+        }
+    relatorio["total"] = {
+        "acoes": len(resultados),
+        "latencia_ms": _percentis([r[1] for r in resultados]),
+        "vazao_por_s": round(len(resultados) / duracao_total, 3) if duracao_total else None,
+        "taxa_fallback": round(sum(1 for r in resultados if r[2]) / len(resultados), 4) if resultados else None,
+    }
+    return relatorio
+
+
+def executar(args):
+    streamlit.logger.set_log_level("error")
+    import app  # importado aqui para não executar set_page_config em outros usos do módulo
+    import cliente_openai
+
+    servidor = None
+    base_url = args.base_url
+    if not base_url:
+        servidor, base_url = servidor_mock.iniciar_em_segundo_plano(servidor_mock.configuracao_de_argumentos(args))
+
+    # Nunca usa a chave real: o app passa a apontar para o mock durante o teste
+    app.configurar_openai = lambda: cliente_openai.obter_cliente("chave-mock", base_url)
+    _instrumentar_fallbacks(app)
+
+    df = app.carregar_dados()
+    if df is None:
+        raise SystemExit("Não foi possível carregar os dados.")
+    materias = sorted(df["Matéria"].dropna().unique())
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessoes) as executor:
+        futuros = [
+            executor.submit(_executar_sessao, app, df, materias, i, args.acoes_por_sessao,
+                            args.proporcao_perguntas, args.semente)
+            for i in range(args.sessoes)
+        ]
+        resultados = [r for f in futuros for r in f.result()]
+    duracao = time.perf_counter() - inicio
+
+    relatorio = resumir(resultados, duracao)
+    relatorio["parametros"] = {
+        "sessoes": args.sessoes,
+        "acoes_por_sessao": args.acoes_por_sessao,
+        "proporcao_perguntas": args.proporcao_perguntas,
+        "latencia": args.latencia,
+        "taxa_erro_429": args.taxa_erro_429,
+        "taxa_erro_500": args.taxa_erro_500,
+        "taxa_malformado": args.taxa_malformado,
+        "base_url": base_url,
+    }
+    if servidor is not None:
+        relatorio["servidor"] = dict(servidor.RequestHandlerClass.estado.contagem_por_desfecho)
+        servidor.shutdown()
+    cliente_openai.fechar_clientes()
+    return relatorio
+
+
+def _argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga dos fluxos de pergunta e assertivas")
+    parser.add_argument("--sessoes", type=int, default=10)
+    parser.add_argument("--acoes-por-sessao", type=int, default=5)
+    parser.add_argument("--proporcao-perguntas", type=float, default=0.5)
+    parser.add_argument("--base-url", default=None, help="Usa um servidor mock já em execução")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON para o relatório")
+    parser.add_argument("--latencia", default="lognormal:-1.5,0.5")
+    parser.add_argument("--taxa-erro-429", type=float, default=0.0)
+    parser.add_argument("--taxa-erro-500", type=float, default=0.0)
+    parser.add_argument("--taxa-travamento", type=float, default=0.0)
+    parser.add_argument("--duracao-travamento", type=float, default=120.0)
+    parser.add_argument("--taxa-malformado", type=float, default=0.0)
+    parser.add_argument("--atraso-por-token", type=float, default=0.0)
+    parser.add_argument("--semente", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _argumentos(argv)
+    relatorio = executar(args)
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    print(texto)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+
+
+if __name__ == "__main__":
+    main()
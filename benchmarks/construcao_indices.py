@@ -0,0 +1,64 @@
+"""Benchmark da construção paralela dos índices (construir-indices) por número de processos.
+
+Importa um corpus sintético num snapshot temporário e mede o tempo de
+indices.construir_indices para cada quantidade de processos, com o ganho
+em relação a um processo.
+
+Uso:
+    python -m benchmarks.construcao_indices --linhas 20000 --processos 1,2,4 --saida indices.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import indices
+import ingestao
+from benchmarks.corpus_sintetico import gerar_corpus
+
+
+def executar(args):
+    diretorio = tempfile.mkdtemp(prefix="stf_indices_")
+    try:
+        planilha = os.path.join(diretorio, "corpus.xlsx")
+        print(f"gerando corpus de {args.linhas} linhas...", file=sys.stderr)
+        gerar_corpus(args.linhas, args.semente).to_excel(planilha, index=False)
+        snapshots = os.path.join(diretorio, "snapshots")
+        ingestao.importar(planilha, snapshots, tamanho_bloco=args.tamanho_bloco)
+        caminho_versao = ingestao.caminho_snapshot_atual(snapshots)
+
+        resultado = {"linhas": args.linhas, "tamanho_bloco": args.tamanho_bloco, "cpus": os.cpu_count(),
+                     "resultados": {}}
+        base = None
+        for processos in [int(p) for p in args.processos.split(",")]:
+            tempos = indices.construir_indices(caminho_versao, processos)["tempos_s"]
+            base = base or tempos["total"]
+            tempos["ganho"] = round(base / tempos["total"], 2)
+            resultado["resultados"][str(processos)] = tempos
+            print(f"{processos} processo(s): {tempos['total']:.2f}s (ganho {tempos['ganho']:.2f}x)", file=sys.stderr)
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Escalabilidade da construção dos índices")
+    parser.add_argument("--linhas", type=int, default=20000)
+    parser.add_argument("--processos", default="1,2,4")
+    parser.add_argument("--tamanho-bloco", type=int, default=2000,
+                        help="Linhas por row group (cada row group é uma parte do trabalho)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default=None)
+    executar(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
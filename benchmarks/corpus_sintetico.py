@@ -0,0 +1,158 @@
+"""Gerador de corpus sintético no formato da planilha de informativos do STF.
+
+As frases e os valores categóricos são amostrados da planilha real (quando
+disponível), e os comprimentos de cada campo de texto seguem distribuições
+lognormais ajustadas ao corpus 2021-2025.
+
+Uso:
+    python -m benchmarks.corpus_sintetico --linhas 100000 --saida /tmp/corpus_100k.xlsx
+"""
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+ARQUIVO_REFERENCIA = "data/informativos_stf_2021_2025.xlsx"
+
+# (mu, sigma) do log do número de caracteres e taxa de nulos, medidos no corpus real
+DISTRIBUICOES_TEXTO = {
+    "Título": (4.463, 0.363, 0.002),
+    "Tese Julgado": (5.670, 0.958, 0.714),
+    "Resumo": (5.738, 0.475, 0.005),
+    "Matéria": (4.217, 0.974, 0.0),
+    "Legislação": (4.336, 0.783, 0.13),
+    "Notícia completa": (7.964, 0.539, 0.0),
+}
+LIMITES_TEXTO = (3, 20000)
+
+COLUNAS = ["Informativo", "Classe Processo", "Data Julgamento", "Título", "Tese Julgado", "Resumo",
+           "Ramo Direito", "Matéria", "Repercussão Geral", "Legislação", "Notícia completa"]
+
+# Valores usados quando a planilha de referência não está disponível
+_FRASES_PADRAO = [
+    "É inconstitucional lei estadual que disponha sobre matéria de competência privativa da União.",
+    "O Plenário, por maioria, julgou procedente o pedido formulado na ação direta.",
+    "A norma impugnada viola o princípio da separação dos Poderes (CF/1988, art. 2º).",
+    "Compete à União legislar privativamente sobre direito civil e processual (CF/1988, art. 22, I).",
+    "A imunidade tributária recíproca alcança as empresas públicas prestadoras de serviço público essencial.",
+    "O Tribunal fixou tese de repercussão geral nos termos do voto do relator.",
+    "Não há direito adquirido a regime jurídico, ressalvada a irredutibilidade de vencimentos.",
+    "A cobrança do ICMS sobre operações interestaduais depende de lei complementar.",
+]
+_CATEGORIAS_PADRAO = {
+    "Classe Processo": {"ADI": 769, "RE": 195, "ADPF": 151, "ARE": 41, "HC": 23, "ACO": 16, "RHC": 12, "ADC": 11},
+    "Repercussão Geral": {"Não": 1044, "Sim": 206},
+    "Ramo Direito": {"Direito Constitucional": 394, "Direito Administrativo;Direito Constitucional": 97,
+                     "Direito Administrativo": 95, "Direito Tributário": 94, "Direito Processual Penal": 34,
+                     "Direito Financeiro": 20, "Direito Previdenciário": 18},
+}
+
+
+class _Referencia:
+    def __init__(self, frases, categorias, informativos, datas):
+        self.frases = np.asarray(frases, dtype=object)
+        self.comprimentos = np.fromiter((len(f) for f in frases), dtype=np.int64, count=len(frases))
+        self.categorias = categorias
+        self.informativos = informativos
+        self.datas = datas
+
+
+def _carregar_referencia(arquivo):
+    if not arquivo or not os.path.exists(arquivo):
+        categorias = {
+            coluna: (np.array(list(contagens)), np.array(list(contagens.values()), dtype=float))
+            for coluna, contagens in _CATEGORIAS_PADRAO.items()
+        }
+        return _Referencia(_FRASES_PADRAO, categorias, (147, 1173), ("2021-01-01", "2025-04-30"))
+
+    real = pd.read_excel(arquivo)
+    frases = []
+    for coluna in ["Resumo", "Tese Julgado", "Notícia completa", "Legislação"]:
+        for texto in real[coluna].dropna().astype(str):
+            frases.extend(f for f in re.split(r"(?<=[.;!?])\s+", texto) if len(f) > 10)
+    categorias = {}
+    for coluna in ["Classe Processo", "Repercussão Geral", "Ramo Direito"]:
+        contagens = real[coluna].dropna().value_counts()
+        categorias[coluna] = (contagens.index.to_numpy(), contagens.to_numpy(dtype=float))
+    datas = pd.to_datetime(real["Data Julgamento"], format="%d/%m/%Y", errors="coerce").dropna()
+    return _Referencia(
+        sorted(set(frases)),
+        categorias,
+        (int(real["Informativo"].min()), int(real["Informativo"].max())),
+        (datas.min().strftime("%Y-%m-%d"), datas.max().strftime("%Y-%m-%d")),
+    )
+
+
+def _amostrar_categoria(rng, referencia, coluna, n):
+    valores, pesos = referencia.categorias[coluna]
+    return rng.choice(valores, size=n, p=pesos / pesos.sum())
+
+
+def _gerar_textos(rng, referencia, n, mu, sigma, taxa_nulos):
+    comprimentos = np.clip(np.exp(rng.normal(mu, sigma, size=n)), *LIMITES_TEXTO).astype(np.int64)
+    nulos = rng.random(n) < taxa_nulos
+    media_frase = max(1, int(referencia.comprimentos.mean()))
+    # Quantas frases cada texto precisa (com folga) para atingir o comprimento sorteado
+    quantidades = comprimentos // media_frase + 2
+    indices = rng.integers(0, len(referencia.frases), size=int(quantidades.sum()))
+    fins = np.cumsum(quantidades)
+    inicios = fins - quantidades
+    frases = referencia.frases
+    textos = np.empty(n, dtype=object)
+    for i in range(n):
+        if nulos[i]:
+            textos[i] = np.nan
+            continue
+        texto = " ".join(frases[indices[inicios[i]:fins[i]]])
+        textos[i] = texto[: comprimentos[i]]
+    return textos
+
+
+# Função para gerar um DataFrame sintético com n linhas (datas como texto "%d/%m/%Y",
+# como na planilha original)
+def gerar_corpus(n, semente=0, arquivo_referencia=ARQUIVO_REFERENCIA):
+    rng = np.random.default_rng(semente)
+    referencia = _carregar_referencia(arquivo_referencia)
+
+    inicio, fim = pd.Timestamp(referencia.datas[0]), pd.Timestamp(referencia.datas[1])
+    dias = rng.integers(0, (fim - inicio).days + 1, size=n)
+    datas = (inicio + pd.to_timedelta(np.sort(dias)[::-1], unit="D")).strftime("%d/%m/%Y")
+
+    # Números de informativo crescem com a data, com várias decisões por edição
+    primeiro, ultimo = referencia.informativos
+    escala = max(1, int(np.ceil(n / (ultimo - primeiro + 1))))
+    informativos = ultimo - np.arange(n) // escala
+
+    dados = {
+        "Informativo": informativos,
+        "Classe Processo": _amostrar_categoria(rng, referencia, "Classe Processo", n),
+        "Data Julgamento": np.asarray(datas, dtype=object),
+        "Ramo Direito": _amostrar_categoria(rng, referencia, "Ramo Direito", n),
+        "Repercussão Geral": _amostrar_categoria(rng, referencia, "Repercussão Geral", n),
+    }
+    for coluna, (mu, sigma, taxa_nulos) in DISTRIBUICOES_TEXTO.items():
+        dados[coluna] = _gerar_textos(rng, referencia, n, mu, sigma, taxa_nulos)
+    return pd.DataFrame(dados, columns=COLUNAS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um corpus sintético de informativos do STF")
+    parser.add_argument("--linhas", type=int, required=True)
+    parser.add_argument("--saida", required=True, help="Arquivo .xlsx, .parquet ou .csv")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = gerar_corpus(args.linhas, args.semente)
+    if args.saida.endswith(".parquet"):
+        df.to_parquet(args.saida, index=False)
+    elif args.saida.endswith(".csv"):
+        df.to_csv(args.saida, index=False)
+    else:
+        df.to_excel(args.saida, index=False)
+    print(f"{len(df)} linhas gravadas em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Benchmark headless da latência de interação, com o AppTest do Streamlit.
+
+Reproduz sequências de interações (mudar filtros, pesquisar, responder
+assertiva, paginar os cards...) contra o app.py, com a camada da OpenAI
+apontada para o servidor mock, e mede o tempo de parede e a memória alocada
+de cada rerun, para cada tamanho de corpus.
+
+Uso:
+    python -m benchmarks.interacoes --tamanhos real,10000,50000 --saida interacoes.json
+    python -m benchmarks.interacoes --sequencia minha_sequencia.json
+
+Formato de uma sequência (lista JSON de passos):
+    [{"nome": "mudar_ramo", "acao": "selecionar", "widget": "selectbox",
+      "rotulo": "Ramo do Direito", "valor": "@1"}, ...]
+"@N" seleciona a N-ésima opção do widget.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import streamlit.logger
+from streamlit.testing.v1 import AppTest
+
+from benchmarks import servidor_mock
+from benchmarks.corpus_sintetico import gerar_corpus
+
+ARQUIVO_APP = "app.py"
+
+SEQUENCIA_PADRAO = [
+    {"nome": "mudar_ramo", "acao": "selecionar", "widget": "selectbox", "rotulo": "Ramo do Direito", "valor": "@1"},
+    {"nome": "limpar_ramo", "acao": "selecionar", "widget": "selectbox", "rotulo": "Ramo do Direito", "valor": "@0"},
+    {"nome": "pesquisar_termo", "acao": "digitar", "widget": "text_input", "rotulo": "Pesquisar termo", "valor": "constitucional"},
+    {"nome": "modo_cards", "acao": "selecionar", "widget": "radio", "rotulo": "Modo de visualização:", "valor": "Cards de Leitura"},
+    {"nome": "virar_pagina", "acao": "definir", "widget": "number_input", "rotulo": "Página", "valor": 2},
+    {"nome": "responder_verdadeiro", "acao": "clicar", "widget": "button", "chave": "v_0"},
+    {"nome": "responder_falso", "acao": "clicar", "widget": "button", "chave": "f_1"},
+    {"nome": "gerar_novas_assertivas", "acao": "clicar", "widget": "button", "rotulo": "Gerar Novas Assertivas"},
+    {"nome": "digitar_pergunta", "acao": "digitar", "widget": "text_input",
+     "rotulo": "Digite sua pergunta sobre os informativos do STF:", "valor": "O que o STF decidiu sobre imunidade tributária?"},
+    {"nome": "enviar_pergunta", "acao": "clicar", "widget": "button", "rotulo": "Enviar Pergunta"},
+]
+
+
+def _localizar(at, passo):
+    elementos = getattr(at, passo["widget"])
+    if passo.get("chave"):
+        return elementos(key=passo["chave"])
+    for elemento in elementos:
+        if elemento.label == passo["rotulo"]:
+            return elemento
+    raise LookupError(f"Widget não encontrado: {passo['widget']} '{passo.get('rotulo')}'")
+
+
+def _aplicar(at, passo):
+    widget = _localizar(at, passo)
+    acao, valor = passo["acao"], passo.get("valor")
+    if acao == "clicar":
+        widget.click()
+    elif acao == "digitar":
+        widget.input(valor)
+    elif isinstance(valor, str) and valor.startswith("@"):
+        indice = int(valor[1:])
+        if passo["widget"] == "selectbox":
+            widget.select_index(indice)
+        else:
+            widget.set_value(widget.options[indice])
+    else:
+        widget.set_value(valor)
+
+
+def _novo_app(base_url, timeout):
+    at = AppTest.from_file(ARQUIVO_APP, default_timeout=timeout)
+    # A camada da OpenAI aponta para o mock local; nunca usa a chave real
+    at.secrets["openai"] = {"api_key": "chave-mock", "base_url": base_url}
+    return at
+
+
+def _executar(at, medir_memoria):
+    if medir_memoria:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+    inicio = time.perf_counter()
+    at.run()
+    duracao = time.perf_counter() - inicio
+    medicao = {"tempo_s": duracao}
+    if medir_memoria:
+        atual, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        medicao["pico_alocado_mb"] = (pico - base) / 2**20
+        medicao["retido_mb"] = (atual - base) / 2**20
+    if at.exception:
+        raise RuntimeError(f"Exceção no app: {at.exception[0].message}")
+    return medicao
+
+
+# Função para reproduzir uma sequência completa; retorna uma medição por passo
+def reproduzir(sequencia, base_url, medir_memoria=False, timeout=300):
+    at = _novo_app(base_url, timeout)
+    medicoes = {"carga_inicial": _executar(at, medir_memoria)}
+    for passo in sequencia:
+        try:
+            _aplicar(at, passo)
+        except LookupError as e:
+            print(f"  passo '{passo['nome']}' ignorado: {e}", file=sys.stderr)
+            continue
+        medicoes[passo["nome"]] = _executar(at, medir_memoria)
+    return medicoes
+
+
+def _resumir(execucoes_tempo, execucao_memoria):
+    resumo = {}
+    for nome in execucao_memoria:
+        tempos = [e[nome]["tempo_s"] for e in execucoes_tempo if nome in e]
+        resumo[nome] = {
+            "tempo_ms": {
+                "mediana": round(statistics.median(tempos) * 1000, 2),
+                "min": round(min(tempos) * 1000, 2),
+                "max": round(max(tempos) * 1000, 2),
+            },
+            "pico_alocado_mb": round(execucao_memoria[nome]["pico_alocado_mb"], 3),
+            "retido_mb": round(execucao_memoria[nome]["retido_mb"], 3),
+        }
+    return resumo
+
+
+def _preparar_corpus(tamanho, diretorio):
+    if tamanho == "real":
+        return None
+    caminho = os.path.join(diretorio, f"corpus_{tamanho}.parquet")
+    gerar_corpus(int(tamanho)).to_parquet(caminho, index=False)
+    return caminho
+
+
+def executar(args):
+    streamlit.logger.set_log_level("error")
+    sequencia = SEQUENCIA_PADRAO
+    if args.sequencia:
+        with open(args.sequencia, encoding="utf-8") as f:
+            sequencia = json.load(f)
+
+    servidor, base_url = servidor_mock.iniciar_em_segundo_plano(servidor_mock.ConfiguracaoMock(semente=args.semente))
+    diretorio = tempfile.mkdtemp(prefix="stf_interacoes_")
+    # Histórico das assertivas num arquivo temporário: o benchmark não grava no histórico do app
+    os.environ["STF_HISTORICO"] = os.path.join(diretorio, "historico_assertivas.sqlite3")
+    resultado = {"sequencia": [p["nome"] for p in sequencia], "resultados": {}}
+    try:
+        for tamanho in args.tamanhos.split(","):
+            caminho = _preparar_corpus(tamanho, diretorio)
+            if caminho:
+                os.environ["STF_ARQUIVO_DADOS"] = caminho
+            else:
+                os.environ.pop("STF_ARQUIVO_DADOS", None)
+            print(f"[{tamanho}] reproduzindo {len(sequencia)} passos...", file=sys.stderr)
+            # A primeira reprodução aquece os caches do processo (como num servidor já em uso)
+            reproduzir(sequencia, base_url, timeout=args.timeout)
+            execucoes = [reproduzir(sequencia, base_url, timeout=args.timeout) for _ in range(args.repeticoes)]
+            memoria = reproduzir(sequencia, base_url, medir_memoria=True, timeout=args.timeout)
+            resultado["resultados"][tamanho] = _resumir(execucoes, memoria)
+            for nome, medicao in resultado["resultados"][tamanho].items():
+                print(f"[{tamanho}] {nome}: {medicao['tempo_ms']['mediana']:.1f} ms, "
+                      f"{medicao['pico_alocado_mb']:.1f} MB", file=sys.stderr)
+    finally:
+        servidor.shutdown()
+        os.environ.pop("STF_ARQUIVO_DADOS", None)
+        os.environ.pop("STF_HISTORICO", None)
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latência de interação do app via AppTest")
+    parser.add_argument("--tamanhos", default="real,10000",
+                        help="'real' usa a planilha do repositório; números geram corpus sintético")
+    parser.add_argument("--sequencia", default=None, help="Arquivo JSON com a sequência de passos")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default=None)
+    executar(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
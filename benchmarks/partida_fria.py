@@ -0,0 +1,181 @@
+"""Benchmark da partida a frio do app: com e sem a fase de aquecimento (iniciar.py).
+
+Cada repetição roda num processo Python novo, como um deploy. São medidos, a
+partir do lançamento do processo:
+    pronto_s           processo pronto para atender (com aquecimento: após iniciar.aquecer)
+    primeira_interacao_s  fim do primeiro rerun completo do app.py (AppTest), ou seja,
+                       o tempo até a primeira página interativa
+    segunda_interacao_s   fim de um segundo rerun, já com tudo em cache
+Com --servidor, mede também quando o health check (/_stcore/health) passa a
+responder para `streamlit run app.py` e para `python iniciar.py`.
+A camada da OpenAI aponta para o servidor mock; a chave real nunca é usada.
+
+Uso:
+    python -m benchmarks.partida_fria --repeticoes 3 --saida partida_fria.json
+    python -m benchmarks.partida_fria --servidor
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import iniciar
+from benchmarks import servidor_mock
+
+MODOS = ("sem_aquecimento", "com_aquecimento")
+METRICAS = ("pronto_s", "primeira_interacao_s", "segunda_interacao_s")
+
+
+# Processo filho: mede um modo e escreve os instantes (time.time) em JSON na saída
+def _filho(modo, base_url, timeout):
+    import streamlit.config
+    import streamlit.logger
+    from streamlit.testing.v1 import AppTest
+
+    streamlit.config.get_option("logger.level")
+    streamlit.logger.set_log_level("error")
+    instantes = {}
+    if modo == "com_aquecimento":
+        instantes["etapas_aquecimento_s"] = iniciar.aquecer()
+    instantes["pronto"] = time.time()
+    for rotulo in ("primeira_interacao", "segunda_interacao"):
+        at = AppTest.from_file(iniciar.ARQUIVO_APP, default_timeout=timeout)
+        at.secrets["openai"] = {"api_key": "chave-mock", "base_url": base_url}
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"Exceção no app: {at.exception[0].message}")
+        instantes[rotulo] = time.time()
+    print(json.dumps(instantes))
+
+
+def medir_modo(modo, base_url, timeout):
+    inicio = time.time()
+    processo = subprocess.run(
+        [sys.executable, "-m", "benchmarks.partida_fria", "--filho", modo, "--base-url", base_url,
+         "--timeout", str(timeout)],
+        capture_output=True, text=True, env={**os.environ, "OPENAI_API_KEY": "chave-mock"})
+    if processo.returncode != 0:
+        raise RuntimeError(f"Falha no modo {modo}: {processo.stderr.strip()[-2000:]}")
+    instantes = json.loads(processo.stdout.strip().splitlines()[-1])
+    medicao = {f"{rotulo}_s": round(instantes[rotulo] - inicio, 3)
+               for rotulo in ("pronto", "primeira_interacao", "segunda_interacao")}
+    if "etapas_aquecimento_s" in instantes:
+        medicao["etapas_aquecimento_s"] = instantes["etapas_aquecimento_s"]
+    return medicao
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Função para medir o tempo até o health check responder, para um comando de servidor
+def medir_servidor(comando, porta, timeout):
+    inicio = time.time()
+    processo = subprocess.Popen(comando, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                env={**os.environ, "OPENAI_API_KEY": "chave-mock"})
+    try:
+        while time.time() - inicio < timeout:
+            if processo.poll() is not None:
+                raise RuntimeError(f"O servidor terminou antes de responder: {' '.join(comando)}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{porta}/_stcore/health", timeout=1) as resposta:
+                    if resposta.status == 200:
+                        return round(time.time() - inicio, 3)
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.05)
+        raise TimeoutError(f"Sem resposta do health check em {timeout:.0f}s: {' '.join(comando)}")
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def _resumir(medicoes):
+    resumo = {}
+    for metrica in METRICAS:
+        valores = [m[metrica] for m in medicoes]
+        resumo[metrica] = {"mediana": round(statistics.median(valores), 3),
+                           "min": round(min(valores), 3), "max": round(max(valores), 3)}
+    if "etapas_aquecimento_s" in medicoes[0]:
+        resumo["etapas_aquecimento_s"] = {
+            etapa: round(statistics.median(m["etapas_aquecimento_s"][etapa] for m in medicoes), 3)
+            for etapa in medicoes[0]["etapas_aquecimento_s"]}
+    return resumo
+
+
+def executar(args):
+    # Histórico das assertivas num arquivo temporário, herdado pelos processos filhos:
+    # o benchmark não grava no histórico do app
+    os.environ["STF_HISTORICO"] = os.path.join(tempfile.mkdtemp(prefix="stf_partida_fria_"),
+                                               "historico_assertivas.sqlite3")
+    resultado = {
+        "arquivo_dados": os.environ.get("STF_ARQUIVO_DADOS"),
+        "importacao_app": [{"modulo": modulo, "tempo_s": round(segundos, 4)}
+                           for modulo, segundos in iniciar.perfil_importacao()],
+        "resultados": {},
+    }
+    print("Importação do app.py (mais lentos): " + ", ".join(
+        f"{item['modulo']} {item['tempo_s']:.2f}s" for item in resultado["importacao_app"][:5]), file=sys.stderr)
+
+    servidor, base_url = servidor_mock.iniciar_em_segundo_plano(servidor_mock.ConfiguracaoMock(semente=args.semente))
+    try:
+        for modo in MODOS:
+            medicoes = []
+            for repeticao in range(args.repeticoes):
+                medicoes.append(medir_modo(modo, base_url, args.timeout))
+                print(f"[{modo}] repetição {repeticao + 1}: pronto {medicoes[-1]['pronto_s']:.2f}s, "
+                      f"primeira interação {medicoes[-1]['primeira_interacao_s']:.2f}s, "
+                      f"segunda {medicoes[-1]['segunda_interacao_s']:.2f}s", file=sys.stderr)
+            resultado["resultados"][modo] = _resumir(medicoes)
+    finally:
+        servidor.shutdown()
+
+    if args.servidor:
+        resultado["health_check_s"] = {}
+        for nome, comando in (
+            ("streamlit_run", [sys.executable, "-m", "streamlit", "run", iniciar.ARQUIVO_APP,
+                               "--server.headless", "true", "--server.port", "{porta}"]),
+            ("iniciar", [sys.executable, "iniciar.py", "--porta", "{porta}"]),
+        ):
+            porta = _porta_livre()
+            comando = [parte.format(porta=porta) for parte in comando]
+            resultado["health_check_s"][nome] = medir_servidor(comando, porta, args.timeout)
+            print(f"[servidor] {nome}: health check em {resultado['health_check_s'][nome]:.2f}s", file=sys.stderr)
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partida a frio do app, com e sem aquecimento")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--servidor", action="store_true",
+                        help="Mede também o health check de streamlit run e de iniciar.py")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default=None)
+    parser.add_argument("--filho", choices=MODOS, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.filho:
+        _filho(args.filho, args.base_url, args.timeout)
+    else:
+        executar(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""Servidor local compatível com a API de chat da OpenAI, para testes de carga.
+
+Uso:
+    python -m benchmarks.servidor_mock --porta 8000 --latencia lognormal:-1.2,0.5 \\
+        --taxa-erro-429 0.02 --taxa-erro-500 0.01 --taxa-malformado 0.2
+
+Depois aponte o app para ele em .streamlit/secrets.toml:
+    [openai]
+    base_url = "http://127.0.0.1:8000/v1"
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Assertivas válidas devolvidas pelo servidor
+ASSERTIVAS_CANONICAS = [
+    {"texto": "O STF decidiu que é inconstitucional lei estadual que disponha sobre direito civil.",
+     "resposta": True, "explicacao": "Conforme Informativo 1173, compete privativamente à União legislar sobre direito civil."},
+    {"texto": "Segundo o STF, a imunidade recíproca não alcança empresas públicas prestadoras de serviço público.",
+     "resposta": False, "explicacao": "Conforme Informativo 1150, a imunidade alcança as prestadoras de serviço público essencial."},
+    {"texto": "O Plenário do STF firmou entendimento de que a repercussão geral dispensa o prequestionamento.",
+     "resposta": False, "explicacao": "Segundo o Informativo 1102, o prequestionamento continua exigível."},
+    {"texto": "É correto afirmar que, segundo o STF, o teto de gastos alcança as receitas próprias do Judiciário.",
+     "resposta": True, "explicacao": "Conforme Informativo 1173, as receitas próprias submetem-se ao limite."},
+    {"texto": "De acordo com o informativo 1099, a tese fixada em ADI tem eficácia contra todos.",
+     "resposta": True, "explicacao": "Conforme Informativo 1099, a decisão em controle concentrado tem eficácia erga omnes."},
+]
+
+_JSON_VALIDO = json.dumps(ASSERTIVAS_CANONICAS, ensure_ascii=False)
+
+# Respostas malformadas que exercitam os caminhos de erro de extrair_json e do parse
+PAYLOADS_MALFORMADOS = {
+    # Texto em volta do JSON: extrair_json deve recuperar a lista
+    "texto_em_volta": "Claro! Seguem as assertivas:\n" + _JSON_VALIDO + "\nBons estudos!",
+    # Bloco de código markdown
+    "bloco_markdown": "```json\n" + _JSON_VALIDO + "\n```",
+    # Literais Python (como no exemplo do prompt) -> JSONDecodeError
+    "literais_python": _JSON_VALIDO.replace("true", "True").replace("false", "False"),
+    # Vírgula sobrando -> JSONDecodeError
+    "virgula_sobrando": _JSON_VALIDO[:-1] + ",]",
+    # Resposta truncada (sem o ']') -> extrair_json não encontra lista
+    "truncado": _JSON_VALIDO[: len(_JSON_VALIDO) // 2],
+    # Objeto em vez de lista -> estrutura inválida
+    "objeto": json.dumps({"assertivas": ASSERTIVAS_CANONICAS}, ensure_ascii=False),
+    # Chaves erradas -> estrutura inválida
+    "chaves_erradas": json.dumps([{"assertiva": a["texto"], "gabarito": a["resposta"]} for a in ASSERTIVAS_CANONICAS], ensure_ascii=False),
+    # Lista vazia -> número inesperado de assertivas
+    "lista_vazia": "[]",
+    # Nenhum JSON
+    "sem_json": "Desculpe, não consigo gerar assertivas agora.",
+}
+
+RESPOSTA_PERGUNTA = (
+    "Com base nos informativos fornecidos, o STF entendeu que a matéria deve ser analisada "
+    "à luz da Constituição Federal, conforme a tese fixada no julgamento indicado no contexto."
+)
+
+
+# Função para interpretar a especificação de latência ("fixa:0.2", "uniforme:0.1,0.5",
+# "lognormal:mu,sigma", "exponencial:media" ou "zero")
+def interpretar_latencia(especificacao):
+    nome, _, parametros = especificacao.partition(":")
+    valores = [float(v) for v in parametros.split(",") if v]
+    if nome == "zero":
+        return lambda rng: 0.0
+    if nome == "fixa":
+        return lambda rng: valores[0]
+    if nome == "uniforme":
+        return lambda rng: rng.uniform(valores[0], valores[1])
+    if nome == "lognormal":
+        return lambda rng: rng.lognormvariate(valores[0], valores[1])
+    if nome == "exponencial":
+        return lambda rng: rng.expovariate(1.0 / valores[0])
+    raise ValueError(f"Distribuição de latência desconhecida: {especificacao}")
+
+
+class ConfiguracaoMock:
+    def __init__(self, latencia="zero", taxa_erro_429=0.0, taxa_erro_500=0.0, taxa_travamento=0.0,
+                 duracao_travamento=120.0, taxa_malformado=0.0, semente=0, atraso_por_token=0.0):
+        self.latencia = latencia
+        self.amostrar_latencia = interpretar_latencia(latencia)
+        self.taxa_erro_429 = taxa_erro_429
+        self.taxa_erro_500 = taxa_erro_500
+        self.taxa_travamento = taxa_travamento
+        self.duracao_travamento = duracao_travamento
+        self.taxa_malformado = taxa_malformado
+        self.semente = semente
+        self.atraso_por_token = atraso_por_token
+
+
+# Estado compartilhado entre as threads do servidor: contador de requisições para
+# derivar um gerador determinístico por requisição (mesma semente -> mesma sequência)
+class EstadoMock:
+    def __init__(self, config):
+        self.config = config
+        self.trava = threading.Lock()
+        self.contador = 0
+        self.contagem_por_desfecho = {}
+
+    def proximo_rng(self):
+        with self.trava:
+            self.contador += 1
+            n = self.contador
+        return random.Random(self.config.semente * 1_000_003 + n)
+
+    def registrar(self, desfecho):
+        with self.trava:
+            self.contagem_por_desfecho[desfecho] = self.contagem_por_desfecho.get(desfecho, 0) + 1
+
+
+def _contar_tokens(texto):
+    # Aproximação grosseira (~4 caracteres por token)
+    return max(1, math.ceil(len(texto) / 4))
+
+
+def _pede_assertivas(mensagens):
+    texto = " ".join(str(m.get("content", "")) for m in mensagens)
+    return "assertivas" in texto.lower() and "json" in texto.lower()
+
+
+class ManipuladorMock(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # mantém conexões keep-alive
+    estado = None  # definido em criar_servidor
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _enviar_json(self, status, corpo, cabecalhos=None):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._enviar_json(200, {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model"}]})
+        elif self.path.rstrip("/").endswith("/estatisticas"):
+            self._enviar_json(200, {"requisicoes": self.estado.contador, "desfechos": self.estado.contagem_por_desfecho})
+        else:
+            self._enviar_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._enviar_json(404, {"error": {"message": "not found"}})
+            return
+
+        config = self.estado.config
+        rng = self.estado.proximo_rng()
+        time.sleep(config.amostrar_latencia(rng))
+
+        sorteio = rng.random()
+        if sorteio < config.taxa_erro_429:
+            self.estado.registrar("erro_429")
+            self._enviar_json(429, {"error": {"message": "Rate limit (mock)", "type": "rate_limit_exceeded"}},
+                              {"Retry-After": "0"})
+            return
+        sorteio -= config.taxa_erro_429
+        if sorteio < config.taxa_erro_500:
+            self.estado.registrar("erro_500")
+            self._enviar_json(500, {"error": {"message": "Internal error (mock)", "type": "server_error"}})
+            return
+        sorteio -= config.taxa_erro_500
+        if sorteio < config.taxa_travamento:
+            # Simula um upstream lento; o cliente deve estourar o timeout de leitura
+            self.estado.registrar("travamento")
+            time.sleep(config.duracao_travamento)
+            self._enviar_json(504, {"error": {"message": "Gateway timeout (mock)"}})
+            return
+
+        mensagens = corpo.get("messages", [])
+        if _pede_assertivas(mensagens):
+            if rng.random() < config.taxa_malformado:
+                tipo = rng.choice(sorted(PAYLOADS_MALFORMADOS))
+                conteudo = PAYLOADS_MALFORMADOS[tipo]
+                self.estado.registrar(f"assertivas_{tipo}")
+            else:
+                conteudo = _JSON_VALIDO
+                self.estado.registrar("assertivas_validas")
+        else:
+            conteudo = RESPOSTA_PERGUNTA
+            self.estado.registrar("resposta")
+
+        max_tokens = corpo.get("max_tokens")
+        if max_tokens and _contar_tokens(conteudo) > max_tokens:
+            conteudo = conteudo[: max_tokens * 4]
+            motivo_fim = "length"
+        else:
+            motivo_fim = "stop"
+
+        tokens_prompt = sum(_contar_tokens(str(m.get("content", ""))) for m in mensagens)
+        tokens_resposta = _contar_tokens(conteudo)
+        if config.atraso_por_token:
+            time.sleep(config.atraso_por_token * tokens_resposta)
+
+        identificador = f"chatcmpl-mock-{self.estado.contador}"
+        modelo = corpo.get("model", "gpt-3.5-turbo")
+        criado = int(time.time())
+
+        if corpo.get("stream"):
+            self._enviar_stream(identificador, modelo, criado, conteudo, motivo_fim)
+            return
+
+        self._enviar_json(200, {
+            "id": identificador,
+            "object": "chat.completion",
+            "created": criado,
+            "model": modelo,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": conteudo},
+                "finish_reason": motivo_fim,
+            }],
+            "usage": {
+                "prompt_tokens": tokens_prompt,
+                "completion_tokens": tokens_resposta,
+                "total_tokens": tokens_prompt + tokens_resposta,
+            },
+        })
+
+    def _enviar_stream(self, identificador, modelo, criado, conteudo, motivo_fim):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def _evento(delta, fim=None):
+            pedaco = {
+                "id": identificador,
+                "object": "chat.completion.chunk",
+                "created": criado,
+                "model": modelo,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": fim}],
+            }
+            self.wfile.write(f"data: {json.dumps(pedaco, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        _evento({"role": "assistant", "content": ""})
+        tamanho_pedaco = 16
+        for i in range(0, len(conteudo), tamanho_pedaco):
+            _evento({"content": conteudo[i:i + tamanho_pedaco]})
+            if self.estado.config.atraso_por_token:
+                time.sleep(self.estado.config.atraso_por_token)
+        _evento({}, motivo_fim)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+# Função para criar o servidor (porta=0 escolhe uma porta livre)
+def criar_servidor(config, host="127.0.0.1", porta=0):
+    manipulador = type("ManipuladorConfigurado", (ManipuladorMock,), {"estado": EstadoMock(config)})
+    servidor = ThreadingHTTPServer((host, porta), manipulador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+# Função para iniciar o servidor em uma thread de fundo; retorna (servidor, base_url)
+def iniciar_em_segundo_plano(config, host="127.0.0.1", porta=0):
+    servidor = criar_servidor(config, host, porta)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    host, porta = servidor.server_address[:2]
+    return servidor, f"http://{host}:{porta}/v1"
+
+
+def _argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor mock compatível com a API de chat da OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--latencia", default="lognormal:-1.5,0.5",
+                        help="zero | fixa:S | uniforme:A,B | lognormal:MU,SIGMA | exponencial:MEDIA")
+    parser.add_argument("--taxa-erro-429", type=float, default=0.0)
+    parser.add_argument("--taxa-erro-500", type=float, default=0.0)
+    parser.add_argument("--taxa-travamento", type=float, default=0.0)
+    parser.add_argument("--duracao-travamento", type=float, default=120.0)
+    parser.add_argument("--taxa-malformado", type=float, default=0.0)
+    parser.add_argument("--atraso-por-token", type=float, default=0.0)
+    parser.add_argument("--semente", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def configuracao_de_argumentos(args):
+    return ConfiguracaoMock(
+        latencia=args.latencia,
+        taxa_erro_429=args.taxa_erro_429,
+        taxa_erro_500=args.taxa_erro_500,
+        taxa_travamento=args.taxa_travamento,
+        duracao_travamento=args.duracao_travamento,
+        taxa_malformado=args.taxa_malformado,
+        semente=args.semente,
+        atraso_por_token=args.atraso_por_token,
+    )
+
+
+def main(argv=None):
+    args = _argumentos(argv)
+    servidor = criar_servidor(configuracao_de_argumentos(args), args.host, args.porta)
+    print(f"Servidor mock ouvindo em http://{args.host}:{servidor.server_address[1]}/v1")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
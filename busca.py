@@ -0,0 +1,566 @@
+import datetime
+import re
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+# Campos de texto indexados (os mesmos da pesquisa por termo da barra lateral)
+CAMPOS_TEXTO = ["Título", "Resumo", "Matéria", "Tese Julgado", "Legislação", "Notícia completa"]
+
+# Facetas com poucos valores: um bitset (compactado com np.packbits) por valor.
+# "Ramo Direito" é multivalorado ("Direito Administrativo;Direito Constitucional").
+FACETAS = {
+    "ramo": ("Ramo Direito", ";"),
+    "classe": ("Classe Processo", None),
+    "repercussao": ("Repercussão Geral", None),
+}
+# Matéria tem centenas de valores: guardada como códigos inteiros por linha
+CAMPO_MATERIA = "Matéria"
+# Matéria das linhas sem matéria (dados.preparar_dados; os índices prontos usam o mesmo valor)
+MATERIA_PADRAO = "Não especificada"
+CAMPOS_INTERVALO = ("ano", "data", "informativo")
+
+# Busca aproximada (termos sem nenhuma ocorrência): candidatos por trigramas do vocabulário,
+# limitados antes do cálculo da distância de edição para manter a consulta em poucos ms
+DISTANCIA_MAXIMA = 2
+LIMITE_CANDIDATOS = 200
+LIMITE_EXPANSOES = 10
+LIMITE_CACHE_EXPANSOES = 10000
+
+_PADRAO_PALAVRA = re.compile(r"\w+")
+_PADRAO_CONSULTA = re.compile(r'(?P<neg>-)?(?:(?P<campo>[^\W\d_]+):)?(?:"(?P<frase>[^"]*)"?|(?P<valor>\S+))')
+
+
+def normalizar(texto):
+    # Minúsculas e sem acentos (a decomposição NFKD separa os diacríticos, descartados no ASCII)
+    return unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii").lower()
+
+
+def palavras(texto):
+    return _PADRAO_PALAVRA.findall(normalizar(texto))
+
+
+def _trigramas(palavra):
+    marcada = f"${palavra}$"
+    return {marcada[i:i + 3] for i in range(len(marcada) - 2)}
+
+
+# Distância de edição permitida conforme o tamanho do termo (termos curtos casariam com tudo)
+def _distancia_permitida(termo):
+    if len(termo) <= 3:
+        return 0
+    return 1 if len(termo) <= 6 else DISTANCIA_MAXIMA
+
+
+# Função para calcular a distância de Levenshtein, interrompendo assim que passar do limite
+def distancia_edicao(a, b, limite):
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            atual[j] = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb))
+        if min(atual) > limite:
+            return limite + 1
+        anterior = atual
+    return anterior[-1]
+
+
+class ErroConsulta(ValueError):
+    pass
+
+
+# Função para interpretar a consulta em condições. Sintaxe:
+#   ramo:tributário  classe:RE  materia:"imunidade tributária"  repercussao:sim
+#   ano:2023  ano:2021..2023  data:01/03/2023..30/06/2023  informativo:1100..1120
+#   "imunidade recíproca" (frase)   icms (termo)   -icms / -classe:ADI (negação)
+def interpretar(consulta):
+    condicoes = []
+    for m in _PADRAO_CONSULTA.finditer(consulta or ""):
+        negada = bool(m.group("neg"))
+        campo = normalizar(m.group("campo")) if m.group("campo") else None
+        valor = m.group("frase") if m.group("frase") is not None else m.group("valor")
+        if campo and campo not in FACETAS and campo != "materia" and campo not in CAMPOS_INTERVALO:
+            # Campo desconhecido: trata "campo:valor" como texto
+            valor, campo = f"{m.group('campo')}:{valor}", None
+        if campo in CAMPOS_INTERVALO:
+            condicoes.append({"tipo": "intervalo", "campo": campo, "valor": _intervalo(campo, valor), "negada": negada})
+        elif campo:
+            if normalizar(valor).strip():
+                condicoes.append({"tipo": "faceta", "campo": campo, "valor": normalizar(valor).strip(), "negada": negada})
+        else:
+            termos = palavras(valor)
+            if len(termos) == 1 and m.group("frase") is None:
+                condicoes.append({"tipo": "termo", "valor": termos[0], "negada": negada})
+            elif termos:
+                condicoes.append({"tipo": "frase", "valor": termos, "negada": negada})
+    return condicoes
+
+
+def _data(texto, fim):
+    texto = texto.strip()
+    if re.fullmatch(r"\d{4}", texto):
+        return datetime.date(int(texto), 12, 31) if fim else datetime.date(int(texto), 1, 1)
+    for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ErroConsulta(f"Data inválida: {texto}")
+
+
+def _intervalo(campo, valor):
+    inicio, _, fim = valor.partition("..")
+    fim = fim if _ else inicio
+    if campo == "informativo":
+        try:
+            return (int(inicio) if inicio else None, int(fim) if fim else None)
+        except ValueError:
+            raise ErroConsulta(f"Número de informativo inválido: {valor}")
+    if campo == "ano" and not all(re.fullmatch(r"\d{4}", p) for p in (inicio, fim) if p):
+        raise ErroConsulta(f"Ano inválido: {valor}")
+    return (_data(inicio, False) if inicio else None, _data(fim, True) if fim else None)
+
+
+def _dias(data):
+    return (np.datetime64(data, "D") - np.datetime64("1970-01-01", "D")).astype(np.int64)
+
+
+# Função para extrair as ocorrências das palavras nos campos de texto, uma passada por linha.
+# Retorna um dict com o vocabulário ordenado ("chaves"), os pares únicos (id da palavra, linha)
+# ordenados por palavra e linha ("ids", "posicoes"; inicio desloca as linhas: parte de um
+# DataFrame maior) e as posições de cada palavra no fluxo de tokens da parte ("tokens_ids",
+# "tokens_posicoes"), com o início de cada campo no fluxo em "campos_tokens" (campo f da
+# linha r no índice r * len(CAMPOS_TEXTO) + f; o último elemento é o tamanho do fluxo). Cada
+# campo termina numa posição vazia, de modo que uma frase não atravessa campos nem linhas.
+def ocorrencias_textos(df, inicio=0):
+    ids_locais = {}
+    fluxo = []
+    campos_tokens = [0]
+    colunas = [df[coluna].fillna("").astype(str) for coluna in CAMPOS_TEXTO]
+    for textos in zip(*colunas):
+        for texto in textos:
+            fluxo.extend([ids_locais.setdefault(palavra, len(ids_locais)) for palavra in palavras(texto)])
+            fluxo.append(-1)
+            campos_tokens.append(len(fluxo))
+    vocabulario = sorted(ids_locais)
+    # id local (ordem de aparição) -> id no vocabulário ordenado
+    ranking = np.empty(len(vocabulario), dtype=np.int32)
+    ranking[[ids_locais[palavra] for palavra in vocabulario]] = np.arange(len(vocabulario), dtype=np.int32)
+    fluxo = np.asarray(fluxo, dtype=np.int64)
+    campos_tokens = np.asarray(campos_tokens, dtype=np.int64)
+    tokens_posicoes = np.flatnonzero(fluxo >= 0)
+    tokens_ids = ranking[fluxo[tokens_posicoes]]
+    ordem = np.argsort(tokens_ids, kind="stable")
+    tokens_ids, tokens_posicoes = tokens_ids[ordem], tokens_posicoes[ordem]
+    # Dentro de cada palavra as posições estão em ordem, e as linhas também: o primeiro token
+    # de cada (palavra, linha) representa o par
+    linhas = (np.searchsorted(campos_tokens, tokens_posicoes, side="right") - 1) // len(CAMPOS_TEXTO)
+    primeiros = np.flatnonzero(np.concatenate(([True], (tokens_ids[1:] != tokens_ids[:-1]) | (linhas[1:] != linhas[:-1])))) \
+        if len(tokens_ids) else np.empty(0, dtype=np.int64)
+    return {
+        "chaves": vocabulario,
+        "ids": tokens_ids[primeiros],
+        "posicoes": (linhas[primeiros] + inicio).astype(np.int32),
+        "tokens_ids": tokens_ids,
+        "tokens_posicoes": tokens_posicoes,
+        "campos_tokens": campos_tokens,
+    }
+
+
+# Função para agrupar pares (valor, linha) nas ocorrências de cada valor, no formato de
+# ocorrencias_textos sem o fluxo de tokens
+def _ocorrencias_valores(pares):
+    membros = defaultdict(list)
+    for valor, posicao in pares:
+        membros[valor].append(posicao)
+    chaves = sorted(membros)
+    posicoes = [np.unique(membros[chave]) for chave in chaves]
+    return {
+        "chaves": chaves,
+        "ids": np.repeat(np.arange(len(chaves), dtype=np.int32), [len(p) for p in posicoes]),
+        "posicoes": np.concatenate(posicoes).astype(np.int32) if chaves else np.empty(0, dtype=np.int32),
+    }
+
+
+# Função para extrair as ocorrências dos valores normalizados de cada faceta e da matéria
+# ("materia"; linhas sem matéria ficam com ""), no formato de ocorrencias_textos sem o fluxo
+# de tokens: campo -> {"chaves", "ids", "posicoes"}
+def ocorrencias_facetas(df, inicio=0):
+    resultado = {}
+    for campo, (coluna, separador) in FACETAS.items():
+        pares = []
+        for posicao, valor in enumerate(df[coluna], start=inicio):
+            if valor is None or valor != valor:
+                continue
+            for parte in (str(valor).split(separador) if separador else [str(valor)]):
+                if parte.strip():
+                    pares.append((normalizar(parte).strip(), posicao))
+        resultado[campo] = _ocorrencias_valores(pares)
+    materias = df[CAMPO_MATERIA].fillna("").map(normalizar)
+    resultado["materia"] = _ocorrencias_valores(zip(materias, range(inicio, inicio + len(df))))
+    return resultado
+
+
+# Função para restringir as ocorrências de uma parte (posições locais) às linhas `vigentes`
+# (ordenadas), renumeradas a partir de inicio. As chaves que só apareciam nas linhas
+# descartadas saem do vocabulário e o fluxo de tokens perde os trechos dessas linhas.
+def filtrar_ocorrencias(ocorrencias, vigentes, inicio=0):
+    vigentes = np.asarray(vigentes, dtype=np.int64)
+
+    # Ordem de cada linha entre as vigentes (e se ela é vigente)
+    def localizar(linhas):
+        ordem = np.searchsorted(vigentes, linhas)
+        mantidas = ordem < len(vigentes)
+        mantidas[mantidas] = vigentes[ordem[mantidas]] == linhas[mantidas]
+        return ordem, mantidas
+
+    ordem, mantidas = localizar(np.asarray(ocorrencias["posicoes"], dtype=np.int64))
+    ids = np.asarray(ocorrencias["ids"])[mantidas]
+    usadas = np.unique(ids)
+    resultado = {
+        "chaves": np.asarray(ocorrencias["chaves"], dtype=str)[usadas].tolist(),
+        "ids": np.searchsorted(usadas, ids).astype(np.int32),
+        "posicoes": (ordem[mantidas] + inicio).astype(np.int32),
+    }
+    if "tokens_ids" in ocorrencias:
+        campos = len(CAMPOS_TEXTO)
+        campos_tokens = np.asarray(ocorrencias["campos_tokens"], dtype=np.int64)
+        # Início de cada linha vigente no fluxo filtrado e o deslocamento das suas posições
+        tamanhos = np.diff(campos_tokens[::campos])[vigentes]
+        novos_inicios = np.concatenate(([0], np.cumsum(tamanhos))).astype(np.int64)
+        deslocamentos = novos_inicios[:-1] - campos_tokens[vigentes * campos]
+        tokens_posicoes = np.asarray(ocorrencias["tokens_posicoes"], dtype=np.int64)
+        linhas = (np.searchsorted(campos_tokens, tokens_posicoes, side="right") - 1) // campos
+        ordem, mantidos = localizar(linhas)
+        resultado["tokens_ids"] = np.searchsorted(usadas, np.asarray(ocorrencias["tokens_ids"])[mantidos]).astype(np.int32)
+        resultado["tokens_posicoes"] = tokens_posicoes[mantidos] + deslocamentos[ordem[mantidos]]
+        resultado["campos_tokens"] = np.concatenate([
+            (campos_tokens[vigentes[:, None] * campos + np.arange(campos)] + deslocamentos[:, None]).ravel(),
+            novos_inicios[-1:],
+        ])
+    return resultado
+
+
+# Função para montar os deslocamentos CSR a partir dos ids (ordenados) de cada ocorrência
+def deslocamentos_csr(ids, total_ids):
+    return np.concatenate([[0], np.cumsum(np.bincount(ids, minlength=total_ids))]).astype(np.int64)
+
+
+# Função para mesclar as ocorrências de partes consecutivas (cada uma com o seu vocabulário,
+# como as de ocorrencias_textos ou legislacao.ocorrencias_citacoes) num CSR por chave:
+# "chaves", "deslocamentos" e "posicoes" e, se as partes trazem o fluxo de tokens,
+# "tokens_deslocamentos", "tokens_posicoes" (deslocadas para o fluxo da parte) e "campos_tokens"
+def mesclar_ocorrencias(partes):
+    partes = list(partes)
+    chaves_partes = [np.asarray(parte["chaves"], dtype=str) for parte in partes]
+    chaves = np.unique(np.concatenate(chaves_partes)) if chaves_partes else np.empty(0, dtype=str)
+    mapas = [np.searchsorted(chaves, chaves_parte).astype(np.int32) for chaves_parte in chaves_partes]
+    # Estável: as partes estão em ordem de linha, então as posições de cada chave saem ordenadas
+    ids = np.concatenate([mapa[parte["ids"]] for mapa, parte in zip(mapas, partes)]) if partes \
+        else np.empty(0, dtype=np.int32)
+    posicoes = np.concatenate([parte["posicoes"] for parte in partes]) if partes else np.empty(0, dtype=np.int32)
+    ordem = np.argsort(ids, kind="stable")
+    csr = {"chaves": chaves.tolist(), "deslocamentos": deslocamentos_csr(ids[ordem], len(chaves)),
+           "posicoes": posicoes[ordem]}
+    if partes and "tokens_ids" in partes[0]:
+        inicio = 0
+        tokens_ids = []
+        tokens_posicoes = []
+        campos_tokens = [np.zeros(1, dtype=np.int64)]
+        for mapa, parte in zip(mapas, partes):
+            tokens_ids.append(mapa[parte["tokens_ids"]])
+            tokens_posicoes.append(parte["tokens_posicoes"] + inicio)
+            campos_tokens.append(parte["campos_tokens"][1:] + inicio)
+            inicio += int(parte["campos_tokens"][-1])
+        tokens_ids = np.concatenate(tokens_ids)
+        ordem = np.argsort(tokens_ids, kind="stable")
+        csr["tokens_deslocamentos"] = deslocamentos_csr(tokens_ids[ordem], len(chaves))
+        csr["tokens_posicoes"] = np.concatenate(tokens_posicoes)[ordem]
+        csr["campos_tokens"] = np.concatenate(campos_tokens)
+    return csr
+
+
+# Função para indexar os trigramas do vocabulário ("$palavra$" -> ids das palavras) em CSR
+def trigramas_vocabulario(vocabulario):
+    grupos = defaultdict(list)
+    for id_palavra, palavra in enumerate(vocabulario):
+        for trigrama in _trigramas(palavra):
+            grupos[trigrama].append(id_palavra)
+    chaves = sorted(grupos)
+    ids = np.concatenate([np.asarray(grupos[t], dtype=np.int32) for t in chaves]) if chaves else np.empty(0, dtype=np.int32)
+    tamanhos = np.fromiter((len(grupos[t]) for t in chaves), dtype=np.int64, count=len(chaves))
+    return chaves, np.concatenate([[0], np.cumsum(tamanhos)]).astype(np.int64), ids
+
+
+class IndiceBusca:
+    # Índice da pesquisa da barra lateral e do contexto das perguntas: postings por palavra
+    # (CSR), posições de cada palavra no fluxo de tokens (frases), bitsets de facetas, códigos
+    # de matéria e colunas ordenadas para intervalos. As posições correspondem às linhas do DataFrame usado na
+    # construção. As partes textuais e as facetas (as mais caras) podem vir prontas do comando
+    # construir-indices ou da ingestão (ver indices.py), no formato de mesclar_ocorrencias.
+
+    def __init__(self, df, textos=None, trigramas=None, facetas=None):
+        self.total_linhas = len(df)
+
+        if textos is None:
+            textos = mesclar_ocorrencias([ocorrencias_textos(df)])
+        self.vocabulario = textos["chaves"]
+        self.deslocamentos = textos["deslocamentos"]
+        self.posicoes = textos["posicoes"]
+        self.tokens_deslocamentos = textos["tokens_deslocamentos"]
+        self.tokens_posicoes = textos["tokens_posicoes"]
+        self.campos_tokens = textos["campos_tokens"]
+        self.ids = {palavra: i for i, palavra in enumerate(self.vocabulario)}
+        # Vocabulário concatenado para localizar substrings sem percorrer a lista em Python
+        self._vocabulario_texto = "\n".join(self.vocabulario)
+        self._inicios = np.concatenate([[0], np.cumsum([len(p) + 1 for p in self.vocabulario])[:-1]]).astype(np.int64) \
+            if self.vocabulario else np.empty(0, dtype=np.int64)
+        self._expansoes = {}
+
+        # Trigramas do vocabulário -> ids das palavras, para a busca aproximada
+        chaves, deslocamentos, ids_trigramas = trigramas if trigramas is not None else trigramas_vocabulario(self.vocabulario)
+        self.trigramas = {chave: ids_trigramas[deslocamentos[i]:deslocamentos[i + 1]] for i, chave in enumerate(chaves)}
+        self.tamanhos_palavras = np.fromiter(map(len, self.vocabulario), dtype=np.int64, count=len(self.vocabulario))
+        self.frequencias = np.diff(self.deslocamentos)
+
+        if facetas is None:
+            facetas = {campo: mesclar_ocorrencias([ocorrencias]) for campo, ocorrencias in ocorrencias_facetas(df).items()}
+        self.facetas = {}
+        for campo in FACETAS:
+            csr = facetas[campo]
+            deslocamentos = csr["deslocamentos"]
+            # valor normalizado -> (bitset, quantidade de linhas)
+            self.facetas[campo] = {
+                valor: (self._bitset(csr["posicoes"][deslocamentos[i]:deslocamentos[i + 1]]),
+                        int(deslocamentos[i + 1] - deslocamentos[i]))
+                for i, valor in enumerate(csr["chaves"])
+            }
+
+        materias = facetas["materia"]
+        self.valores_materia = list(materias["chaves"])
+        self.contagem_materia = np.diff(materias["deslocamentos"])
+        self.codigos_materia = np.zeros(self.total_linhas, dtype=np.int64)
+        self.codigos_materia[materias["posicoes"]] = np.repeat(np.arange(len(self.valores_materia)), self.contagem_materia)
+
+        datas = pd.to_datetime(df["Data Julgamento"], format="%d/%m/%Y", errors="coerce")
+        dias = datas.to_numpy(dtype="datetime64[D]")
+        self.dias = np.where(np.isnat(dias), np.iinfo(np.int64).min, dias.astype(np.int64))
+        self.informativos = df["Informativo"].to_numpy(dtype=np.int64)
+        self._ordenados = {"data": np.sort(self.dias), "informativo": np.sort(self.informativos)}
+
+    def _bitset(self, posicoes):
+        mascara = np.zeros(self.total_linhas, dtype=bool)
+        mascara[posicoes] = True
+        return np.packbits(mascara)
+
+    def _testar_bits(self, bits, candidatos):
+        return (bits[candidatos >> 3] >> (7 - (candidatos & 7)).astype(np.uint8)) & 1 == 1
+
+    def _posting(self, id_palavra):
+        return self.posicoes[self.deslocamentos[id_palavra]:self.deslocamentos[id_palavra + 1]]
+
+    def _tokens(self, id_palavra):
+        return self.tokens_posicoes[self.tokens_deslocamentos[id_palavra]:self.tokens_deslocamentos[id_palavra + 1]]
+
+    # Função para achar as linhas em que as palavras aparecem em sequência, pelas posições no
+    # fluxo de tokens: parte da palavra mais rara e confere a vizinha esperada de cada início
+    # com uma busca binária nas posições (ordenadas) das demais
+    def _linhas_frase(self, ids):
+        ordem = sorted(range(len(ids)), key=lambda k: self.tokens_deslocamentos[ids[k] + 1] - self.tokens_deslocamentos[ids[k]])
+        inicios = np.asarray(self._tokens(ids[ordem[0]]), dtype=np.int64) - ordem[0]
+        inicios = inicios[inicios >= 0]
+        for k in ordem[1:]:
+            if len(inicios) == 0:
+                break
+            posicoes = self._tokens(ids[k])
+            achadas = np.searchsorted(posicoes, inicios + k)
+            existe = achadas < len(posicoes)
+            existe[existe] = posicoes[achadas[existe]] == inicios[existe] + k
+            inicios = inicios[existe]
+        campos = np.searchsorted(self.campos_tokens, inicios, side="right") - 1
+        return np.unique(campos // len(CAMPOS_TEXTO)).astype(np.int64)
+
+    # Palavras do vocabulário que contêm o termo (mantém a semântica de substring da pesquisa
+    # antiga); sem nenhuma, usa as palavras próximas por distância de edição. Retorna (ids, aproximada)
+    def expandir(self, termo):
+        expansao = self._expansoes.get(termo)
+        if expansao is None:
+            ocorrencias = [m.start() for m in re.finditer(re.escape(termo), self._vocabulario_texto)]
+            ids = np.unique(np.searchsorted(self._inicios, ocorrencias, side="right") - 1)
+            expansao = (ids, False) if len(ids) else (self.similares(termo), True)
+            if len(self._expansoes) >= LIMITE_CACHE_EXPANSOES:
+                self._expansoes.clear()
+            self._expansoes[termo] = expansao
+        return expansao
+
+    # Função para encontrar as palavras do vocabulário a até DISTANCIA_MAXIMA edições do termo.
+    # Pelo lema dos q-gramas, cada edição destrói no máximo 3 trigramas: palavras com menos
+    # trigramas em comum que isso são descartadas sem calcular a distância.
+    def similares(self, termo):
+        distancia = _distancia_permitida(termo)
+        trigramas = [self.trigramas[t] for t in _trigramas(termo) if t in self.trigramas]
+        if distancia == 0 or not trigramas:
+            return np.empty(0, dtype=np.int64)
+        contagens = np.bincount(np.concatenate(trigramas), minlength=len(self.vocabulario))
+        minimo = max(1, len(_trigramas(termo)) - 3 * distancia)
+        candidatos = np.flatnonzero(contagens >= minimo)
+        candidatos = candidatos[np.abs(self.tamanhos_palavras[candidatos] - len(termo)) <= distancia]
+        if len(candidatos) > LIMITE_CANDIDATOS:
+            candidatos = candidatos[np.argsort(-contagens[candidatos], kind="stable")[:LIMITE_CANDIDATOS]]
+        encontrados = []
+        for id_palavra in candidatos:
+            d = distancia_edicao(termo, self.vocabulario[id_palavra], distancia)
+            if d <= distancia:
+                encontrados.append((d, -self.frequencias[id_palavra], id_palavra))
+        encontrados.sort()
+        # Só as palavras na menor distância encontrada (um erro de digitação não traz as de 2 edições)
+        encontrados = [item for item in encontrados if item[0] == encontrados[0][0]]
+        return np.asarray([id_palavra for _, _, id_palavra in encontrados[:LIMITE_EXPANSOES]], dtype=np.int64)
+
+    # Função para pontuar as linhas por palavras-chave (contexto das perguntas): cada termo,
+    # expandido como na pesquisa, soma o peso de cada campo em que aparece. `pesos` vai do nome
+    # do campo ao peso; as colunas das facetas (ex.: "Ramo Direito") casam por substring do valor
+    def pontuar(self, termos, pesos):
+        pesos_campos = np.asarray([pesos.get(campo, 0) for campo in CAMPOS_TEXTO], dtype=np.float64)
+        facetas = [campo for campo, (coluna, _) in FACETAS.items() if pesos.get(coluna)]
+        pontuacao = np.zeros(self.total_linhas, dtype=np.float64)
+        for termo in termos:
+            ids, _ = self.expandir(termo)
+            if len(ids):
+                # Campos (linha, campo) distintos em que alguma das palavras expandidas aparece
+                posicoes = np.concatenate([self._tokens(id_palavra) for id_palavra in ids])
+                campos = np.unique(np.searchsorted(self.campos_tokens, posicoes, side="right") - 1)
+                pontuacao += np.bincount(campos // len(CAMPOS_TEXTO), weights=pesos_campos[campos % len(CAMPOS_TEXTO)],
+                                         minlength=self.total_linhas)
+            for campo in facetas:
+                bits = np.zeros((self.total_linhas + 7) // 8, dtype=np.uint8)
+                for valor, (bits_valor, _) in self.facetas[campo].items():
+                    if termo in valor:
+                        bits |= bits_valor
+                pontuacao += pesos[FACETAS[campo][0]] * np.unpackbits(bits, count=self.total_linhas)
+        return pontuacao
+
+    # Função para listar os termos da consulta corrigidos pela busca aproximada
+    def correcoes(self, consulta):
+        resultado = {}
+        for condicao in interpretar(consulta):
+            termos = [condicao["valor"]] if condicao["tipo"] == "termo" else \
+                [p for p in condicao["valor"] if p not in self.ids] if condicao["tipo"] == "frase" else []
+            for termo in termos:
+                ids, aproximada = self.expandir(termo)
+                if aproximada:
+                    resultado[termo] = [self.vocabulario[i] for i in ids]
+        return resultado
+
+    # Cada operação do plano: estimativa de linhas, função que materializa as posições
+    # e função que filtra um conjunto de candidatos
+    def _operacao(self, condicao):
+        tipo, valor = condicao["tipo"], condicao["valor"]
+        if tipo == "faceta" and condicao["campo"] == "materia":
+            codigos = np.flatnonzero([valor == v or valor in v for v in self.valores_materia])
+            exatos = [i for i in codigos if self.valores_materia[i] == valor]
+            codigos = np.asarray(exatos or codigos, dtype=np.int64)
+            estimativa = int(self.contagem_materia[codigos].sum())
+            return (estimativa, lambda: np.flatnonzero(np.isin(self.codigos_materia, codigos)),
+                    lambda c: np.isin(self.codigos_materia[c], codigos))
+        if tipo == "faceta":
+            valores = self.facetas[condicao["campo"]]
+            escolhidos = [v for v in valores if v == valor] or \
+                [v for v in valores if re.search(r"\b" + re.escape(valor), v)]
+            if not escolhidos:
+                vazio = np.empty(0, dtype=np.int64)
+                return 0, lambda: vazio, lambda c: np.zeros(len(c), dtype=bool)
+            bits = valores[escolhidos[0]][0]
+            for v in escolhidos[1:]:
+                bits = bits | valores[v][0]
+            estimativa = min(self.total_linhas, sum(valores[v][1] for v in escolhidos))
+            return (estimativa, lambda: np.flatnonzero(np.unpackbits(bits, count=self.total_linhas)),
+                    lambda c: self._testar_bits(bits, c))
+        if tipo == "intervalo":
+            campo = condicao["campo"]
+            inicio, fim = valor
+            if campo == "informativo":
+                coluna, ordenados = self.informativos, self._ordenados["informativo"]
+            else:
+                coluna, ordenados = self.dias, self._ordenados["data"]
+                inicio = _dias(inicio) if inicio else None
+                fim = _dias(fim) if fim else None
+            baixo = np.iinfo(np.int64).min + 1 if inicio is None else inicio
+            alto = np.iinfo(np.int64).max if fim is None else fim
+            estimativa = int(np.searchsorted(ordenados, alto, "right") - np.searchsorted(ordenados, baixo, "left"))
+            return (estimativa, lambda: np.flatnonzero((coluna >= baixo) & (coluna <= alto)),
+                    lambda c: (coluna[c] >= baixo) & (coluna[c] <= alto))
+        if tipo == "termo":
+            ids, _ = self.expandir(valor)
+            estimativa = min(self.total_linhas, int((self.deslocamentos[ids + 1] - self.deslocamentos[ids]).sum()))
+
+            def materializar():
+                if len(ids) == 0:
+                    return np.empty(0, dtype=np.int64)
+                return np.unique(np.concatenate([self._posting(i) for i in ids])).astype(np.int64)
+            return estimativa, materializar, lambda c: np.isin(c, materializar(), assume_unique=True)
+        # Frase: palavras consecutivas, pelas posições no fluxo de tokens (ver _linhas_frase).
+        # Palavra fora do vocabulário é trocada pela mais próxima (busca aproximada).
+        valor = [p if p in self.ids else next((self.vocabulario[i] for i in self.expandir(p)[0][:1]), p)
+                 for p in valor]
+        ids = [self.ids.get(p) for p in valor]
+        if any(i is None for i in ids):
+            vazio = np.empty(0, dtype=np.int64)
+            return 0, lambda: vazio, lambda c: np.zeros(len(c), dtype=bool)
+        linhas = []
+
+        def materializar():
+            if not linhas:
+                linhas.append(self._linhas_frase(ids))
+            return linhas[0]
+        estimativa = int(min(self.deslocamentos[i + 1] - self.deslocamentos[i] for i in ids))
+        return estimativa, materializar, lambda c: np.isin(c, materializar())
+
+    # Função para montar o plano: operações positivas por seletividade estimada
+    # (a mais seletiva materializa os candidatos) e negações ao final
+    def planejar(self, consulta):
+        plano = []
+        for condicao in interpretar(consulta):
+            estimativa, materializar, filtrar = self._operacao(condicao)
+            classe = 1 if condicao["negada"] else 0
+            plano.append({"condicao": condicao, "estimativa": estimativa, "classe": classe,
+                          "materializar": materializar, "filtrar": filtrar})
+        plano.sort(key=lambda op: (op["classe"], op["estimativa"]))
+        return plano
+
+    # Função para executar a consulta; candidatos restringe o resultado (ex.: filtros da barra lateral)
+    def buscar(self, consulta, candidatos=None):
+        plano = self.planejar(consulta)
+        if candidatos is not None:
+            candidatos = np.asarray(candidatos, dtype=np.int64)
+        positivas = [op for op in plano if op["classe"] == 0]
+        if positivas and (candidatos is None or positivas[0]["estimativa"] < len(candidatos)):
+            primeira = positivas.pop(0)
+            resultado = primeira["materializar"]()
+            if candidatos is not None:
+                resultado = np.intersect1d(resultado, candidatos, assume_unique=True)
+        elif candidatos is not None:
+            resultado = candidatos
+        else:
+            resultado = np.arange(self.total_linhas, dtype=np.int64)
+        for op in positivas + [op for op in plano if op["classe"] == 1]:
+            if len(resultado) == 0:
+                break
+            mascara = op["filtrar"](resultado)
+            resultado = resultado[~mascara if op["condicao"]["negada"] else mascara]
+        return resultado
+
+    # Descrição legível do plano (ordem de execução e estimativas)
+    def explicar(self, consulta):
+        descricoes = []
+        for op in self.planejar(consulta):
+            condicao = op["condicao"]
+            alvo = " ".join(condicao["valor"]) if condicao["tipo"] == "frase" else condicao["valor"]
+            if condicao["tipo"] in ("faceta", "intervalo"):
+                alvo = f"{condicao['campo']}={alvo}"
+            descricoes.append(f"{'NÃO ' if condicao['negada'] else ''}{condicao['tipo']} {alvo} (~{op['estimativa']})")
+        return descricoes
@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+# Tempos limite (em segundos) das chamadas à API
+TIMEOUT_CONEXAO = 5.0
+TIMEOUT_LEITURA = 60.0
+TIMEOUT_ESCRITA = 10.0
+TIMEOUT_POOL = 5.0
+
+# Pool de conexões compartilhado (keep-alive)
+MAX_CONEXOES = 20
+MAX_CONEXOES_KEEPALIVE = 10
+EXPIRACAO_KEEPALIVE = 30.0
+
+# Política de novas tentativas (backoff exponencial com jitter)
+MAX_TENTATIVAS = 4
+ESPERA_INICIAL = 0.5
+ESPERA_MAXIMA = 8.0
+
+# O SDK da OpenAI (e o httpx) só são importados na primeira chamada: a importação leva
+# mais da metade da partida do app e as sessões sem chave configurada nunca precisam dela
+def _openai():
+    import openai
+    return openai
+
+
+def _httpx():
+    import httpx
+    return httpx
+
+
+# Erros transitórios que justificam uma nova tentativa.
+# AuthenticationError, BadRequestError etc. são propagados imediatamente.
+def _erros_transitorios():
+    openai = _openai()
+    return (
+        openai.APIConnectionError,  # inclui APITimeoutError
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+
+# Atributos que dependem do SDK, resolvidos sob demanda (ex.: except cliente_openai.ErroAutenticacao)
+def __getattr__(nome):
+    if nome == "ERROS_TRANSITORIOS":
+        return _erros_transitorios()
+    if nome == "ErroAutenticacao":
+        return _openai().AuthenticationError
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+# Clientes síncronos compartilhados pelo processo, por (chave, base_url)
+_clientes = {}
+_trava_clientes = threading.Lock()
+
+
+def _timeout():
+    return _httpx().Timeout(
+        connect=TIMEOUT_CONEXAO,
+        read=TIMEOUT_LEITURA,
+        write=TIMEOUT_ESCRITA,
+        pool=TIMEOUT_POOL,
+    )
+
+
+def _limites(max_conexoes=MAX_CONEXOES):
+    return _httpx().Limits(
+        max_connections=max_conexoes,
+        max_keepalive_connections=min(MAX_CONEXOES_KEEPALIVE, max_conexoes),
+        keepalive_expiry=EXPIRACAO_KEEPALIVE,
+    )
+
+
+def _politica_tentativas():
+    return dict(
+        retry=retry_if_exception_type(_erros_transitorios()),
+        wait=wait_random_exponential(multiplier=ESPERA_INICIAL, max=ESPERA_MAXIMA),
+        stop=stop_after_attempt(MAX_TENTATIVAS),
+        reraise=True,
+    )
+
+
+# Função para obter o cliente compartilhado (criado uma única vez por processo)
+def obter_cliente(api_key, base_url=None):
+    # base_url=None deixa o SDK usar OPENAI_BASE_URL ou o endpoint oficial
+    chave = (api_key, base_url)
+    with _trava_clientes:
+        cliente = _clientes.get(chave)
+        if cliente is None:
+            cliente = _openai().OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=_timeout(),
+                max_retries=0,  # as novas tentativas ficam a cargo do tenacity
+                http_client=_httpx().Client(timeout=_timeout(), limits=_limites()),
+            )
+            _clientes[chave] = cliente
+    return cliente
+
+
+# Função para fechar os clientes compartilhados (ex.: ao final de um job)
+def fechar_clientes():
+    with _trava_clientes:
+        for cliente in _clientes.values():
+            cliente.close()
+        _clientes.clear()
+
+
+# Função para criar uma completion com novas tentativas. Se `detalhes` (dict) for
+# informado, recebe o número de tentativas feitas (ver telemetria.Chamada).
+def criar_chat_completion(cliente, detalhes=None, **parametros):
+    for tentativa in Retrying(**_politica_tentativas()):
+        with tentativa:
+            if detalhes is not None:
+                detalhes["tentativas"] = tentativa.retry_state.attempt_number
+            return cliente.chat.completions.create(**parametros)
+
+
+# Função para criar um cliente assíncrono (um por event loop / job em lote)
+def criar_cliente_async(api_key, base_url=None, max_conexoes=MAX_CONEXOES):
+    return _openai().AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=_timeout(),
+        max_retries=0,
+        http_client=_httpx().AsyncClient(timeout=_timeout(), limits=_limites(max_conexoes)),
+    )
+
+
+# Versão assíncrona de criar_chat_completion
+async def criar_chat_completion_async(cliente, detalhes=None, **parametros):
+    async for tentativa in AsyncRetrying(**_politica_tentativas()):
+        with tentativa:
+            if detalhes is not None:
+                detalhes["tentativas"] = tentativa.retry_state.attempt_number
+            return await cliente.chat.completions.create(**parametros)
+
+
+# Função para emitir várias completions em paralelo, limitadas por um semáforo.
+# Retorna os resultados na mesma ordem da entrada; em caso de falha definitiva,
+# a posição correspondente contém a exceção (como gather(return_exceptions=True)).
+async def criar_chat_completions_em_lote(cliente, lista_parametros, max_concorrencia=8):
+    semaforo = asyncio.Semaphore(max_concorrencia)
+
+    async def _executar(parametros):
+        async with semaforo:
+            try:
+                return await criar_chat_completion_async(cliente, **parametros)
+            except Exception as e:
+                return e
+
+    return await asyncio.gather(*(_executar(p) for p in lista_parametros))
+
+
+# Limitador de taxa para jobs em lote: espaça o início das requisições para não passar de
+# requisicoes_por_minuto (o limite de concorrência continua a cargo do semáforo)
+class LimitadorTaxa:
+    def __init__(self, requisicoes_por_minuto):
+        self.intervalo = 60.0 / requisicoes_por_minuto if requisicoes_por_minuto else 0.0
+        self.proximo = 0.0
+        self.trava = asyncio.Lock()
+
+    async def aguardar(self):
+        if not self.intervalo:
+            return
+        async with self.trava:
+            agora = time.monotonic()
+            espera = self.proximo - agora
+            self.proximo = max(agora, self.proximo) + self.intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
@@ -0,0 +1,128 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+import busca
+import duplicatas
+import historico
+import indices
+import ingestao
+import legislacao
+import metricas
+import resumos
+
+# Os recursos compartilhados do app ficam neste módulo (e não no app.py) para que o cache
+# seja o mesmo quando o Streamlit executa o app.py como __main__ e quando iniciar.py os
+# pré-carrega antes de abrir o servidor: a chave do st.cache_resource inclui o módulo.
+# Os recursos dos dados ficam só para o arquivo em uso (max_entries=VERSOES_EM_CACHE): cada
+# `importar`/`anexar` publica uma versão num diretório novo, e as antigas sairiam da memória
+# só ao reiniciar o processo.
+VERSOES_EM_CACHE = 1
+
+# Copy-on-write do pandas: o DataFrame carregado é compartilhado por todas as sessões
+# (st.cache_resource); seleções e colunas derivadas não copiam os dados até que alguém
+# os altere, e a alteração nunca chega ao objeto compartilhado
+pd.set_option("mode.copy_on_write", True)
+
+# Função para obter o caminho relativo do arquivo de dados: STF_ARQUIVO_DADOS (ex.: em
+# benchmarks), o snapshot gerado por `python ingestao.py importar` ou, na ausência dele, a
+# planilha original. O app a consulta a cada rerun, então uma nova versão ativada vale na hora.
+def arquivo_dados():
+    return (os.environ.get("STF_ARQUIVO_DADOS") or ingestao.caminho_snapshot_atual()
+            or 'data/informativos_stf_2021_2025.xlsx')
+
+ARQUIVO_DADOS = arquivo_dados()
+
+# Função para preparar o DataFrame lido da planilha (datas e colunas opcionais)
+def preparar_dados(df):
+    # Converter a coluna de data para datetime
+    df["Data Julgamento"] = pd.to_datetime(df["Data Julgamento"], format="%d/%m/%Y", errors="coerce")
+    
+    # Garantir que as novas colunas existam, preenchendo com NaN se não existirem
+    if 'Legislação' not in df.columns:
+        df['Legislação'] = pd.NA
+    if 'Notícia completa' not in df.columns:
+        df['Notícia completa'] = pd.NA
+        
+    # Garantir que a coluna Matéria exista e preencher NaNs
+    if 'Matéria' not in df.columns:
+        df['Matéria'] = busca.MATERIA_PADRAO
+    else:
+        df['Matéria'] = df['Matéria'].fillna(busca.MATERIA_PADRAO)
+        
+    return df
+
+# Função para carregar os dados (corrigida para Streamlit Cloud). O DataFrame é carregado
+# uma vez por processo e compartilhado, somente leitura, entre reruns e sessões: não deve
+# ser alterado no lugar (use seleções, assign etc., que o copy-on-write isola)
+@metricas.medido("carregar_dados")
+@st.cache_resource(show_spinner="Carregando os informativos...", max_entries=VERSOES_EM_CACHE)
+def carregar_dados(arquivo_final=ARQUIVO_DADOS):
+    try:
+        # Verificar se o arquivo existe
+        if not os.path.exists(arquivo_final):
+            st.error(f"Arquivo de dados não encontrado em: {arquivo_final}")
+            return None
+            
+        # Carregar o arquivo (snapshot versionado, Excel ou Parquet)
+        if os.path.isdir(arquivo_final):
+            df = preparar_dados(ingestao.ler_snapshot(arquivo_final))
+        elif arquivo_final.endswith(".parquet"):
+            df = preparar_dados(pd.read_parquet(arquivo_final))
+        else:
+            df = preparar_dados(pd.read_excel(arquivo_final))
+        
+        # Agrupar decisões quase duplicadas (o snapshot já traz os grupos calculados na ingestão)
+        if "ID Canônico" not in df.columns:
+            df["ID Canônico"] = duplicatas.ids_canonicos(df)
+        return df
+    except Exception as e:
+        st.error(f"Erro ao carregar os dados: {str(e)}")
+        return None
+
+# Função para obter o índice de citações legislativas (construído uma vez por arquivo de dados;
+# as posições do índice correspondem às linhas do DataFrame devolvido por carregar_dados)
+@metricas.medido("indice_citacoes")
+@st.cache_resource(show_spinner=False, max_entries=VERSOES_EM_CACHE)
+def obter_indice_citacoes(arquivo_final=ARQUIVO_DADOS):
+    df = carregar_dados(arquivo_final)
+    if df is None:
+        return None
+    # Índice pronto, gerado por `python ingestao.py construir-indices`, se houver
+    if os.path.isdir(arquivo_final):
+        indice = indices.carregar_indice_citacoes(arquivo_final, len(df))
+        if indice is not None:
+            return indice
+    return legislacao.IndiceCitacoes.construir(df["Legislação"])
+
+# Função para obter o índice da pesquisa da barra lateral (construído uma vez por arquivo de dados)
+@metricas.medido("indice_busca")
+@st.cache_resource(show_spinner=False, max_entries=VERSOES_EM_CACHE)
+def obter_indice_busca(arquivo_final=ARQUIVO_DADOS):
+    df = carregar_dados(arquivo_final)
+    if df is None:
+        return None
+    if os.path.isdir(arquivo_final):
+        indice = indices.carregar_indice_busca(arquivo_final, df)
+        if indice is not None:
+            return indice
+    return busca.IndiceBusca(df)
+
+# Função para obter o resumo da notícia de cada registro, alinhado ao índice do DataFrame de
+# carregar_dados: a coluna pré-calculada pelo construir-indices ou, sem ela, os resumos
+# calculados uma vez por arquivo de dados (e não a cada rerun da tabela)
+@metricas.medido("resumos")
+@st.cache_resource(show_spinner="Resumindo as notícias...", max_entries=VERSOES_EM_CACHE)
+def obter_resumos(arquivo_final=ARQUIVO_DADOS):
+    df = carregar_dados(arquivo_final)
+    if df is None:
+        return None
+    if resumos.COLUNA in df.columns:
+        return df[resumos.COLUNA]
+    return pd.Series(resumos.resumir_textos(df["Notícia completa"]), index=df.index, dtype=object)
+
+# Função para obter o histórico persistente das assertivas (uma conexão SQLite por processo)
+@st.cache_resource(show_spinner=False)
+def obter_historico(caminho=historico.ARQUIVO):
+    return historico.Historico(caminho)
@@ -0,0 +1,94 @@
+import zlib
+
+import numpy as np
+
+from busca import palavras
+
+# Campos comparados: a mesma decisão costuma reaparecer em vários informativos
+# (ou como tese de repercussão geral e depois numa notícia) com texto quase igual
+CAMPOS = ("Resumo", "Tese Julgado", "Notícia completa")
+TAMANHO_SHINGLE = 4  # palavras por shingle
+NUM_PERMUTACOES = 128
+# LSH: 16 bandas de 8 linhas -> par com Jaccard 0,8 vira candidato com ~95% de chance
+BANDAS = 16
+LINHAS_POR_BANDA = NUM_PERMUTACOES // BANDAS
+LIMIAR_SIMILARIDADE = 0.8
+# Comparações por membro de um bucket (limita o custo de buckets muito grandes)
+MAX_COMPARACOES_BUCKET = 8
+
+# Hash multiplicativo (a·x + b mod 2^64) >> 32: uma permutação aproximada por par (a, b)
+_gerador = np.random.default_rng(20210101)  # semente fixa: assinaturas comparáveis entre execuções
+_A = _gerador.integers(1, 1 << 63, NUM_PERMUTACOES, dtype=np.uint64) | np.uint64(1)
+_B = _gerador.integers(0, 1 << 63, NUM_PERMUTACOES, dtype=np.uint64)
+_BASE = np.uint64(1_000_003)
+# Assinatura de registro sem texto: nunca é agrupada
+VAZIA = np.uint32(0xFFFFFFFF)
+
+
+def _shingles(texto, cache_palavras):
+    # Hash de cada palavra (com cache) combinado polinomialmente em janelas de TAMANHO_SHINGLE
+    termos = palavras(texto)
+    if not termos:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.fromiter((cache_palavras.get(t) or cache_palavras.setdefault(t, zlib.crc32(t.encode("utf-8")) or 1)
+                          for t in termos), dtype=np.uint64, count=len(termos))
+    tamanho = min(TAMANHO_SHINGLE, len(hashes))
+    combinados = np.zeros(len(hashes) - tamanho + 1, dtype=np.uint64)
+    for deslocamento in range(tamanho):
+        combinados = combinados * _BASE + hashes[deslocamento:len(hashes) - tamanho + 1 + deslocamento]
+    return np.unique(combinados)
+
+
+# Função para calcular as assinaturas MinHash (uma linha de NUM_PERMUTACOES uint32 por registro)
+def assinaturas(df):
+    resultado = np.full((len(df), NUM_PERMUTACOES), VAZIA, dtype=np.uint32)
+    colunas = [df[coluna] if coluna in df.columns else [None] * len(df) for coluna in CAMPOS]
+    cache_palavras = {}
+    for posicao, textos in enumerate(zip(*colunas)):
+        hashes = _shingles("\n".join(t for t in textos if isinstance(t, str)), cache_palavras)
+        if len(hashes):
+            resultado[posicao] = ((_A[:, None] * hashes[None, :] + _B[:, None]) >> np.uint64(32)).min(axis=1)
+    return resultado
+
+
+def _raiz(pais, i):
+    while pais[i] != i:
+        pais[i] = pais[pais[i]]
+        i = pais[i]
+    return i
+
+
+# Função para agrupar registros quase duplicados com LSH (tempo sub-quadrático).
+# Retorna, para cada linha, a posição do representante do grupo (o primeiro registro);
+# linhas sem duplicata apontam para si mesmas.
+def agrupar(assinaturas_registros, limiar=LIMIAR_SIMILARIDADE):
+    total = len(assinaturas_registros)
+    pais = np.arange(total)
+    validos = np.flatnonzero(~(assinaturas_registros == VAZIA).all(axis=1))
+    for banda in range(BANDAS):
+        fatia = np.ascontiguousarray(
+            assinaturas_registros[validos, banda * LINHAS_POR_BANDA:(banda + 1) * LINHAS_POR_BANDA])
+        _, buckets = np.unique(fatia.view(np.dtype((np.void, fatia.shape[1] * fatia.itemsize))).ravel(),
+                               return_inverse=True)
+        ordem = np.argsort(buckets, kind="stable")
+        limites = np.flatnonzero(np.diff(buckets[ordem])) + 1
+        for membros in np.split(validos[ordem], limites):
+            if len(membros) < 2:
+                continue
+            # Compara cada membro com os primeiros do bucket até achar um similar
+            for i in membros[1:]:
+                for j in membros[:min(MAX_COMPARACOES_BUCKET, len(membros))]:
+                    if j >= i:
+                        break
+                    raiz_i, raiz_j = _raiz(pais, i), _raiz(pais, j)
+                    if raiz_i == raiz_j:
+                        break
+                    if np.mean(assinaturas_registros[i] == assinaturas_registros[j]) >= limiar:
+                        pais[max(raiz_i, raiz_j)] = min(raiz_i, raiz_j)
+                        break
+    return np.fromiter((_raiz(pais, i) for i in range(total)), dtype=np.int64, count=total)
+
+
+# Função para calcular o ID canônico (posição do representante) de cada linha de um DataFrame
+def ids_canonicos(df):
+    return agrupar(assinaturas(df))
@@ -0,0 +1,229 @@
+"""Exportação da seleção filtrada para CSV, Parquet ou PDF em segundo plano.
+
+Gerar o PDF de uma seleção grande dentro de um rerun trava a sessão. Aqui cada
+exportação vira uma TarefaExportacao executada num pool de threads compartilhado
+pelo servidor. A tarefa percorre a seleção em lotes de TAMANHO_LOTE linhas,
+gravando cada lote no arquivo de destino (CSV e Parquet; o PDF é montado lote a
+lote e gravado ao final), e mantém o progresso para a interface consultar a cada
+segundo. O arquivo pronto fica num diretório temporário até ser substituído ou
+expirar.
+"""
+import functools
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import resumos
+
+TAMANHO_LOTE = 500
+# Exportações simultâneas no servidor (somando todas as sessões)
+MAX_EXPORTACOES = 2
+DIRETORIO = os.path.join(tempfile.gettempdir(), "stf_exportacoes")
+# Arquivos não baixados são apagados depois deste tempo
+VALIDADE_S = 3600
+
+COLUNAS = ["Informativo", "Classe Processo", "Data Julgamento", "Título", "Ramo Direito", "Matéria",
+           "Repercussão Geral", "Tese Julgado", "Resumo", "Legislação", "Notícia completa"]
+# Formato -> (extensão, tipo MIME)
+FORMATOS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "PDF": ("pdf", "application/pdf"),
+}
+# As fontes padrão do PDF só cobrem o Latin-1: aspas e travessões tipográficos viram ASCII
+_LATIN1 = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'", "–": "-", "—": "-", "…": "...", "•": "-"})
+
+_executor = ThreadPoolExecutor(max_workers=MAX_EXPORTACOES, thread_name_prefix="exportacao")
+
+
+class ExportacaoCancelada(Exception):
+    pass
+
+
+def _texto_pdf(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ""
+    return str(valor).translate(_LATIN1).encode("latin-1", "replace").decode("latin-1")
+
+
+# O fpdf2 só é importado quando um PDF é gerado (não pesa na partida do app)
+@functools.cache
+def _classe_documento():
+    from fpdf import FPDF
+
+    class _Documento(FPDF):
+        def footer(self):
+            self.set_y(-15)
+            self.set_font("Helvetica", "I", 8)
+            self.cell(0, 10, f"Informativos STF - página {self.page_no()}", align="C")
+
+        # Função para escrever um texto com quebra de linha por palavra. O multi_cell do fpdf2
+        # remede o trecho inteiro a cada caractere (quadrático no tamanho do parágrafo); aqui
+        # cada palavra é medida uma vez e cada linha vira um cell.
+        def paragrafo(self, texto, altura):
+            largura = self.epw
+            espaco = self.get_string_width(" ")
+            for linha_original in texto.split("\n"):
+                linha = []
+                ocupado = 0.0
+                for palavra in linha_original.split():
+                    tamanho = self.get_string_width(palavra)
+                    if linha and ocupado + espaco + tamanho > largura:
+                        self.cell(largura, altura, " ".join(linha), new_x="LMARGIN", new_y="NEXT")
+                        linha = []
+                        ocupado = 0.0
+                    ocupado += (espaco if linha else 0.0) + tamanho
+                    linha.append(palavra)
+                self.cell(largura, altura, " ".join(linha), new_x="LMARGIN", new_y="NEXT")
+
+    return _Documento
+
+
+def _limpar_antigos():
+    os.makedirs(DIRETORIO, exist_ok=True)
+    limite = time.time() - VALIDADE_S
+    for nome in os.listdir(DIRETORIO):
+        caminho = os.path.join(DIRETORIO, nome)
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+        except OSError:
+            pass
+
+
+class TarefaExportacao:
+    # Exportação de um DataFrame em segundo plano. O progresso (processadas/total) é
+    # atualizado a cada lote; a referência ao DataFrame é liberada ao terminar.
+
+    def __init__(self, df, formato, noticia_completa=False):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de exportação desconhecido: {formato}")
+        _limpar_antigos()
+        self.formato = formato
+        self.noticia_completa = noticia_completa
+        self.total = len(df)
+        self.processadas = 0
+        self.erro = None
+        self.cancelada = False
+        self.inicio = time.monotonic()
+        self.fim = None
+        extensao = FORMATOS[formato][0]
+        descritor, self.caminho = tempfile.mkstemp(prefix="informativos_", suffix="." + extensao, dir=DIRETORIO)
+        os.close(descritor)
+        self.nome_arquivo = f"informativos_stf_{time.strftime('%Y%m%d_%H%M%S')}.{extensao}"
+        self.mime = FORMATOS[formato][1]
+        self._df = df
+        self._futuro = _executor.submit(self._executar)
+
+    @property
+    def concluida(self):
+        return self.fim is not None
+
+    @property
+    def progresso(self):
+        return self.processadas / self.total if self.total else 1.0
+
+    @property
+    def duracao_s(self):
+        return (self.fim or time.monotonic()) - self.inicio
+
+    def cancelar(self):
+        self.cancelada = True
+
+    # Função para cancelar (se ainda estiver rodando) e apagar o arquivo
+    def descartar(self):
+        self.cancelar()
+        self._futuro.cancel()
+        if self.concluida or self._futuro.cancelled():
+            self._remover()
+
+    def _remover(self):
+        try:
+            os.remove(self.caminho)
+        except OSError:
+            pass
+
+    def _colunas(self):
+        colunas = [c for c in COLUNAS if c in self._df.columns]
+        if not self.noticia_completa and "Notícia completa" in colunas:
+            colunas[colunas.index("Notícia completa")] = resumos.COLUNA
+        return colunas
+
+    def _lotes(self):
+        colunas = self._colunas()
+        for inicio in range(0, self.total, TAMANHO_LOTE):
+            if self.cancelada:
+                raise ExportacaoCancelada()
+            lote = self._df.iloc[inicio:inicio + TAMANHO_LOTE]
+            if resumos.COLUNA in colunas and resumos.COLUNA not in lote.columns:
+                lote = lote.assign(**{resumos.COLUNA: resumos.resumir_textos(lote["Notícia completa"])})
+            yield lote[colunas]
+            self.processadas = min(inicio + TAMANHO_LOTE, self.total)
+
+    def _executar(self):
+        try:
+            {"CSV": self._csv, "Parquet": self._parquet, "PDF": self._pdf}[self.formato]()
+        except ExportacaoCancelada:
+            self._remover()
+        except Exception as e:
+            print(f"Erro na exportação {self.formato}: {e}")
+            self.erro = str(e)
+            self._remover()
+        finally:
+            self._df = None
+            self.fim = time.monotonic()
+
+    def _csv(self):
+        # Separador ";" e BOM: o Excel em português abre o arquivo direto
+        with open(self.caminho, "w", encoding="utf-8-sig", newline="") as arquivo:
+            for numero, lote in enumerate(self._lotes()):
+                lote.to_csv(arquivo, sep=";", index=False, header=numero == 0, date_format="%d/%m/%Y")
+
+    def _parquet(self):
+        # Esquema fixo (textos como string) para que todos os lotes sejam compatíveis
+        colunas = self._colunas()
+        amostra = self._df.iloc[:0].assign(**{resumos.COLUNA: pd.Series(dtype=object)})[colunas]
+        esquema = pa.schema([
+            pa.field(c, pa.string()) if amostra[c].dtype == object
+            else pa.Schema.from_pandas(amostra[[c]], preserve_index=False).field(c)
+            for c in colunas
+        ])
+        with pq.ParquetWriter(self.caminho, esquema) as escritor:
+            for lote in self._lotes():
+                escritor.write_table(pa.Table.from_pandas(lote, schema=esquema, preserve_index=False))
+
+    def _pdf(self):
+        documento = _classe_documento()(format="A4")
+        documento.set_auto_page_break(auto=True, margin=20)
+        documento.set_title("Informativos STF")
+        rotulo_noticia = "Notícia completa" if self.noticia_completa else "Notícia (resumo)"
+        for lote in self._lotes():
+            for _, registro in lote.iterrows():
+                documento.add_page()
+                documento.set_font("Helvetica", "B", 13)
+                documento.paragrafo(_texto_pdf(registro.get("Título")) or "Sem título", 6)
+                data = registro.get("Data Julgamento")
+                data = data.strftime("%d/%m/%Y") if pd.notna(data) else "data não especificada"
+                documento.set_font("Helvetica", "", 9)
+                documento.paragrafo(_texto_pdf(
+                    f"Informativo {registro.get('Informativo')} | {data} | {registro.get('Classe Processo')} | "
+                    f"{registro.get('Ramo Direito')} | Repercussão Geral: {registro.get('Repercussão Geral')}"), 5)
+                documento.ln(2)
+                for rotulo, coluna in (("Tese", "Tese Julgado"), ("Resumo", "Resumo"), ("Legislação", "Legislação"),
+                                       (rotulo_noticia, "Notícia completa" if self.noticia_completa else resumos.COLUNA)):
+                    texto = _texto_pdf(registro.get(coluna))
+                    if not texto:
+                        continue
+                    documento.set_font("Helvetica", "B", 10)
+                    documento.cell(0, 6, _texto_pdf(rotulo), new_x="LMARGIN", new_y="NEXT")
+                    documento.set_font("Helvetica", "", 10)
+                    documento.paragrafo(texto, 5)
+                    documento.ln(1)
+        if self.cancelada:
+            raise ExportacaoCancelada()
+        documento.output(self.caminho)
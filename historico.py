@@ -0,0 +1,146 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Histórico persistente das assertivas (SQLite): o banco de assertivas já geradas
+# (pela API ou pela simulação), o registro de cada resposta e o progresso agregado de
+# cada usuário por assertiva, usado pelo sorteio da revisão espaçada (revisao.py).
+ARQUIVO = os.environ.get("STF_HISTORICO", os.path.join("data", "historico_assertivas.sqlite3"))
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS assertivas (
+    id TEXT PRIMARY KEY,
+    texto TEXT NOT NULL,
+    resposta INTEGER NOT NULL,
+    explicacao TEXT,
+    materia TEXT,
+    informativo INTEGER,
+    criada_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assertivas_materia ON assertivas (materia);
+CREATE TABLE IF NOT EXISTS progresso (
+    usuario TEXT NOT NULL,
+    assertiva_id TEXT NOT NULL,
+    vistas INTEGER NOT NULL DEFAULT 0,
+    acertos INTEGER NOT NULL DEFAULT 0,
+    erros INTEGER NOT NULL DEFAULT 0,
+    ultima_vez REAL,
+    PRIMARY KEY (usuario, assertiva_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS respostas (
+    usuario TEXT NOT NULL,
+    assertiva_id TEXT NOT NULL,
+    resposta INTEGER NOT NULL,
+    correta INTEGER NOT NULL,
+    respondida_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS respostas_usuario ON respostas (usuario, respondida_em);
+"""
+
+
+# Função para calcular o identificador estável de uma assertiva (a mesma frase gerada
+# de novo não duplica o banco)
+def identificador(texto):
+    return hashlib.sha1(" ".join(texto.split()).encode("utf-8")).hexdigest()[:16]
+
+
+class Historico:
+    # Uma conexão por processo, compartilhada pelas sessões do Streamlit (cada rerun roda
+    # numa thread); a trava serializa o acesso. WAL permite leitura durante as gravações.
+
+    def __init__(self, caminho=ARQUIVO):
+        if os.path.dirname(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript(_ESQUEMA)
+        self.trava = threading.Lock()
+
+    def fechar(self):
+        with self.trava:
+            self.conexao.close()
+
+    # Função para acrescentar assertivas ao banco; retorna os ids na ordem recebida
+    # (assertivas sem resposta, como as mensagens de "dados insuficientes", são ignoradas)
+    def salvar_assertivas(self, assertivas):
+        agora = time.time()
+        ids = []
+        linhas = []
+        for assertiva in assertivas:
+            if assertiva.get("resposta") is None or not assertiva.get("texto"):
+                continue
+            assertiva_id = identificador(assertiva["texto"])
+            ids.append(assertiva_id)
+            informativo = assertiva.get("informativo")
+            linhas.append((assertiva_id, assertiva["texto"], int(bool(assertiva["resposta"])),
+                           assertiva.get("explicacao"), assertiva.get("materia"),
+                           int(informativo) if informativo is not None else None, agora))
+        with self.trava, self.conexao:
+            self.conexao.executemany("INSERT OR IGNORE INTO assertivas VALUES (?, ?, ?, ?, ?, ?, ?)", linhas)
+        return ids
+
+    # Função para carregar assertivas pelo id, na ordem pedida
+    def assertivas(self, ids):
+        if not ids:
+            return []
+        marcadores = ",".join("?" * len(ids))
+        with self.trava:
+            linhas = self.conexao.execute(
+                f"SELECT id, texto, resposta, explicacao, materia, informativo FROM assertivas WHERE id IN ({marcadores})",
+                list(ids)).fetchall()
+        por_id = {
+            linha[0]: {"id": linha[0], "texto": linha[1], "resposta": bool(linha[2]), "explicacao": linha[3] or "",
+                       "materia": linha[4], "informativo": linha[5]}
+            for linha in linhas
+        }
+        return [por_id[assertiva_id] for assertiva_id in ids if assertiva_id in por_id]
+
+    # Função para listar as assertivas candidatas ao sorteio (opcionalmente só das matérias
+    # indicadas) com o progresso do usuário: colunas (ids, acertos, erros, ultima_vez)
+    def candidatas(self, usuario, materias=None):
+        consulta = ("SELECT a.id, coalesce(p.acertos, 0), coalesce(p.erros, 0), p.ultima_vez FROM assertivas a "
+                    "LEFT JOIN progresso p ON p.usuario = ? AND p.assertiva_id = a.id")
+        parametros = [usuario]
+        if materias:
+            consulta += f" WHERE a.materia IN ({','.join('?' * len(materias))})"
+            parametros += list(materias)
+        with self.trava:
+            linhas = self.conexao.execute(consulta, parametros).fetchall()
+        if not linhas:
+            return [], [], [], []
+        ids, acertos, erros, ultima_vez = zip(*linhas)
+        return list(ids), list(acertos), list(erros), list(ultima_vez)
+
+    # Função para registrar que as assertivas foram exibidas ao usuário
+    def registrar_vistas(self, usuario, ids, quando=None):
+        quando = quando or time.time()
+        with self.trava, self.conexao:
+            self.conexao.executemany(
+                "INSERT INTO progresso (usuario, assertiva_id, vistas, ultima_vez) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (usuario, assertiva_id) DO UPDATE SET vistas = vistas + 1, ultima_vez = excluded.ultima_vez",
+                [(usuario, assertiva_id, quando) for assertiva_id in ids])
+
+    # Função para registrar a resposta do usuário a uma assertiva
+    def registrar_resposta(self, usuario, assertiva_id, resposta, correta, quando=None):
+        quando = quando or time.time()
+        with self.trava, self.conexao:
+            self.conexao.execute("INSERT INTO respostas VALUES (?, ?, ?, ?, ?)",
+                                 (usuario, assertiva_id, int(resposta), int(correta), quando))
+            self.conexao.execute(
+                "INSERT INTO progresso (usuario, assertiva_id, vistas, acertos, erros, ultima_vez) VALUES (?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT (usuario, assertiva_id) DO UPDATE SET acertos = acertos + excluded.acertos, "
+                "erros = erros + excluded.erros, ultima_vez = excluded.ultima_vez",
+                (usuario, assertiva_id, int(correta), int(not correta), quando))
+
+    # Função para resumir o histórico do usuário: respostas dadas, acertos e assertivas distintas vistas
+    def resumo_usuario(self, usuario):
+        with self.trava:
+            respondidas, acertos = self.conexao.execute(
+                "SELECT count(*), coalesce(sum(correta), 0) FROM respostas WHERE usuario = ?", (usuario,)).fetchone()
+            vistas = self.conexao.execute(
+                "SELECT count(*) FROM progresso WHERE usuario = ?", (usuario,)).fetchone()[0]
+        return {"respondidas": respondidas, "acertos": acertos, "vistas": vistas}
@@ -0,0 +1,318 @@
+"""Construção dos índices de um snapshot: busca, facetas, citações e resumos.
+
+Tokenizar e normalizar o texto de todos os registros é trabalho de CPU em
+Python puro; feito sob demanda, quem espera é o primeiro usuário da sessão.
+A ingestão já calcula esses artefatos por segmento (derivado "indices" em
+ingestao.DERIVADOS, com as posições locais do segmento) e, a cada versão
+publicada, mesclar_versao junta os segmentos sem os registros removidos: um
+anexo só indexa o segmento novo, e a versão nova já sai com os índices que o
+app carrega, em vez de reconstruí-los quando o cache do dados.py é invalidado.
+
+O comando construir-indices reconstrói tudo do zero, em paralelo: o
+snapshot é dividido em partes de tamanho parecido (algumas por processo,
+independentemente dos row groups) e as partes são processadas num
+ProcessPoolExecutor. Cada processo grava suas saídas em arquivos .npz, de
+modo que nada volta pelo pickle além de um contador. O processo principal
+mescla as partes e publica o diretório de forma atômica: os servidores do
+app só enxergam índices completos. (Os grupos de quase duplicatas são
+calculados na ingestão e ficam na raiz da versão.)
+
+Artefatos em <versão>/indices/:
+    busca_*.npy      vocabulário, postings (CSR), posições no fluxo de tokens,
+                     início de cada campo no fluxo e trigramas do IndiceBusca
+                     (pesquisa da barra lateral e contexto das perguntas)
+    faceta_*.npy     valores normalizados e postings (CSR) de cada faceta e da matéria
+    citacoes_*.npy   chaves e postings (CSR) do IndiceCitacoes
+    resumos.parquet  resumo extrativo (TextRank) da notícia completa de cada registro
+    manifesto.json   versão e hash do snapshot indexado, tempos de cada etapa
+
+Artefatos por segmento, em <versão>/segmentos/ (sXXXX.busca.npz, sXXXX.faceta_ramo.npz,
+sXXXX.citacoes.npz, sXXXX.resumos.parquet etc.): as mesmas ocorrências, por segmento.
+
+Uso:
+    python ingestao.py construir-indices            (ou: build-indexes)
+    python ingestao.py construir-indices --processos 8
+"""
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import busca
+import ingestao
+import legislacao
+import resumos
+
+ARQUIVO_MANIFESTO_INDICES = "manifesto.json"
+# Versão do formato dos artefatos: índices gravados em outro formato são ignorados (e reconstruídos)
+FORMATO = 4
+# Partes por processo (equilibra a carga entre processos) e tamanho mínimo de uma parte
+PARTES_POR_PROCESSO = 4
+MIN_LINHAS_PARTE = 100
+COLUNAS = list(dict.fromkeys(busca.CAMPOS_TEXTO + ["Legislação", "Notícia completa"]
+                             + [coluna for coluna, _ in busca.FACETAS.values()]))
+# Ocorrências gravadas em CSR (um .npy por array, com o nome como prefixo)
+OCORRENCIAS = ["busca", "citacoes"] + [f"faceta_{campo}" for campo in list(busca.FACETAS) + ["materia"]]
+SUFIXO_RESUMOS = ".resumos.parquet"
+
+
+def _partes(caminho_versao, manifesto, processos):
+    # Partes de tamanho parecido, PARTES_POR_PROCESSO por processo (sem ficar abaixo de
+    # MIN_LINHAS_PARTE linhas), independentes dos row groups: um snapshot pequeno, gravado
+    # num só row group, também ocupa todos os processos. Uma parte não atravessa segmentos.
+    # Cada parte: (arquivo do segmento, posições vigentes no arquivo, início global)
+    segmentos = []
+    for segmento in manifesto["segmentos"]:
+        arquivo = os.path.join(caminho_versao, ingestao.DIRETORIO_SEGMENTOS, segmento["nome"] + ".parquet")
+        removidos = set(manifesto["removidos"].get(segmento["nome"], []))
+        linhas = pq.ParquetFile(arquivo).metadata.num_rows
+        segmentos.append((arquivo, np.asarray([p for p in range(linhas) if p not in removidos], dtype=np.int64)))
+    total = sum(len(vigentes) for _, vigentes in segmentos)
+    quantidade = max(1, min(processos * PARTES_POR_PROCESSO, total // MIN_LINHAS_PARTE))
+    tamanho = max(1, -(-total // quantidade))
+    partes = []
+    inicio = 0
+    for arquivo, vigentes in segmentos:
+        for deslocamento in range(0, len(vigentes), tamanho):
+            fatia = vigentes[deslocamento:deslocamento + tamanho]
+            partes.append((arquivo, fatia, inicio))
+            inicio += len(fatia)
+    return partes, total
+
+
+def _gravar_ocorrencias(caminho, ocorrencias):
+    np.savez(caminho, **{nome: np.asarray(valores, dtype=str) if nome == "chaves" else valores
+                         for nome, valores in ocorrencias.items()})
+
+
+# Função para gravar as ocorrências (prefixo.<nome>.npz) e os resumos (prefixo.resumos.parquet)
+# das linhas de df, numeradas a partir de inicio. Retorna o tempo de cada etapa.
+def _gravar_partes(df, inicio, prefixo):
+    # As linhas sem matéria entram como no DataFrame do app (dados.preparar_dados)
+    df = df.assign(**{busca.CAMPO_MATERIA: df[busca.CAMPO_MATERIA].fillna(busca.MATERIA_PADRAO)})
+    tempos = {}
+
+    inicio_etapa = time.perf_counter()
+    _gravar_ocorrencias(prefixo + ".busca.npz", busca.ocorrencias_textos(df, inicio))
+    for campo, ocorrencias in busca.ocorrencias_facetas(df, inicio).items():
+        _gravar_ocorrencias(prefixo + f".faceta_{campo}.npz", ocorrencias)
+    tempos["busca"] = time.perf_counter() - inicio_etapa
+
+    inicio_etapa = time.perf_counter()
+    citacoes = legislacao.ocorrencias_citacoes(df["Legislação"], inicio)
+    _gravar_ocorrencias(prefixo + ".citacoes.npz", dict(zip(("chaves", "ids", "posicoes"), citacoes)))
+    tempos["citacoes"] = time.perf_counter() - inicio_etapa
+
+    inicio_etapa = time.perf_counter()
+    pq.write_table(pa.table({resumos.COLUNA: pa.array(resumos.resumir_textos(df["Notícia completa"]), pa.string())}),
+                   prefixo + SUFIXO_RESUMOS)
+    tempos["resumos"] = time.perf_counter() - inicio_etapa
+    return tempos
+
+
+# Executada em cada processo: lê só os row groups que contêm as suas linhas e grava as saídas em disco
+def _processar_parte(numero, arquivo, vigentes, inicio, temporario):
+    arquivo_parquet = pq.ParquetFile(arquivo)
+    metadados = arquivo_parquet.metadata
+    limites = np.cumsum([0] + [metadados.row_group(grupo).num_rows for grupo in range(metadados.num_row_groups)])
+    primeiro = int(np.searchsorted(limites, vigentes[0], side="right")) - 1
+    ultimo = int(np.searchsorted(limites, vigentes[-1], side="right")) - 1
+    tabela = arquivo_parquet.read_row_groups(range(primeiro, ultimo + 1), columns=COLUNAS)
+    df = tabela.take(vigentes - limites[primeiro]).to_pandas()
+    return len(df), _gravar_partes(df, inicio, os.path.join(temporario, f"parte{numero:05d}"))
+
+
+# Função para mesclar as partes de cada ocorrência (nome -> partes em ordem de linha) e gravar
+# o CSR global (um .npy por array), os trigramas do vocabulário da busca e os resumos.
+# Retorna o tamanho do vocabulário.
+def _gravar_indices(destino, ocorrencias, partes_resumos):
+    for nome, partes in ocorrencias.items():
+        csr = busca.mesclar_ocorrencias(partes)
+        for chave, valores in csr.items():
+            np.save(os.path.join(destino, f"{nome}_{chave}.npy"),
+                    np.asarray(valores, dtype=str) if chave == "chaves" else valores)
+        if nome == "busca":
+            vocabulario = csr["chaves"]
+    chaves_trigramas, deslocamentos_trigramas, ids_trigramas = busca.trigramas_vocabulario(vocabulario)
+    np.save(os.path.join(destino, "busca_trigramas_chaves.npy"), np.asarray(chaves_trigramas, dtype=str))
+    np.save(os.path.join(destino, "busca_trigramas_deslocamentos.npy"), deslocamentos_trigramas)
+    np.save(os.path.join(destino, "busca_trigramas_ids.npy"), ids_trigramas)
+    pq.write_table(pa.concat_tables(partes_resumos) if partes_resumos
+                   else pa.table({resumos.COLUNA: pa.array([], pa.string())}),
+                   os.path.join(destino, ingestao.ARQUIVO_RESUMOS))
+    return len(vocabulario)
+
+
+def _gravar_manifesto(destino, manifesto_indices):
+    with open(os.path.join(destino, ARQUIVO_MANIFESTO_INDICES), "w", encoding="utf-8") as f:
+        json.dump(manifesto_indices, f, ensure_ascii=False, indent=2)
+
+
+def _publicar(temporario, caminho_versao):
+    destino = os.path.join(caminho_versao, ingestao.DIRETORIO_INDICES)
+    antigo = None
+    if os.path.isdir(destino):
+        antigo = tempfile.mkdtemp(prefix=".indices-antigo-", dir=caminho_versao)
+        os.replace(destino, os.path.join(antigo, "indices"))
+    os.replace(temporario, destino)
+    if antigo:
+        shutil.rmtree(antigo, ignore_errors=True)
+    return destino
+
+
+# Função principal: constrói todos os índices da versão (padrão: a versão em uso) em paralelo.
+# Retorna o manifesto dos índices.
+def construir_indices(caminho_versao=None, processos=None, diretorio=ingestao.DIRETORIO_SNAPSHOTS):
+    caminho_versao = caminho_versao or ingestao.caminho_snapshot_atual(diretorio)
+    if not caminho_versao:
+        raise ingestao.ErroEsquema("Não há snapshot para indexar")
+    inicio_total = time.perf_counter()
+    manifesto = ingestao.ler_manifesto(caminho_versao)
+    processos = processos or os.cpu_count() or 1
+    partes, total = _partes(caminho_versao, manifesto, processos)
+    temporario = tempfile.mkdtemp(prefix=".indices-", dir=caminho_versao)
+    try:
+        inicio_etapa = time.perf_counter()
+        tempos_partes = {"busca": 0.0, "citacoes": 0.0, "resumos": 0.0}
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            futuros = [executor.submit(_processar_parte, numero, *parte, temporario)
+                       for numero, parte in enumerate(partes)]
+            for futuro in as_completed(futuros):
+                _, tempos = futuro.result()
+                for etapa, duracao in tempos.items():
+                    tempos_partes[etapa] += duracao
+        tempo_paralelo = time.perf_counter() - inicio_etapa
+
+        inicio_etapa = time.perf_counter()
+        ocorrencias = {nome: [np.load(os.path.join(temporario, f"parte{numero:05d}.{nome}.npz"))
+                              for numero in range(len(partes))] for nome in OCORRENCIAS}
+        partes_resumos = [pq.read_table(os.path.join(temporario, f"parte{numero:05d}{SUFIXO_RESUMOS}"))
+                          for numero in range(len(partes))]
+        vocabulario = _gravar_indices(temporario, ocorrencias, partes_resumos)
+        for nome_arquivo in os.listdir(temporario):
+            if nome_arquivo.startswith("parte"):
+                os.remove(os.path.join(temporario, nome_arquivo))
+        tempo_mescla = time.perf_counter() - inicio_etapa
+
+        manifesto_indices = {
+            "formato": FORMATO,
+            "versao": manifesto.get("versao"),
+            "hash": manifesto["hash"],
+            "linhas": total,
+            "partes": len(partes),
+            "processos": processos,
+            "vocabulario": vocabulario,
+            "criado_em": datetime.datetime.now().isoformat(timespec="seconds"),
+            "tempos_s": {
+                "paralelo": round(tempo_paralelo, 3),
+                "mescla": round(tempo_mescla, 3),
+                "total": round(time.perf_counter() - inicio_total, 3),
+                # Soma do tempo de CPU das partes, por etapa
+                **{f"partes_{etapa}": round(duracao, 3) for etapa, duracao in tempos_partes.items()},
+            },
+        }
+        _gravar_manifesto(temporario, manifesto_indices)
+        _publicar(temporario, caminho_versao)
+        return manifesto_indices
+    finally:
+        if os.path.isdir(temporario):
+            shutil.rmtree(temporario, ignore_errors=True)
+
+
+# Derivado "indices" da ingestão (ver ingestao.DERIVADOS): as ocorrências e os resumos do
+# segmento, com as posições locais (todas as linhas, inclusive as que forem removidas depois)
+def derivar_segmento(df_segmento, prefixo):
+    _gravar_partes(df_segmento, 0, prefixo)
+
+
+# Função para montar os índices de uma versão a partir dos artefatos dos seus segmentos,
+# sem os removidos.
+# Chamada pela ingestão antes de publicar a versão. Retorna o manifesto dos índices.
+def mesclar_versao(caminho_versao, manifesto):
+    inicio_total = time.perf_counter()
+    temporario = tempfile.mkdtemp(prefix=".indices-", dir=caminho_versao)
+    try:
+        ocorrencias = {nome: [] for nome in OCORRENCIAS}
+        partes_resumos = []
+        inicio = 0
+        for segmento in manifesto["segmentos"]:
+            prefixo = os.path.join(caminho_versao, ingestao.DIRETORIO_SEGMENTOS, segmento["nome"])
+            vigentes = np.setdiff1d(np.arange(segmento["linhas"]), manifesto["removidos"].get(segmento["nome"], []))
+            for nome in OCORRENCIAS:
+                with np.load(prefixo + f".{nome}.npz") as arquivo:
+                    ocorrencias[nome].append(busca.filtrar_ocorrencias(arquivo, vigentes, inicio))
+            partes_resumos.append(pq.read_table(prefixo + SUFIXO_RESUMOS).take(vigentes))
+            inicio += len(vigentes)
+        vocabulario = _gravar_indices(temporario, ocorrencias, partes_resumos)
+        manifesto_indices = {
+            "formato": FORMATO,
+            "versao": manifesto.get("versao"),
+            "hash": manifesto["hash"],
+            "linhas": inicio,
+            "segmentos": len(manifesto["segmentos"]),
+            "vocabulario": vocabulario,
+            "criado_em": datetime.datetime.now().isoformat(timespec="seconds"),
+            "tempos_s": {"total": round(time.perf_counter() - inicio_total, 3)},
+        }
+        _gravar_manifesto(temporario, manifesto_indices)
+        _publicar(temporario, caminho_versao)
+        return manifesto_indices
+    finally:
+        if os.path.isdir(temporario):
+            shutil.rmtree(temporario, ignore_errors=True)
+
+
+# Função para obter o diretório de índices da versão, se estiver completo e for desta versão
+def diretorio_indices(caminho_versao):
+    destino = os.path.join(caminho_versao, ingestao.DIRETORIO_INDICES)
+    try:
+        with open(os.path.join(destino, ARQUIVO_MANIFESTO_INDICES), encoding="utf-8") as f:
+            manifesto_indices = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifesto_indices.get("formato") != FORMATO:
+        return None
+    if manifesto_indices.get("hash") != ingestao.ler_manifesto(caminho_versao).get("hash"):
+        return None
+    return destino
+
+
+# Os arrays grandes (posições) são mapeados em memória, não lidos
+def _carregar_csr(destino, nome, arrays=("deslocamentos", "posicoes")):
+    csr = {"chaves": np.load(os.path.join(destino, f"{nome}_chaves.npy")).tolist()}
+    for array in arrays:
+        csr[array] = np.load(os.path.join(destino, f"{nome}_{array}.npy"),
+                             mmap_mode="r" if array.endswith("posicoes") else None)
+    return csr
+
+
+# Função para carregar o índice de busca pronto (None se a versão não tiver índices)
+def carregar_indice_busca(caminho_versao, df):
+    destino = diretorio_indices(caminho_versao)
+    if destino is None:
+        return None
+    trigramas = (
+        np.load(os.path.join(destino, "busca_trigramas_chaves.npy")).tolist(),
+        np.load(os.path.join(destino, "busca_trigramas_deslocamentos.npy")),
+        np.load(os.path.join(destino, "busca_trigramas_ids.npy")),
+    )
+    textos = _carregar_csr(destino, "busca", ("deslocamentos", "posicoes", "tokens_deslocamentos",
+                                              "tokens_posicoes", "campos_tokens"))
+    facetas = {campo: _carregar_csr(destino, f"faceta_{campo}") for campo in list(busca.FACETAS) + ["materia"]}
+    return busca.IndiceBusca(df, textos=textos, trigramas=trigramas, facetas=facetas)
+
+
+# Função para carregar o índice de citações pronto (None se a versão não tiver índices)
+def carregar_indice_citacoes(caminho_versao, total_linhas):
+    destino = diretorio_indices(caminho_versao)
+    if destino is None:
+        return None
+    csr = _carregar_csr(destino, "citacoes")
+    return legislacao.IndiceCitacoes.de_csr(csr["chaves"], csr["deslocamentos"], csr["posicoes"], total_linhas)
@@ -0,0 +1,795 @@
+"""Ingestão da planilha de informativos em snapshots versionados (Parquet).
+
+A planilha é lida em modo streaming (openpyxl read_only), em blocos, e cada
+linha é validada contra o esquema esperado. Linhas inválidas são reportadas
+em rejeitados.jsonl em vez de virarem NaT/NaN silenciosamente. O resultado
+é gravado em data/snapshots/<versão>/ com um manifesto e o hash do conteúdo.
+
+Cada versão é uma lista de segmentos Parquet imutáveis mais um conjunto de
+posições removidas. `anexar` grava apenas os registros novos ou alterados
+num novo segmento (os anteriores são reaproveitados por hard link), marca as
+versões antigas dos alterados como removidas e incrementa a geração. Os
+artefatos derivados (assinaturas MinHash e as ocorrências dos índices,
+registrados em DERIVADOS) são calculados por segmento, então um anexo só
+processa o segmento novo; os índices de cada versão são mesclados dos
+segmentos antes de publicá-la (ver indices.mesclar_versao).
+
+Um registro é identificado pelo informativo e pelo processo (classe e
+ordinal na edição): o mesmo registro com outro título, resumo etc. numa
+planilha anexada é uma alteração, não um registro novo.
+
+Registros quase duplicados (a mesma decisão em vários informativos) são
+agrupados por MinHash/LSH sobre as assinaturas de cada segmento; cada versão
+guarda em duplicatas.npy o representante de cada registro, exposto por
+ler_snapshot na coluna "ID Canônico".
+
+Uso:
+    python ingestao.py importar data/informativos_stf_2021_2025.xlsx
+    python ingestao.py importar planilha.xlsx --estrito --tamanho-bloco 2000
+    python ingestao.py anexar informativo_1174.xlsx
+    python ingestao.py compactar
+    python ingestao.py construir-indices --processos 4
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import Counter
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import duplicatas
+import resumos
+
+DIRETORIO_SNAPSHOTS = os.path.join("data", "snapshots")
+ARQUIVO_ATUAL = "ATUAL"  # ponteiro para a versão em uso
+DIRETORIO_SEGMENTOS = "segmentos"
+ARQUIVO_MANIFESTO = "manifesto.json"
+ARQUIVO_REJEITADOS = "rejeitados.jsonl"
+ARQUIVO_DUPLICATAS = "duplicatas.npy"  # posição do representante de cada registro vigente
+SUFIXO_MINHASH = ".minhash.npy"
+DIRETORIO_INDICES = "indices"  # mesclado na publicação da versão ou refeito por `construir-indices` (ver indices.py)
+ARQUIVO_RESUMOS = "resumos.parquet"  # resumos das notícias, dentro de DIRETORIO_INDICES
+
+FORMATO_DATA = "%d/%m/%Y"
+TAMANHO_BLOCO = 5000
+VALORES_REPERCUSSAO = ("Sim", "Não")
+
+
+class ErroEsquema(Exception):
+    pass
+
+
+# Esquema esperado: coluna -> (tipo, obrigatória)
+ESQUEMA = {
+    "Informativo": ("inteiro", True),
+    "Classe Processo": ("texto", True),
+    "Data Julgamento": ("data", True),
+    "Título": ("texto", False),
+    "Tese Julgado": ("texto", False),
+    "Resumo": ("texto", False),
+    "Ramo Direito": ("texto", False),
+    "Matéria": ("texto", False),
+    "Repercussão Geral": ("repercussao", False),
+    "Legislação": ("texto", False),
+    "Notícia completa": ("texto", False),
+}
+# Colunas que podem faltar na planilha (preenchidas com nulos, como em preparar_dados)
+COLUNAS_OPCIONAIS = ("Legislação", "Notícia completa", "Matéria")
+
+ESQUEMA_ARROW = pa.schema([
+    ("Informativo", pa.int64()),
+    ("Classe Processo", pa.string()),
+    ("Data Julgamento", pa.timestamp("ms")),
+    ("Título", pa.string()),
+    ("Tese Julgado", pa.string()),
+    ("Resumo", pa.string()),
+    ("Ramo Direito", pa.string()),
+    ("Matéria", pa.string()),
+    ("Repercussão Geral", pa.string()),
+    ("Legislação", pa.string()),
+    ("Notícia completa", pa.string()),
+])
+# Colunas internas dos segmentos: chave do registro e hash do conteúdo
+ESQUEMA_SEGMENTO = ESQUEMA_ARROW.append(pa.field("_chave", pa.string())).append(pa.field("_hash", pa.string()))
+
+
+def _converter(tipo, valor):
+    # Retorna o valor convertido ou lança ValueError com o motivo
+    if tipo == "inteiro":
+        if isinstance(valor, bool):
+            raise ValueError("esperado número inteiro")
+        if isinstance(valor, int):
+            return valor
+        if isinstance(valor, float) and valor.is_integer():
+            return int(valor)
+        if isinstance(valor, str) and valor.strip().isdigit():
+            return int(valor.strip())
+        raise ValueError("esperado número inteiro")
+    if tipo == "data":
+        if isinstance(valor, datetime.datetime):
+            return valor
+        if isinstance(valor, datetime.date):
+            return datetime.datetime(valor.year, valor.month, valor.day)
+        if isinstance(valor, str):
+            try:
+                return datetime.datetime.strptime(valor.strip(), FORMATO_DATA)
+            except ValueError:
+                raise ValueError(f"data fora do formato {FORMATO_DATA}") from None
+        raise ValueError(f"data fora do formato {FORMATO_DATA}")
+    if tipo == "repercussao":
+        texto = str(valor).strip()
+        if texto not in VALORES_REPERCUSSAO:
+            raise ValueError(f"esperado um de {VALORES_REPERCUSSAO}")
+        return texto
+    return valor if isinstance(valor, str) else str(valor)
+
+
+# Função para validar uma linha; retorna (registro, erros)
+def validar_linha(linha):
+    registro = {}
+    erros = []
+    for coluna, (tipo, obrigatoria) in ESQUEMA.items():
+        valor = linha.get(coluna)
+        if valor is None or (isinstance(valor, str) and not valor.strip()):
+            if obrigatoria:
+                erros.append({"coluna": coluna, "motivo": "valor obrigatório ausente"})
+            registro[coluna] = None
+            continue
+        try:
+            registro[coluna] = _converter(tipo, valor)
+        except ValueError as e:
+            erros.append({"coluna": coluna, "motivo": str(e), "valor": str(valor)[:200]})
+            registro[coluna] = None
+    return registro, erros
+
+
+def _validar_cabecalho(cabecalho):
+    colunas = [str(c).strip() if c is not None else None for c in cabecalho]
+    faltantes = [c for c in ESQUEMA if c not in colunas and c not in COLUNAS_OPCIONAIS]
+    if faltantes:
+        raise ErroEsquema(f"Colunas obrigatórias ausentes na planilha: {', '.join(faltantes)}")
+    extras = [c for c in colunas if c and c not in ESQUEMA]
+    return colunas, extras
+
+
+# Leitor da planilha em modo streaming; itera (número da linha, dict coluna -> valor)
+class LeitorPlanilha:
+    def __init__(self, caminho, aba=None):
+        self.livro = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+        planilha = self.livro[aba] if aba else self.livro.active
+        self.linhas = planilha.iter_rows(values_only=True)
+        cabecalho = next(self.linhas, None)
+        if cabecalho is None:
+            self.livro.close()
+            raise ErroEsquema("Planilha vazia")
+        try:
+            self.colunas, self.colunas_ignoradas = _validar_cabecalho(cabecalho)
+        except ErroEsquema:
+            self.livro.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.livro.close()
+        return False
+
+    def __iter__(self):
+        for numero, valores in enumerate(self.linhas, start=2):
+            if all(v is None for v in valores):
+                continue
+            yield numero, {c: v for c, v in zip(self.colunas, valores) if c}
+
+
+def _hash_registro(registro):
+    partes = []
+    for coluna in ESQUEMA:
+        valor = registro[coluna]
+        if isinstance(valor, datetime.datetime):
+            valor = valor.strftime("%Y-%m-%d")
+        partes.append(valor)
+    return json.dumps(partes, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# Chave de um registro: número do informativo + identificação do processo. A planilha não
+# traz o número do processo, só a classe; o ordinal distingue os processos da mesma classe
+# na mesma edição, na ordem da planilha. O título fica de fora: corrigi-lo altera o registro.
+def _chave_base(registro):
+    return f"{registro['Informativo']}|{registro['Classe Processo']}"
+
+
+class _GeradorChaves:
+    def __init__(self):
+        self.ocorrencias = Counter()
+
+    def __call__(self, registro):
+        base = _chave_base(registro)
+        self.ocorrencias[base] += 1
+        return f"{base}#{self.ocorrencias[base]}"
+
+
+# Contagens usadas na aba de estatísticas, mantidas incrementalmente no manifesto
+def _estatisticas_vazias():
+    return {"ramos": {}, "repercussao": {}, "classes": {}, "anos": {}}
+
+
+def _contar(estatisticas, registro, sinal=1):
+    data = registro["Data Julgamento"]
+    valores = (
+        ("ramos", registro["Ramo Direito"]),
+        ("repercussao", registro["Repercussão Geral"]),
+        ("classes", registro["Classe Processo"]),
+        ("anos", str(data.year) if data is not None and not pd.isna(data) else None),
+    )
+    for nome, valor in valores:
+        if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+            continue
+        contagens = estatisticas[nome]
+        contagens[valor] = contagens.get(valor, 0) + sinal
+        if contagens[valor] <= 0:
+            del contagens[valor]
+
+
+class _EscritorSegmento:
+    # Acumula um bloco de registros válidos e grava como um row group Parquet
+
+    def __init__(self, caminho, tamanho_bloco, estatisticas):
+        self.caminho = caminho
+        self.escritor = pq.ParquetWriter(caminho, ESQUEMA_SEGMENTO, compression="zstd")
+        self.tamanho_bloco = tamanho_bloco
+        self.estatisticas = estatisticas
+        self.resumo_hash = hashlib.sha256()
+        self.bloco = {nome: [] for nome in ESQUEMA_SEGMENTO.names}
+        self.pendentes = 0
+        self.total = 0
+
+    def adicionar(self, registro, chave, hash_registro):
+        for coluna, valor in registro.items():
+            self.bloco[coluna].append(valor)
+        self.bloco["_chave"].append(chave)
+        self.bloco["_hash"].append(hash_registro)
+        self.resumo_hash.update(hash_registro.encode("ascii"))
+        _contar(self.estatisticas, registro)
+        self.pendentes += 1
+        if self.pendentes >= self.tamanho_bloco:
+            self.descarregar()
+
+    def descarregar(self):
+        if not self.pendentes:
+            return
+        self.escritor.write_batch(pa.RecordBatch.from_pydict(self.bloco, schema=ESQUEMA_SEGMENTO))
+        self.total += self.pendentes
+        self.bloco = {nome: [] for nome in ESQUEMA_SEGMENTO.names}
+        self.pendentes = 0
+
+    def fechar(self):
+        self.descarregar()
+        self.escritor.close()
+        return self.resumo_hash.hexdigest()
+
+
+# Artefatos derivados calculados por segmento: nome -> função(df_segmento, prefixo), onde
+# prefixo é o caminho do segmento sem a extensão (ex.: .../segmentos/s0003). Como os
+# segmentos são imutáveis, um anexo só precisa construir os artefatos do segmento novo.
+DERIVADOS = {}
+
+
+def registrar_derivado(nome):
+    def decorador(funcao):
+        DERIVADOS[nome] = funcao
+        return funcao
+    return decorador
+
+
+def _construir_derivados(caminho_segmento):
+    if not DERIVADOS:
+        return
+    df_segmento = pq.read_table(caminho_segmento).to_pandas()
+    prefixo = caminho_segmento[: -len(".parquet")]
+    for nome, funcao in DERIVADOS.items():
+        funcao(df_segmento, prefixo)
+
+
+@registrar_derivado("minhash")
+def _derivado_minhash(df_segmento, prefixo):
+    np.save(prefixo + SUFIXO_MINHASH, duplicatas.assinaturas(df_segmento))
+
+
+@registrar_derivado("indices")
+def _derivado_indices(df_segmento, prefixo):
+    import indices  # indices importa este módulo
+    indices.derivar_segmento(df_segmento, prefixo)
+
+
+# Função para agrupar as quase duplicatas entre todos os registros vigentes da versão.
+# Grava em ARQUIVO_DUPLICATAS, na ordem de ler_snapshot, a posição do representante de
+# cada registro e devolve o resumo, com as estatísticas contando cada grupo uma vez.
+def _agrupar_duplicatas(caminho_versao, segmentos, removidos):
+    colunas = ["Ramo Direito", "Repercussão Geral", "Classe Processo", "Data Julgamento"]
+    partes_assinaturas = []
+    partes_colunas = []
+    for segmento in segmentos:
+        prefixo = os.path.join(caminho_versao, DIRETORIO_SEGMENTOS, segmento["nome"])
+        vivos = np.setdiff1d(np.arange(segmento["linhas"]), removidos.get(segmento["nome"], []))
+        partes_assinaturas.append(np.load(prefixo + SUFIXO_MINHASH, mmap_mode="r")[vivos])
+        partes_colunas.append(pq.read_table(prefixo + ".parquet", columns=colunas).take(vivos))
+    if partes_assinaturas:
+        canonicos = duplicatas.agrupar(np.concatenate(partes_assinaturas))
+    else:
+        canonicos = np.empty(0, dtype=np.int64)
+    np.save(os.path.join(caminho_versao, ARQUIVO_DUPLICATAS), canonicos)
+
+    proprios = canonicos == np.arange(len(canonicos))
+    estatisticas_unicas = _estatisticas_vazias()
+    if partes_colunas:
+        for linha in pa.concat_tables(partes_colunas).filter(pa.array(proprios)).to_pylist():
+            _contar(estatisticas_unicas, linha)
+    resumo = {
+        "grupos": int(len(np.unique(canonicos[~proprios]))),
+        "registros_duplicados": int((~proprios).sum()),
+    }
+    return resumo, estatisticas_unicas
+
+
+def _versoes(diretorio):
+    if not os.path.isdir(diretorio):
+        return []
+    return sorted(n for n in os.listdir(diretorio) if n.startswith("v") and os.path.isdir(os.path.join(diretorio, n)))
+
+
+def _gravar_atomico(caminho, texto):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(temporario, caminho)
+
+
+# Função para obter o nome da versão em uso (ou None se não houver snapshot)
+def versao_atual(diretorio=DIRETORIO_SNAPSHOTS):
+    try:
+        with open(os.path.join(diretorio, ARQUIVO_ATUAL), encoding="utf-8") as f:
+            versao = f.read().strip()
+    except OSError:
+        return None
+    return versao if os.path.isdir(os.path.join(diretorio, versao)) else None
+
+
+# Função para obter o diretório do snapshot em uso (ou None)
+def caminho_snapshot_atual(diretorio=DIRETORIO_SNAPSHOTS):
+    versao = versao_atual(diretorio)
+    if not versao:
+        return None
+    return os.path.join(diretorio, versao)
+
+
+# Função para ler o manifesto de uma versão (nome da versão ou caminho do diretório)
+def ler_manifesto(versao, diretorio=DIRETORIO_SNAPSHOTS):
+    caminho = versao if os.path.isdir(versao) else os.path.join(diretorio, versao)
+    with open(os.path.join(caminho, ARQUIVO_MANIFESTO), encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Segmentos já lidos, por hash: sobrevivem a anexos, que só acrescentam segmentos
+_cache_segmentos = {}
+
+
+def _ler_segmento(caminho, hash_segmento):
+    df = _cache_segmentos.get(hash_segmento)
+    if df is None:
+        df = pq.read_table(caminho).to_pandas()
+        _cache_segmentos[hash_segmento] = df
+    return df
+
+
+# Função para ler um snapshot como DataFrame (sem as colunas internas e sem os removidos)
+def ler_snapshot(caminho_versao):
+    manifesto = ler_manifesto(caminho_versao)
+    partes = []
+    for segmento in manifesto["segmentos"]:
+        df = _ler_segmento(os.path.join(caminho_versao, DIRETORIO_SEGMENTOS, segmento["nome"] + ".parquet"),
+                           segmento["hash"])
+        removidos = manifesto["removidos"].get(segmento["nome"])
+        if removidos:
+            df = df.drop(index=df.index[removidos])
+        partes.append(df)
+    # Mantém no cache só os segmentos da versão mais recente lida
+    em_uso = {segmento["hash"] for segmento in manifesto["segmentos"]}
+    for hash_segmento in list(_cache_segmentos):
+        if hash_segmento not in em_uso:
+            del _cache_segmentos[hash_segmento]
+    if not partes:
+        return pd.DataFrame({nome: pd.Series(dtype=object) for nome in ESQUEMA})
+    df = pd.concat(partes, ignore_index=True).drop(columns=["_chave", "_hash"])
+    # ID canônico dos grupos de quase duplicatas
+    df["ID Canônico"] = np.load(os.path.join(caminho_versao, ARQUIVO_DUPLICATAS))
+    df[resumos.COLUNA] = pq.read_table(os.path.join(caminho_versao, DIRETORIO_INDICES, ARQUIVO_RESUMOS),
+                                       columns=[resumos.COLUNA]).column(resumos.COLUNA).to_pandas()
+    return df
+
+
+# Função para obter as contagens agregadas de um snapshot (sem ler os dados)
+# (unicas=True conta cada grupo de quase duplicatas uma única vez, se a versão tiver os grupos)
+def estatisticas_snapshot(caminho_versao, unicas=False):
+    manifesto = ler_manifesto(caminho_versao)
+    if unicas and "estatisticas_unicas" in manifesto:
+        return manifesto["estatisticas_unicas"]
+    return manifesto["estatisticas"]
+
+
+def _hash_versao(segmentos, removidos):
+    resumo = hashlib.sha256()
+    for segmento in segmentos:
+        resumo.update(segmento["hash"].encode("ascii"))
+        resumo.update(json.dumps(sorted(removidos.get(segmento["nome"], []))).encode("ascii"))
+    return resumo.hexdigest()
+
+
+def _ler_validos(leitor, arquivo_rejeitados, exemplos_rejeitados):
+    # Produz os registros válidos e grava os inválidos em rejeitados.jsonl
+    for numero, linha in leitor:
+        registro, erros = validar_linha(linha)
+        if erros:
+            rejeicao = {"linha": numero, "erros": erros}
+            arquivo_rejeitados.write(json.dumps(rejeicao, ensure_ascii=False) + "\n")
+            if len(exemplos_rejeitados) < 20:
+                exemplos_rejeitados.append(rejeicao)
+            continue
+        yield registro
+
+
+def _publicar(temporario, diretorio, manifesto, ativar):
+    # Mesmo conteúdo de uma versão existente: reaproveita a versão
+    for versao in _versoes(diretorio):
+        existente = ler_manifesto(versao, diretorio)
+        if existente.get("hash") == manifesto["hash"]:
+            if ativar:
+                _gravar_atomico(os.path.join(diretorio, ARQUIVO_ATUAL), versao)
+            return existente
+
+    versao = f"v{manifesto['geracao']:04d}-{manifesto['hash'][:12]}"
+    manifesto["versao"] = versao
+    manifesto["criado_em"] = datetime.datetime.now().isoformat(timespec="seconds")
+    manifesto["esquema"] = {coluna: tipo for coluna, (tipo, _) in ESQUEMA.items()}
+    # Índices da versão, mesclados dos artefatos dos segmentos: o app os carrega prontos
+    import indices
+    indices.mesclar_versao(temporario, manifesto)
+    _gravar_atomico(os.path.join(temporario, ARQUIVO_MANIFESTO), json.dumps(manifesto, ensure_ascii=False, indent=2))
+    os.replace(temporario, os.path.join(diretorio, versao))
+    if ativar:
+        _gravar_atomico(os.path.join(diretorio, ARQUIVO_ATUAL), versao)
+    return manifesto
+
+
+def _proxima_geracao(diretorio):
+    versoes = _versoes(diretorio)
+    return int(versoes[-1][1:5]) + 1 if versoes else 1
+
+
+# Função principal da ingestão: planilha completa -> snapshot versionado com um segmento.
+# Retorna o manifesto gerado (ou o da versão existente com o mesmo conteúdo).
+def importar(caminho_planilha, diretorio=DIRETORIO_SNAPSHOTS, tamanho_bloco=TAMANHO_BLOCO, estrito=False,
+             aba=None, ativar=True):
+    os.makedirs(diretorio, exist_ok=True)
+    geracao = _proxima_geracao(diretorio)
+    temporario = tempfile.mkdtemp(prefix=".importando-", dir=diretorio)
+    try:
+        os.makedirs(os.path.join(temporario, DIRETORIO_SEGMENTOS))
+        nome_segmento = f"s{geracao:04d}"
+        caminho_segmento = os.path.join(temporario, DIRETORIO_SEGMENTOS, nome_segmento + ".parquet")
+        estatisticas = _estatisticas_vazias()
+        escritor = _EscritorSegmento(caminho_segmento, tamanho_bloco, estatisticas)
+        gerar_chave = _GeradorChaves()
+        exemplos_rejeitados = []
+        with LeitorPlanilha(caminho_planilha, aba) as leitor, \
+                open(os.path.join(temporario, ARQUIVO_REJEITADOS), "w", encoding="utf-8") as arquivo_rejeitados:
+            for registro in _ler_validos(leitor, arquivo_rejeitados, exemplos_rejeitados):
+                hash_registro = hashlib.sha1(_hash_registro(registro)).hexdigest()
+                escritor.adicionar(registro, gerar_chave(registro), hash_registro)
+            extras = leitor.colunas_ignoradas
+        hash_segmento = escritor.fechar()
+        rejeitados = _contar_linhas(os.path.join(temporario, ARQUIVO_REJEITADOS))
+
+        if estrito and rejeitados:
+            raise ErroEsquema(f"{rejeitados} linha(s) inválida(s); nenhum snapshot foi gerado (modo estrito)")
+
+        _construir_derivados(caminho_segmento)
+        segmentos = [{"nome": nome_segmento, "hash": hash_segmento, "linhas": escritor.total}]
+        resumo_duplicatas, estatisticas_unicas = _agrupar_duplicatas(temporario, segmentos, {})
+        manifesto = {
+            "geracao": geracao,
+            "hash": _hash_versao(segmentos, {}),
+            "linhas": escritor.total,
+            "segmentos": segmentos,
+            "removidos": {},
+            "estatisticas": estatisticas,
+            "estatisticas_unicas": estatisticas_unicas,
+            "duplicatas": resumo_duplicatas,
+            "operacao": {
+                "tipo": "importar",
+                "origem": os.path.abspath(caminho_planilha),
+                "novos": escritor.total,
+                "alterados": 0,
+                "inalterados": 0,
+                "linhas_rejeitadas": rejeitados,
+                "exemplos_rejeitados": exemplos_rejeitados,
+                "colunas_ignoradas": extras,
+            },
+        }
+        return _publicar(temporario, diretorio, manifesto, ativar)
+    finally:
+        if os.path.isdir(temporario):
+            shutil.rmtree(temporario, ignore_errors=True)
+
+
+def _contar_linhas(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def _vincular(origem, destino):
+    # Segmentos são imutáveis: hard link evita copiar os dados entre versões
+    try:
+        os.link(origem, destino)
+    except OSError:
+        shutil.copy2(origem, destino)
+
+
+def _mapa_chaves(caminho_versao, manifesto):
+    # chave -> (segmento, posição, hash), lendo apenas as colunas internas
+    mapa = {}
+    for segmento in manifesto["segmentos"]:
+        caminho = os.path.join(caminho_versao, DIRETORIO_SEGMENTOS, segmento["nome"] + ".parquet")
+        tabela = pq.read_table(caminho, columns=["_chave", "_hash"])
+        removidos = set(manifesto["removidos"].get(segmento["nome"], []))
+        for posicao, (chave, hash_registro) in enumerate(zip(tabela["_chave"].to_pylist(), tabela["_hash"].to_pylist())):
+            if posicao not in removidos:
+                mapa[chave] = (segmento["nome"], posicao, hash_registro)
+    return mapa
+
+
+def _descontar_removidos(caminho_versao, removidos_novos, estatisticas):
+    # Subtrai das estatísticas os registros substituídos (lendo só as colunas necessárias)
+    colunas = ["Ramo Direito", "Repercussão Geral", "Classe Processo", "Data Julgamento"]
+    for nome_segmento, posicoes in removidos_novos.items():
+        caminho = os.path.join(caminho_versao, DIRETORIO_SEGMENTOS, nome_segmento + ".parquet")
+        linhas = pq.read_table(caminho, columns=colunas).take(sorted(posicoes)).to_pylist()
+        for linha in linhas:
+            _contar(estatisticas, linha, sinal=-1)
+
+
+# Função para anexar uma planilha com informativos novos: só registros novos ou alterados
+# entram (num segmento novo); a versão anterior dos alterados é marcada como removida.
+def anexar(caminho_planilha, diretorio=DIRETORIO_SNAPSHOTS, tamanho_bloco=TAMANHO_BLOCO, estrito=False,
+           aba=None, ativar=True):
+    caminho_base = caminho_snapshot_atual(diretorio)
+    if caminho_base is None:
+        return importar(caminho_planilha, diretorio, tamanho_bloco, estrito, aba, ativar)
+
+    base = ler_manifesto(caminho_base)
+    mapa = _mapa_chaves(caminho_base, base)
+    geracao = _proxima_geracao(diretorio)
+    temporario = tempfile.mkdtemp(prefix=".anexando-", dir=diretorio)
+    try:
+        os.makedirs(os.path.join(temporario, DIRETORIO_SEGMENTOS))
+        nome_segmento = f"s{geracao:04d}"
+        caminho_segmento = os.path.join(temporario, DIRETORIO_SEGMENTOS, nome_segmento + ".parquet")
+        estatisticas = json.loads(json.dumps(base["estatisticas"]))
+        escritor = _EscritorSegmento(caminho_segmento, tamanho_bloco, estatisticas)
+        gerar_chave = _GeradorChaves()
+        removidos_novos = {}
+        alterados = inalterados = 0
+        exemplos_rejeitados = []
+        with LeitorPlanilha(caminho_planilha, aba) as leitor, \
+                open(os.path.join(temporario, ARQUIVO_REJEITADOS), "w", encoding="utf-8") as arquivo_rejeitados:
+            for registro in _ler_validos(leitor, arquivo_rejeitados, exemplos_rejeitados):
+                chave = gerar_chave(registro)
+                hash_registro = hashlib.sha1(_hash_registro(registro)).hexdigest()
+                existente = mapa.get(chave)
+                if existente is not None:
+                    if existente[2] == hash_registro:
+                        inalterados += 1
+                        continue
+                    removidos_novos.setdefault(existente[0], []).append(existente[1])
+                    alterados += 1
+                escritor.adicionar(registro, chave, hash_registro)
+            extras = leitor.colunas_ignoradas
+        hash_segmento = escritor.fechar()
+        rejeitados = _contar_linhas(os.path.join(temporario, ARQUIVO_REJEITADOS))
+
+        if estrito and rejeitados:
+            raise ErroEsquema(f"{rejeitados} linha(s) inválida(s); nada foi anexado (modo estrito)")
+        # O ordinal da chave só identifica o processo se a planilha traz o grupo (informativo,
+        # classe) inteiro: com outra quantidade de linhas, os ordinais casariam processos trocados
+        armazenados = Counter(chave.rpartition("#")[0] for chave in mapa)
+        divergentes = [(base, quantidade) for base, quantidade in gerar_chave.ocorrencias.items()
+                       if armazenados.get(base, quantidade) != quantidade]
+        if divergentes:
+            detalhes = "; ".join(f"informativo {base.replace('|', ', classe ')}: {quantidade} na planilha, "
+                                 f"{armazenados[base]} no snapshot" for base, quantidade in divergentes[:10])
+            raise ErroEsquema(f"Quantidade de decisões diferente da gravada em {len(divergentes)} "
+                              f"informativo(s)/classe(s) ({detalhes}); a planilha deve trazer todas as decisões de cada informativo e classe "
+                              f"(para reorganizar uma edição, use importar). Nada foi anexado.")
+        if escritor.total == 0:
+            # Nada novo: a versão atual continua valendo
+            return base
+
+        _descontar_removidos(caminho_base, removidos_novos, estatisticas)
+
+        # Segmentos anteriores (e seus artefatos derivados) são reaproveitados
+        diretorio_segmentos_base = os.path.join(caminho_base, DIRETORIO_SEGMENTOS)
+        for nome_arquivo in os.listdir(diretorio_segmentos_base):
+            _vincular(os.path.join(diretorio_segmentos_base, nome_arquivo),
+                      os.path.join(temporario, DIRETORIO_SEGMENTOS, nome_arquivo))
+        _construir_derivados(caminho_segmento)
+
+        removidos = {nome: list(posicoes) for nome, posicoes in base["removidos"].items()}
+        for nome, posicoes in removidos_novos.items():
+            removidos[nome] = sorted(set(removidos.get(nome, [])) | set(posicoes))
+        segmentos = base["segmentos"] + [{"nome": nome_segmento, "hash": hash_segmento, "linhas": escritor.total}]
+        # Os grupos são recalculados sobre todas as assinaturas: um registro novo pode unir grupos antigos
+        resumo_duplicatas, estatisticas_unicas = _agrupar_duplicatas(temporario, segmentos, removidos)
+        manifesto = {
+            "geracao": geracao,
+            "hash": _hash_versao(segmentos, removidos),
+            "linhas": base["linhas"] + escritor.total - alterados,
+            "segmentos": segmentos,
+            "removidos": removidos,
+            "estatisticas": estatisticas,
+            "estatisticas_unicas": estatisticas_unicas,
+            "duplicatas": resumo_duplicatas,
+            "base": base["versao"],
+            "operacao": {
+                "tipo": "anexar",
+                "origem": os.path.abspath(caminho_planilha),
+                "novos": escritor.total - alterados,
+                "alterados": alterados,
+                "inalterados": inalterados,
+                "linhas_rejeitadas": rejeitados,
+                "exemplos_rejeitados": exemplos_rejeitados,
+                "colunas_ignoradas": extras,
+            },
+        }
+        return _publicar(temporario, diretorio, manifesto, ativar)
+    finally:
+        if os.path.isdir(temporario):
+            shutil.rmtree(temporario, ignore_errors=True)
+
+
+# Função para compactar o snapshot atual num único segmento, descartando os removidos
+def compactar(diretorio=DIRETORIO_SNAPSHOTS, tamanho_bloco=TAMANHO_BLOCO, ativar=True):
+    caminho_base = caminho_snapshot_atual(diretorio)
+    if caminho_base is None:
+        raise ErroEsquema("Não há snapshot para compactar")
+    base = ler_manifesto(caminho_base)
+    geracao = _proxima_geracao(diretorio)
+    temporario = tempfile.mkdtemp(prefix=".compactando-", dir=diretorio)
+    try:
+        os.makedirs(os.path.join(temporario, DIRETORIO_SEGMENTOS))
+        nome_segmento = f"s{geracao:04d}"
+        caminho_segmento = os.path.join(temporario, DIRETORIO_SEGMENTOS, nome_segmento + ".parquet")
+        estatisticas = _estatisticas_vazias()
+        escritor = _EscritorSegmento(caminho_segmento, tamanho_bloco, estatisticas)
+        for segmento in base["segmentos"]:
+            arquivo = pq.ParquetFile(os.path.join(caminho_base, DIRETORIO_SEGMENTOS, segmento["nome"] + ".parquet"))
+            removidos = set(base["removidos"].get(segmento["nome"], []))
+            posicao = 0
+            for lote in arquivo.iter_batches(batch_size=tamanho_bloco):
+                for linha in lote.to_pylist():
+                    if posicao not in removidos:
+                        chave, hash_registro = linha.pop("_chave"), linha.pop("_hash")
+                        escritor.adicionar(linha, chave, hash_registro)
+                    posicao += 1
+        hash_segmento = escritor.fechar()
+        _construir_derivados(caminho_segmento)
+        segmentos = [{"nome": nome_segmento, "hash": hash_segmento, "linhas": escritor.total}]
+        resumo_duplicatas, estatisticas_unicas = _agrupar_duplicatas(temporario, segmentos, {})
+        manifesto = {
+            "geracao": geracao,
+            "hash": _hash_versao(segmentos, {}),
+            "linhas": escritor.total,
+            "segmentos": segmentos,
+            "removidos": {},
+            "estatisticas": estatisticas,
+            "estatisticas_unicas": estatisticas_unicas,
+            "duplicatas": resumo_duplicatas,
+            "base": base["versao"],
+            "operacao": {"tipo": "compactar"},
+        }
+        return _publicar(temporario, diretorio, manifesto, ativar)
+    finally:
+        if os.path.isdir(temporario):
+            shutil.rmtree(temporario, ignore_errors=True)
+
+
+def _pico_memoria_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _argumentos_planilha(parser):
+    parser.add_argument("planilha")
+    parser.add_argument("--diretorio", default=DIRETORIO_SNAPSHOTS)
+    parser.add_argument("--tamanho-bloco", type=int, default=TAMANHO_BLOCO)
+    parser.add_argument("--aba", default=None)
+    parser.add_argument("--estrito", action="store_true", help="Falha se houver qualquer linha inválida")
+    parser.add_argument("--nao-ativar", action="store_true", help="Não aponta ATUAL para a nova versão")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingestão da planilha de informativos em snapshots versionados")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    _argumentos_planilha(subparsers.add_parser("importar", help="Importa uma planilha completa"))
+    _argumentos_planilha(subparsers.add_parser("anexar", help="Anexa apenas registros novos ou alterados"))
+    p_compactar = subparsers.add_parser("compactar", help="Reescreve o snapshot atual num único segmento")
+    p_compactar.add_argument("--diretorio", default=DIRETORIO_SNAPSHOTS)
+    p_compactar.add_argument("--nao-ativar", action="store_true")
+    p_indices = subparsers.add_parser("construir-indices", aliases=["build-indexes"],
+                                      help="Constrói em paralelo os índices de busca, citações e resumos")
+    p_indices.add_argument("--diretorio", default=DIRETORIO_SNAPSHOTS)
+    p_indices.add_argument("--versao", default=None, help="Diretório da versão (padrão: a versão em uso)")
+    p_indices.add_argument("--processos", type=int, default=None, help="Padrão: número de CPUs")
+
+    args = parser.parse_args(argv)
+    if args.comando in ("construir-indices", "build-indexes"):
+        import indices
+        try:
+            manifesto_indices = indices.construir_indices(args.versao, args.processos, args.diretorio)
+        except (ErroEsquema, OSError) as e:
+            print(f"Erro na construção dos índices: {e}", file=sys.stderr)
+            sys.exit(1)
+        tempos = manifesto_indices["tempos_s"]
+        print(f"Índices da versão {manifesto_indices['versao']}: {manifesto_indices['linhas']} linhas, "
+              f"{manifesto_indices['partes']} parte(s) em {manifesto_indices['processos']} processo(s)")
+        print(f"Tempo: {tempos['total']:.2f}s (paralelo {tempos['paralelo']:.2f}s, mescla {tempos['mescla']:.2f}s)")
+        return
+
+    versao_anterior = versao_atual(args.diretorio)
+    try:
+        if args.comando == "compactar":
+            manifesto = compactar(args.diretorio, ativar=not args.nao_ativar)
+        else:
+            funcao = importar if args.comando == "importar" else anexar
+            manifesto = funcao(args.planilha, args.diretorio, args.tamanho_bloco, args.estrito, args.aba,
+                               ativar=not args.nao_ativar)
+    except (ErroEsquema, OSError) as e:
+        print(f"Erro na ingestão: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.comando == "anexar" and manifesto["versao"] == versao_anterior:
+        print(f"Nenhum registro novo ou alterado; a versão {versao_anterior} continua em uso.")
+        return
+
+    operacao = manifesto["operacao"]
+    print(f"Versão: {manifesto['versao']} (geração {manifesto['geracao']}, {manifesto['linhas']} linhas, "
+          f"{len(manifesto['segmentos'])} segmento(s))")
+    if operacao["tipo"] != "compactar":
+        print(f"Novos: {operacao['novos']}, alterados: {operacao['alterados']}, "
+              f"inalterados: {operacao['inalterados']}, rejeitados: {operacao['linhas_rejeitadas']}")
+        for rejeicao in operacao["exemplos_rejeitados"]:
+            motivos = "; ".join(f"{e['coluna']}: {e['motivo']}" for e in rejeicao["erros"])
+            print(f"  linha {rejeicao['linha']}: {motivos}")
+        if manifesto.get("duplicatas"):
+            print(f"Quase duplicatas: {manifesto['duplicatas']['registros_duplicados']} registro(s) "
+                  f"em {manifesto['duplicatas']['grupos']} grupo(s)")
+        if operacao["colunas_ignoradas"]:
+            print(f"Colunas ignoradas: {', '.join(operacao['colunas_ignoradas'])}")
+    pico = _pico_memoria_mb()
+    if pico:
+        print(f"Pico de memória do processo: {pico:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
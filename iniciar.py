@@ -0,0 +1,118 @@
+"""Inicialização do servidor com aquecimento dos caches (partida a frio rápida).
+
+Com `streamlit run app.py`, o servidor fica pronto em poucos segundos, mas o primeiro
+usuário depois de cada deploy paga a leitura do snapshot, os índices, os resumos e a
+importação dos módulos pesados. Aqui isso tudo é feito antes de o servidor abrir a
+porta, no mesmo processo que depois roda o Streamlit (streamlit.web.bootstrap): os
+st.cache_resource de dados.py já estão preenchidos quando a primeira sessão chega, e
+o health check (/_stcore/health) só responde com o app aquecido.
+
+Uso:
+    python iniciar.py                          (equivale a streamlit run app.py, com aquecimento)
+    python iniciar.py --porta 8080 --endereco 0.0.0.0
+    python iniciar.py --somente-aquecer        (mede o aquecimento e sai)
+    python iniciar.py --perfil-importacao      (tempo de importação por módulo do app.py)
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+import streamlit.config
+import streamlit.logger
+
+ARQUIVO_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+# Função para medir o tempo de importação de cada módulo carregado por `import <modulo>`
+# (python -X importtime num processo novo). Retorna [(modulo, segundos)] do mais lento ao
+# mais rápido, só com os módulos importados diretamente até a profundidade indicada.
+def perfil_importacao(modulo="app", profundidade=2, limite=15):
+    processo = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                              capture_output=True, text=True, cwd=os.path.dirname(ARQUIVO_APP))
+    tempos = []
+    for linha in processo.stderr.splitlines():
+        correspondencia = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", linha)
+        if correspondencia and len(correspondencia.group(2)) // 2 <= profundidade:
+            tempos.append((correspondencia.group(3), int(correspondencia.group(1)) / 1e6))
+    return sorted(tempos, key=lambda item: -item[1])[:limite]
+
+
+# Função para carregar tudo o que a primeira sessão usaria. Retorna o tempo de cada etapa.
+def aquecer(arquivo_final=None):
+    tempos = {}
+
+    def etapa(nome, funcao):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos[nome] = round(time.perf_counter() - inicio, 3)
+        return resultado
+
+    # Os módulos pesados não entram na importação do app.py; aqui ficam prontos no processo
+    def importar_modulos():
+        import plotly.express  # noqa: F401
+
+        import cliente_openai
+        import exportacao
+        cliente_openai._openai()
+        cliente_openai._httpx()
+        exportacao._classe_documento()
+
+    etapa("importacoes", importar_modulos)
+    import dados
+    import ingestao
+    import resumos
+
+    arquivo_final = arquivo_final or dados.arquivo_dados()
+    df = etapa("dados", lambda: dados.carregar_dados(arquivo_final))
+    if df is None:
+        raise SystemExit(f"Não foi possível carregar os dados de {arquivo_final}")
+    etapa("indice_busca", lambda: dados.obter_indice_busca(arquivo_final))
+    etapa("indice_citacoes", lambda: dados.obter_indice_citacoes(arquivo_final))
+    if os.path.isdir(arquivo_final):
+        etapa("estatisticas", lambda: ingestao.estatisticas_snapshot(arquivo_final, unicas=True))
+    # Versões sem os índices prontos resumem as notícias uma vez por arquivo de dados
+    if resumos.COLUNA not in df.columns:
+        etapa("resumos", lambda: dados.obter_resumos(arquivo_final))
+    return tempos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor do app com aquecimento dos caches")
+    parser.add_argument("--porta", type=int, default=None)
+    parser.add_argument("--endereco", default=None)
+    parser.add_argument("--somente-aquecer", action="store_true")
+    parser.add_argument("--perfil-importacao", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.perfil_importacao:
+        for modulo, segundos in perfil_importacao():
+            print(f"{segundos * 1000:8.1f} ms  {modulo}")
+        return
+
+    inicio = time.perf_counter()
+    # Sem os avisos de "bare mode" durante o aquecimento (a configuração é lida antes, senão
+    # a leitura tardia restauraria o nível; o bootstrap volta ao nível configurado)
+    streamlit.config.get_option("logger.level")
+    streamlit.logger.set_log_level("error")
+    tempos = aquecer()
+    print("Aquecimento: " + ", ".join(f"{nome} {segundos:.2f}s" for nome, segundos in tempos.items())
+          + f" (total {time.perf_counter() - inicio:.2f}s)", file=sys.stderr)
+    if args.somente_aquecer:
+        return
+
+    from streamlit.web import bootstrap
+
+    opcoes = {}
+    if args.porta:
+        opcoes["server_port"] = args.porta
+    if args.endereco:
+        opcoes["server_address"] = args.endereco
+    bootstrap.load_config_options(flag_options=opcoes)
+    bootstrap.run(ARQUIVO_APP, False, [], opcoes)
+
+
+if __name__ == "__main__":
+    main()
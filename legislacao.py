@@ -0,0 +1,325 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+# Siglas de atos sem número -> chave canônica (códigos com duas versões levam o ano)
+DIPLOMAS_SIGLA = {
+    "cf": "cf88",
+    "crfb": "cf88",
+    "constituicao federal": "cf88",
+    "adct": "adct",
+    "cpp": "cpp",
+    "cp": "cp",
+    "clt": "clt",
+    "ctn": "ctn",
+    "cdc": "cdc",
+    "eca": "eca",
+    "ristf": "ristf",
+    "cadh": "cadh",
+    "codigo eleitoral": "ce",
+    "codigo penal": "cp",
+    "codigo de processo penal": "cpp",
+    "codigo tributario nacional": "ctn",
+}
+DIPLOMAS_COM_ANO = {"cpc": ("cpc", "2015"), "cc": ("cc", "2002"), "codigo civil": ("cc", "2002"),
+                    "codigo de processo civil": ("cpc", "2015")}
+
+# Atos numerados -> prefixo da chave (ordem importa: o mais longo primeiro)
+ATOS_NUMERADOS = [
+    ("lei complementar", "lc"),
+    ("lc", "lc"),
+    ("decreto-lei", "dl"),
+    ("decreto lei", "dl"),
+    ("dl", "dl"),
+    ("decreto", "decreto"),
+    ("emenda constitucional", "ec"),
+    ("ec", "ec"),
+    ("medida provisoria", "mp"),
+    ("mp", "mp"),
+    ("lei", "lei"),
+]
+
+UFS = {
+    "acre": "ac", "alagoas": "al", "amapa": "ap", "amazonas": "am", "bahia": "ba", "ceara": "ce",
+    "distrito federal": "df", "espirito santo": "es", "goias": "go", "maranhao": "ma", "mato grosso do sul": "ms",
+    "mato grosso": "mt", "minas gerais": "mg", "para": "pa", "paraiba": "pb", "parana": "pr", "pernambuco": "pe",
+    "piaui": "pi", "rio de janeiro": "rj", "rio grande do norte": "rn", "rio grande do sul": "rs",
+    "rondonia": "ro", "roraima": "rr", "santa catarina": "sc", "sao paulo": "sp", "sergipe": "se",
+    "tocantins": "to",
+}
+_UFS_REGEX = "|".join(sorted(UFS, key=len, reverse=True))
+
+
+def normalizar(texto):
+    # Minúsculas, sem acentos e sem indicadores ordinais (º, ª, °)
+    texto = texto.replace("º", "").replace("ª", "").replace("°", "")
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+_PADRAO_UF = rf"(?:\s+(?:do|da|de)\s+(?:estado\s+(?:do|da|de)\s+)?(?P<uf>{_UFS_REGEX})\b)?"
+# Ano como "/1990", "/90", ", de 1990" ou ", de 11 de dezembro de 1990"
+_PADRAO_NUMERADO = re.compile(
+    r"\b(?P<tipo>" + "|".join(re.escape(t) for t, _ in ATOS_NUMERADOS) + r")\.?\s*"
+    r"(?:n\.?\s*)?(?P<numero>\d{1,3}(?:\.\d{3})*|\d+)"
+    r"(?:\s*/\s*(?P<ano>\d{4}|\d{2})\b|\s*,?\s+de\s+(?:\d{1,2}\s+de\s+[a-z]+\s+de\s+)?(?P<ano_extenso>\d{4})\b)"
+    + _PADRAO_UF
+)
+_PADRAO_SIGLA = re.compile(
+    r"\b(?P<sigla>" + "|".join(re.escape(s) for s in sorted(list(DIPLOMAS_SIGLA) + list(DIPLOMAS_COM_ANO), key=len, reverse=True))
+    + r")\b(?:\s*/\s*(?P<ano>\d{4}|\d{2})\b)?"
+)
+_PADRAO_CONSTITUICAO_ESTADUAL = re.compile(
+    rf"\b(?:constituicao\s+(?:do\s+estado\s+)?(?:do|da|de)\s+(?P<uf>{_UFS_REGEX})\b|ces\s*/\s*(?P<sigla_uf>[a-z]{{2}})\b)"
+)
+_PADRAO_SUMULA = re.compile(
+    r"\b(?:enunciado\s+)?sumula\s+(?P<vinculante>vinculante\s+)?(?:n\.?\s*)?(?P<numero>\d+)(?:\s*/\s*(?P<tribunal>stf|stj|tst|tse))?"
+)
+
+# Dentro do trecho de um diploma: artigos, parágrafos e incisos
+_PADRAO_DISPOSITIVO = re.compile(
+    r"(?P<art>\barti?gos?\b|\barts?\b\.?)"
+    r"|(?P<par_unico>paragrafo\s+unico)"
+    r"|(?P<par>§§?|\bparagrafos?\b)"
+    r"|(?P<ate>\b(?:a|ate)\b)"
+    r"|(?P<num>\b\d+(?:-[a-z])?)"
+    r"|(?P<romano>\b[ivxlc]+\b)(?=[^a-z]|$)"
+)
+_PADRAO_ARTIGO = re.compile(r"\barti?gos?\b|\barts?\b")
+# Trecho terminado em "da"/"do" antes de um diploma: os artigos listados são dele ("arts. 1º e 2º da Lei ...")
+_CONECTIVO_FINAL = re.compile(r"\b(?:d[aeo]s?|n[ao]s?|dest[ae])[\s,]*$")
+# Maior intervalo expandido ("arts. 1º a 3º", "incisos I a IV"); acima disso, só os extremos
+MAX_INTERVALO = 50
+_ROMANO = re.compile(r"^m{0,3}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$")
+_VALORES_ROMANOS = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100, "d": 500, "m": 1000}
+
+
+def _romano_para_int(romano):
+    total = 0
+    for atual, seguinte in zip(romano, romano[1:] + " "):
+        valor = _VALORES_ROMANOS[atual]
+        total += -valor if seguinte != " " and _VALORES_ROMANOS[seguinte] > valor else valor
+    return total
+
+
+def _ano_completo(ano):
+    if len(ano) == 4:
+        return ano
+    return ("19" if int(ano) >= 30 else "20") + ano
+
+
+def _diplomas(texto):
+    # Lista (início, fim, chave) dos diplomas citados no texto normalizado
+    encontrados = []
+    for m in _PADRAO_NUMERADO.finditer(texto):
+        prefixo = dict(ATOS_NUMERADOS)[m.group("tipo")]
+        numero = m.group("numero").replace(".", "")
+        chave = f"{prefixo}:{int(numero)}/{_ano_completo(m.group('ano') or m.group('ano_extenso'))}"
+        if m.group("uf"):
+            chave += "@" + UFS[m.group("uf")]
+        encontrados.append((m.start(), m.end(), chave))
+    for m in _PADRAO_CONSTITUICAO_ESTADUAL.finditer(texto):
+        uf = UFS[m.group("uf")] if m.group("uf") else m.group("sigla_uf")
+        encontrados.append((m.start(), m.end(), f"ce@{uf}"))
+    for m in _PADRAO_SUMULA.finditer(texto):
+        if m.group("vinculante"):
+            chave = f"sv:{int(m.group('numero'))}"
+        else:
+            chave = f"sumula:{m.group('tribunal') or 'stf'}:{int(m.group('numero'))}"
+        encontrados.append((m.start(), m.end(), chave))
+    for m in _PADRAO_SIGLA.finditer(texto):
+        if any(inicio <= m.start() < fim for inicio, fim, _ in encontrados):
+            continue
+        sigla = m.group("sigla")
+        if sigla in DIPLOMAS_COM_ANO:
+            base, ano_padrao = DIPLOMAS_COM_ANO[sigla]
+            chave = base + (_ano_completo(m.group("ano")) if m.group("ano") else ano_padrao)
+        else:
+            chave = DIPLOMAS_SIGLA[sigla]
+        encontrados.append((m.start(), m.end(), chave))
+    # Remove sobreposições (ex.: "lei" dentro de "lei complementar"), mantendo o mais longo
+    encontrados.sort(key=lambda d: (d[0], -(d[1] - d[0])))
+    resultado = []
+    for diploma in encontrados:
+        if resultado and diploma[0] < resultado[-1][1]:
+            continue
+        resultado.append(diploma)
+    return resultado
+
+
+def _dispositivos(trecho, diploma):
+    # Percorre artigos/parágrafos/incisos do trecho e gera as chaves hierárquicas. Intervalos
+    # ("incisos I a IV", "arts. 1º até 3º") geram também os dispositivos intermediários.
+    chaves = []
+    artigo = paragrafo = None
+    modo = None
+    art_plural = par_plural = False
+    anterior = None  # (tipo, número, fim) do último dispositivo
+    fim_intervalo = None  # fim do "a"/"até" colado ao último dispositivo
+
+    # Dispositivos entre o anterior e este, se os dois formam um intervalo (None se não formam)
+    def intermediarios(tipo, numero, inicio):
+        if fim_intervalo is None or anterior[0] != tipo or trecho[fim_intervalo:inicio].strip():
+            return None
+        if not 0 < numero - anterior[1] <= MAX_INTERVALO:
+            return None
+        return range(anterior[1] + 1, numero)
+
+    for m in _PADRAO_DISPOSITIVO.finditer(trecho):
+        if m.group("ate"):
+            if anterior and not trecho[anterior[2]:m.start()].strip(" ,"):
+                fim_intervalo = m.end()
+            continue
+        if m.group("art"):
+            modo, art_plural = "art", m.group("art").startswith(("arts", "artigos"))
+            artigo = paragrafo = anterior = None
+        elif m.group("par_unico"):
+            if artigo:
+                paragrafo = "unico"
+                chaves.append(f"{diploma}:art{artigo}:par{paragrafo}")
+            modo, anterior = "pos_par", None
+        elif m.group("par"):
+            modo, par_plural = "par", m.group("par") in ("§§", "paragrafos")
+            anterior = None
+        elif m.group("num"):
+            numero = m.group("num")
+            inteiro = int(numero) if numero.isdigit() else None
+            if modo == "par" and artigo:
+                for n in (intermediarios("par", inteiro, m.start()) if inteiro else None) or ():
+                    chaves.append(f"{diploma}:art{artigo}:par{n}")
+                paragrafo = numero
+                chaves.append(f"{diploma}:art{artigo}:par{paragrafo}")
+                if not par_plural:
+                    modo = "art" if art_plural else "pos_par"
+                anterior = ("par", inteiro, m.end()) if inteiro else None
+            elif modo == "art" or (modo == "pos_art" and inteiro and intermediarios("art", inteiro, m.start()) is not None):
+                for n in (intermediarios("art", inteiro, m.start()) if inteiro else None) or ():
+                    chaves.append(f"{diploma}:art{n}")
+                artigo, paragrafo = numero, None
+                chaves.append(f"{diploma}:art{artigo}")
+                if not art_plural:
+                    modo = "pos_art"
+                anterior = ("art", inteiro, m.end()) if inteiro else None
+        elif m.group("romano") and artigo and _ROMANO.match(m.group("romano")):
+            inciso = _romano_para_int(m.group("romano"))
+            base = f"{diploma}:art{artigo}" + (f":par{paragrafo}" if paragrafo else "")
+            for n in intermediarios("inc", inciso, m.start()) or ():
+                chaves.append(f"{base}:inc{n}")
+            chaves.append(f"{base}:inc{inciso}")
+            anterior = ("inc", inciso, m.end())
+        fim_intervalo = None
+    return chaves
+
+
+def _trechos(normalizado, diplomas):
+    # Trechos de cada diploma: a lista de artigos logo antes dele, se o texto anterior termina
+    # em "da"/"do" ("arts. 1º e 2º da Lei ..."), e o texto depois dele até o próximo diploma
+    cortes = []
+    for i, (inicio, _, _) in enumerate(diplomas):
+        fim_anterior = diplomas[i - 1][1] if i else 0
+        corte = inicio
+        if _CONECTIVO_FINAL.search(normalizado, fim_anterior, inicio):
+            artigos = list(_PADRAO_ARTIGO.finditer(normalizado, fim_anterior, inicio))
+            if artigos:
+                corte = artigos[-1].start()
+        cortes.append(corte)
+    trechos = []
+    for i, (inicio, fim, _) in enumerate(diplomas):
+        proximo = cortes[i + 1] if i + 1 < len(diplomas) else len(normalizado)
+        trechos.append((normalizado[cortes[i]:inicio], normalizado[fim:proximo]))
+    return trechos
+
+
+# Função para extrair as citações normalizadas de um texto livre de legislação.
+# Cada dispositivo gera também as chaves dos níveis acima (diploma, artigo, parágrafo),
+# de modo que "CF art. 5º" encontra quem cita "CF art. 5º, XIII", mas não "art. 50".
+def extrair_citacoes(texto):
+    if not isinstance(texto, str) or not texto.strip():
+        return []
+    normalizado = normalizar(texto)
+    diplomas = _diplomas(normalizado)
+    chaves = []
+    for (_, _, diploma), trechos in zip(diplomas, _trechos(normalizado, diplomas)):
+        chaves.append(diploma)
+        for chave in _dispositivos(trechos[0], diploma) + _dispositivos(trechos[1], diploma):
+            partes = chave.split(":")
+            # "lei:8112/1990:art5" -> ancestrais a partir do diploma
+            inicio = 2 if diploma.count(":") else 1
+            for n in range(inicio + 1, len(partes) + 1):
+                chaves.append(":".join(partes[:n]))
+    return list(dict.fromkeys(chaves))
+
+
+# Função para interpretar uma consulta ("Lei 8.112/1990", "CF art. 5º, XIII", "Súmula Vinculante 13").
+# Sem diploma explícito, artigos são interpretados como da CF/1988. Retorna as chaves mais
+# específicas pedidas (as que não são prefixo de outra).
+def interpretar_consulta(texto):
+    chaves = extrair_citacoes(texto)
+    if not chaves and re.search(r"\bart", normalizar(texto or "")):
+        chaves = extrair_citacoes("CF/1988, " + texto)
+    return [c for c in chaves if not any(o != c and o.startswith(c + ":") for o in chaves)]
+
+
+# Função para extrair as ocorrências (chave, linha) de uma sequência de textos no formato COO:
+# chaves ordenadas e pares (id da chave, posição) ordenados; inicio desloca as posições
+def ocorrencias_citacoes(textos, inicio=0):
+    ids_locais = {}
+    ids_linhas = []
+    posicoes_linhas = []
+    for posicao, texto in enumerate(textos, start=inicio):
+        chaves = extrair_citacoes(texto)
+        ids_linhas.extend(ids_locais.setdefault(chave, len(ids_locais)) for chave in chaves)
+        posicoes_linhas.extend([posicao] * len(chaves))
+    chaves = sorted(ids_locais)
+    ranking = np.empty(len(chaves), dtype=np.int32)
+    ranking[[ids_locais[chave] for chave in chaves]] = np.arange(len(chaves), dtype=np.int32)
+    ids = ranking[np.asarray(ids_linhas, dtype=np.int64)] if ids_linhas else np.empty(0, dtype=np.int32)
+    ordem = np.argsort(ids, kind="stable")
+    return chaves, ids[ordem], np.asarray(posicoes_linhas, dtype=np.int32)[ordem]
+
+
+class IndiceCitacoes:
+    # Índice invertido: chave canônica -> posições (ordenadas) das linhas que a citam
+
+    def __init__(self, postings, total_linhas):
+        self.postings = postings
+        self.total_linhas = total_linhas
+
+    @classmethod
+    def construir(cls, textos):
+        listas = defaultdict(list)
+        total = 0
+        for posicao, texto in enumerate(textos):
+            total += 1
+            for chave in extrair_citacoes(texto):
+                listas[chave].append(posicao)
+        postings = {chave: np.asarray(posicoes, dtype=np.int64) for chave, posicoes in listas.items()}
+        return cls(postings, total)
+
+    # Índice a partir do formato CSR gravado por indices.py (chaves ordenadas, deslocamentos, posições)
+    @classmethod
+    def de_csr(cls, chaves, deslocamentos, posicoes, total_linhas):
+        postings = {chave: posicoes[deslocamentos[i]:deslocamentos[i + 1]] for i, chave in enumerate(chaves)}
+        return cls(postings, total_linhas)
+
+    def posicoes(self, chave):
+        return self.postings.get(chave, np.empty(0, dtype=np.int64))
+
+    # Consulta por texto livre: linhas que citam todas (modo "e") ou alguma (modo "ou")
+    # das chaves interpretadas
+    def consultar(self, texto, modo="e"):
+        chaves = interpretar_consulta(texto)
+        if not chaves:
+            return chaves, np.empty(0, dtype=np.int64)
+        listas = sorted((self.posicoes(c) for c in chaves), key=len)
+        resultado = listas[0]
+        for lista in listas[1:]:
+            resultado = np.intersect1d(resultado, lista, assume_unique=True) if modo == "e" else np.union1d(resultado, lista)
+        return chaves, resultado
+
+    # Chaves mais citadas com um prefixo (ex.: "cf88:art" para os artigos da CF mais citados)
+    def mais_citadas(self, prefixo="", limite=20):
+        itens = [(chave, len(p)) for chave, p in self.postings.items() if chave.startswith(prefixo)]
+        return sorted(itens, key=lambda item: (-item[1], item[0]))[:limite]
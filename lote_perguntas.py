@@ -0,0 +1,301 @@
+"""Respostas em lote para uma lista de perguntas (sem a interface do Streamlit).
+
+Lê as perguntas de um arquivo, recupera o contexto de todas pelo índice de
+busca numa passada vetorizada (mesmo resultado de
+perguntas.encontrar_registros_relevantes, com a pontuação de cada
+palavra-chave calculada uma vez para todas as perguntas) e emite as completions em paralelo, sob limite de
+concorrência e de requisições por minuto. Cada resposta é gravada no JSONL
+de saída assim que fica pronta; o próprio arquivo de saída serve de ponto de
+retomada (perguntas já respondidas são puladas) e um cache persistente evita
+pagar de novo por chamadas idênticas.
+
+Arquivo de perguntas: .txt (uma por linha) ou .jsonl ({"id": ..., "pergunta": ...}).
+A chave vem de OPENAI_API_KEY ou de .streamlit/secrets.toml ([openai] api_key).
+
+Uso:
+    python lote_perguntas.py perguntas.txt --saida respostas.jsonl
+    python lote_perguntas.py perguntas.jsonl --saida respostas.jsonl --concorrencia 8 --rpm 120
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+import tomllib
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import streamlit.logger
+
+import cliente_openai
+import dados
+from perguntas import PESOS_CONTEXTO, criar_contexto, palavras_chave, parametros_pergunta
+import telemetria
+
+ARQUIVO_SECRETS = os.path.join(".streamlit", "secrets.toml")
+ARQUIVO_CACHE = os.path.join("data", "cache_respostas.jsonl")
+# Pares (pergunta, linha) pontuados de uma vez na recuperação em lote
+LIMITE_ENTRADAS = 5_000_000
+
+
+# Função para recuperar os registros relevantes de várias perguntas de uma vez, com o mesmo
+# resultado de perguntas.encontrar_registros_relevantes. Cada palavra-chave distinta é pontuada
+# uma vez pelo índice (linhas com pontuação não nula, em CSR); as pontuações de todas as
+# perguntas saem de uma soma por (pergunta, linha), seguida de uma ordenação por pergunta e
+# pontuação e da escolha de um registro por grupo de duplicatas. As perguntas são processadas
+# em blocos de até LIMITE_ENTRADAS pares (pergunta, linha) para limitar a memória.
+def recuperar_em_lote(perguntas, df, indice, max_registros=3):
+    chaves_perguntas = [palavras_chave(pergunta) for pergunta in perguntas]
+    vocabulario = sorted({palavra for chaves in chaves_perguntas for palavra in chaves})
+    linhas_palavras = []
+    pontos_palavras = []
+    for palavra in vocabulario:
+        pontos = indice.pontuar([palavra], PESOS_CONTEXTO)
+        linhas_palavras.append(np.flatnonzero(pontos))
+        pontos_palavras.append(pontos[linhas_palavras[-1]])
+    deslocamentos = np.concatenate(([0], np.cumsum([len(linhas) for linhas in linhas_palavras]))).astype(np.int64)
+    linhas_palavras = np.concatenate(linhas_palavras) if vocabulario else np.empty(0, dtype=np.int64)
+    pontos_palavras = np.concatenate(pontos_palavras) if vocabulario else np.empty(0, dtype=np.float64)
+
+    # Pares (pergunta, palavra), com repetição: uma palavra repetida na pergunta conta duas vezes
+    perguntas_pares = np.repeat(np.arange(len(perguntas), dtype=np.int64), [len(chaves) for chaves in chaves_perguntas])
+    palavras_pares = np.searchsorted(np.asarray(vocabulario, dtype=str),
+                                     np.asarray([p for chaves in chaves_perguntas for p in chaves], dtype=str))
+    tamanhos = deslocamentos[palavras_pares + 1] - deslocamentos[palavras_pares]
+    por_pergunta = np.bincount(perguntas_pares, weights=tamanhos, minlength=len(perguntas))
+    blocos = ((np.cumsum(por_pergunta) - por_pergunta) // LIMITE_ENTRADAS)[perguntas_pares]
+    grupos = pd.factorize(df["ID Canônico"])[0] if "ID Canônico" in df.columns else np.arange(len(df))
+    total_linhas = max(len(df), 1)
+
+    resultados = [[] for _ in perguntas]
+    for bloco in np.unique(blocos):
+        pares = np.flatnonzero(blocos == bloco)
+        # Cada par se expande nas linhas da palavra: (pergunta, linha, pontos)
+        entradas = np.repeat(deslocamentos[palavras_pares[pares]] - np.cumsum(tamanhos[pares]) + tamanhos[pares],
+                             tamanhos[pares]) + np.arange(int(tamanhos[pares].sum()))
+        combinadas = np.repeat(perguntas_pares[pares], tamanhos[pares]) * total_linhas + linhas_palavras[entradas]
+        unicas, inverso = np.unique(combinadas, return_inverse=True)
+        pontuacao = np.bincount(inverso, weights=pontos_palavras[entradas])
+        pergunta, linha = np.divmod(unicas, total_linhas)
+        # Por pergunta, maior pontuação primeiro e empates na ordem do DataFrame
+        ordem = np.lexsort((linha, -pontuacao, pergunta))
+        pergunta, linha = pergunta[ordem], linha[ordem]
+        # O primeiro de cada grupo de duplicatas, e só os max_registros primeiros de cada pergunta
+        _, primeiros = np.unique(pergunta * total_linhas + grupos[linha], return_index=True)
+        primeiros = np.sort(primeiros)
+        pergunta, linha = pergunta[primeiros], linha[primeiros]
+        postos = np.arange(len(pergunta)) - np.searchsorted(pergunta, pergunta)
+        for i, posicao in zip(pergunta[postos < max_registros], linha[postos < max_registros]):
+            resultados[i].append(df.iloc[posicao])
+    return resultados
+
+
+class CacheRespostas:
+    # Cache persistente (JSONL, só acrescenta) das respostas, por hash dos parâmetros da chamada
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.respostas = {}
+        if caminho and os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue  # linha truncada por uma interrupção
+                    self.respostas[registro["chave"]] = registro["resposta"]
+        self.arquivo = None
+        if caminho:
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+            self.arquivo = open(caminho, "a", encoding="utf-8")
+
+    @staticmethod
+    def chave(parametros):
+        return hashlib.sha256(json.dumps(parametros, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def obter(self, chave):
+        return self.respostas.get(chave)
+
+    def gravar(self, chave, resposta):
+        self.respostas[chave] = resposta
+        if self.arquivo:
+            self.arquivo.write(json.dumps({"chave": chave, "resposta": resposta}, ensure_ascii=False) + "\n")
+            self.arquivo.flush()
+
+    def fechar(self):
+        if self.arquivo:
+            self.arquivo.close()
+
+
+def carregar_perguntas(caminho):
+    perguntas = []
+    with open(caminho, encoding="utf-8") as f:
+        for numero, linha in enumerate(f, start=1):
+            linha = linha.strip()
+            if not linha:
+                continue
+            if caminho.endswith(".jsonl"):
+                registro = json.loads(linha)
+                perguntas.append({"id": str(registro.get("id", numero)), "pergunta": registro["pergunta"]})
+            else:
+                perguntas.append({"id": str(numero), "pergunta": linha})
+    return perguntas
+
+
+# Função para ler os ids já respondidos na saída (ponto de retomada); respostas com erro são refeitas
+def respondidas(caminho_saida):
+    ids = set()
+    if not os.path.exists(caminho_saida):
+        return ids
+    with open(caminho_saida, encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                continue
+            if registro.get("resposta") is not None and not registro.get("erro"):
+                ids.add(registro["id"])
+    return ids
+
+
+def _credenciais(args):
+    api_key = os.environ.get("OPENAI_API_KEY")
+    base_url = args.base_url
+    if not api_key and os.path.exists(ARQUIVO_SECRETS):
+        with open(ARQUIVO_SECRETS, "rb") as f:
+            configuracao = tomllib.load(f).get("openai", {})
+        api_key = configuracao.get("api_key")
+        base_url = base_url or configuracao.get("base_url")
+    return api_key, base_url
+
+
+async def _responder(itens, cliente, cache, limitador, max_concorrencia, arquivo_saida, contagem):
+    semaforo = asyncio.Semaphore(max_concorrencia)
+
+    async def _tarefa(item):
+        chave = cache.chave(item["parametros"])
+        resposta = cache.obter(chave)
+        if resposta is not None:
+            return item, resposta, "cache", None, None
+        async with semaforo:
+            await limitador.aguardar()
+            chamada = telemetria.Chamada("pergunta_lote", item["parametros"]["model"])
+            try:
+                completion = await cliente_openai.criar_chat_completion_async(
+                    cliente, detalhes=chamada.detalhes, **item["parametros"])
+            except Exception as e:
+                chamada.fallback(telemetria.ERRO_API, e)
+                chamada.registrar()
+                return item, None, "api", f"{type(e).__name__}: {e}", chamada
+        chamada.resposta(completion)
+        chamada.registrar()
+        resposta = completion.choices[0].message.content.strip()
+        cache.gravar(chave, resposta)
+        return item, resposta, "api", None, chamada
+
+    for futuro in asyncio.as_completed([_tarefa(item) for item in itens]):
+        item, resposta, fonte, erro, chamada = await futuro
+        registro = {
+            "id": item["id"],
+            "pergunta": item["pergunta"],
+            "resposta": resposta,
+            "fonte": fonte,
+            "informativos": item["informativos"],
+            "duracao_s": round(chamada.latencia_s, 3) if chamada else 0.0,
+        }
+        if chamada:
+            registro["tentativas"] = chamada.detalhes.get("tentativas", 1)
+            registro["tokens_prompt"] = chamada.tokens_prompt
+            registro["tokens_completion"] = chamada.tokens_completion
+        if erro:
+            registro["erro"] = erro
+        arquivo_saida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        arquivo_saida.flush()
+        contagem["erros" if erro else fonte] += 1
+        total = sum(contagem.values())
+        if total % 25 == 0:
+            print(f"  {total}/{len(itens)} processadas", file=sys.stderr)
+
+
+def executar(args):
+    streamlit.logger.set_log_level("error")
+    inicio = time.perf_counter()
+    perguntas = carregar_perguntas(args.perguntas)
+    ja_respondidas = respondidas(args.saida) if not args.recomecar else set()
+    pendentes = [p for p in perguntas if p["id"] not in ja_respondidas]
+    print(f"{len(perguntas)} perguntas, {len(perguntas) - len(pendentes)} já respondidas, "
+          f"{len(pendentes)} pendentes", file=sys.stderr)
+    if not pendentes:
+        return
+
+    api_key, base_url = _credenciais(args)
+    if not api_key:
+        print("Chave da API não configurada (OPENAI_API_KEY ou .streamlit/secrets.toml).", file=sys.stderr)
+        sys.exit(1)
+
+    df = dados.carregar_dados(args.dados)
+    indice = dados.obter_indice_busca(args.dados)
+    if df is None or indice is None:
+        print(f"Não foi possível carregar os dados de {args.dados}.", file=sys.stderr)
+        sys.exit(1)
+
+    inicio_recuperacao = time.perf_counter()
+    registros = recuperar_em_lote([p["pergunta"] for p in pendentes], df, indice)
+    for pergunta, relevantes in zip(pendentes, registros):
+        contexto = criar_contexto(relevantes, noticia_completa=args.noticia_completa)
+        pergunta["parametros"] = parametros_pergunta(pergunta["pergunta"], contexto)
+        pergunta["informativos"] = [int(r["Informativo"]) for r in relevantes]
+    tempo_recuperacao = time.perf_counter() - inicio_recuperacao
+
+    async def _principal():
+        cliente = cliente_openai.criar_cliente_async(api_key, base_url, max_conexoes=args.concorrencia)
+        try:
+            with open(args.saida, "w" if args.recomecar else "a", encoding="utf-8") as arquivo_saida:
+                await _responder(pendentes, cliente, cache, cliente_openai.LimitadorTaxa(args.rpm),
+                                 args.concorrencia, arquivo_saida, contagem)
+        finally:
+            await cliente.close()
+
+    cache = CacheRespostas(None if args.sem_cache else args.cache)
+    contagem = Counter()
+    inicio_respostas = time.perf_counter()
+    try:
+        asyncio.run(_principal())
+    finally:
+        cache.fechar()
+    tempo_respostas = time.perf_counter() - inicio_respostas
+
+    duracao = time.perf_counter() - inicio
+    processadas = sum(contagem.values())
+    print(f"{processadas} perguntas em {duracao:.1f}s: {processadas / duracao * 60:.1f} perguntas/min "
+          f"(recuperação {tempo_recuperacao:.2f}s, respostas {tempo_respostas:.1f}s)", file=sys.stderr)
+    print(f"API: {contagem['api']}, cache: {contagem['cache']}, erros: {contagem['erros']}", file=sys.stderr)
+    for linha in telemetria.resumo():
+        print(f"{linha['modelo']}: {linha['chamadas']} chamadas, {linha['tentativas_extras']} novas tentativas, "
+              f"tokens {linha['tokens_prompt']} prompt / {linha['tokens_completion']} resposta, "
+              f"latência p95 {linha['latencia_p95_s'] or 0:.2f}s", file=sys.stderr)
+    if contagem["erros"]:
+        print("Execute novamente para refazer as perguntas com erro.", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Respostas em lote para perguntas sobre os informativos")
+    parser.add_argument("perguntas", help="Arquivo .txt (uma pergunta por linha) ou .jsonl")
+    parser.add_argument("--saida", required=True, help="Arquivo JSONL de respostas (também o ponto de retomada)")
+    parser.add_argument("--dados", default=dados.ARQUIVO_DADOS)
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--rpm", type=float, default=60.0, help="Máximo de requisições por minuto (0 = sem limite)")
+    parser.add_argument("--cache", default=ARQUIVO_CACHE)
+    parser.add_argument("--sem-cache", action="store_true")
+    parser.add_argument("--recomecar", action="store_true", help="Ignora a saída existente e a sobrescreve")
+    parser.add_argument("--noticia-completa", action="store_true",
+                        help="Envia a notícia completa no contexto em vez do resumo")
+    parser.add_argument("--base-url", default=None, help="Endpoint compatível com a API da OpenAI")
+    executar(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import functools
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Instrumentação desligada por padrão; com STF_METRICAS=1 cada etapa medida
+# alimenta um histograma e a lista de spans do rerun corrente.
+ATIVADO = os.environ.get("STF_METRICAS", "").lower() not in ("", "0", "false", "nao", "não")
+
+# Destino opcional: arquivo .prom (texto Prometheus, sobrescrito a cada rerun)
+# ou .jsonl (um registro por span, acrescentado), e/ou porta HTTP para /metrics
+ARQUIVO_EXPORTACAO = os.environ.get("STF_METRICAS_ARQUIVO")
+PORTA_EXPORTACAO = os.environ.get("STF_METRICAS_PORTA")
+
+# Limites superiores (em segundos) dos buckets dos histogramas
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, math.inf)
+
+
+class Histograma:
+    __slots__ = ("contagens", "soma", "total")
+
+    def __init__(self):
+        self.contagens = [0] * len(BUCKETS)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(BUCKETS):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+        self.soma += valor
+        self.total += 1
+
+
+_histogramas = {}
+_trava = threading.Lock()
+# Funções que acrescentam linhas ao texto do Prometheus (ex.: telemetria.linhas_prometheus)
+_coletores = []
+# Spans do rerun corrente: o Streamlit executa cada rerun numa thread da sessão
+_local = threading.local()
+
+
+def _registrar(nome, duracao, profundidade):
+    with _trava:
+        histograma = _histogramas.get(nome)
+        if histograma is None:
+            histograma = _histogramas[nome] = Histograma()
+        histograma.observar(duracao)
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        spans.append({"etapa": nome, "duracao_s": duracao, "profundidade": profundidade, "ts": time.time()})
+
+
+class _SpanNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+class _Span:
+    __slots__ = ("nome", "inicio", "profundidade")
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def __enter__(self):
+        self.profundidade = getattr(_local, "profundidade", 0)
+        _local.profundidade = self.profundidade + 1
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duracao = time.perf_counter() - self.inicio
+        _local.profundidade = self.profundidade
+        _registrar(self.nome, duracao, self.profundidade)
+        return False
+
+
+# Gerenciador de contexto para medir uma etapa (custo quase nulo se desativado)
+def medir(nome):
+    if not ATIVADO:
+        return _SPAN_NULO
+    return _Span(nome)
+
+
+# Decorador equivalente a medir(), com o nome da função como etapa padrão
+def medido(nome=None):
+    def decorador(funcao):
+        etapa = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            if not ATIVADO:
+                return funcao(*args, **kwargs)
+            with _Span(etapa):
+                return funcao(*args, **kwargs)
+
+        return envoltorio
+
+    return decorador
+
+
+# Função para marcar o início de um rerun (zera os spans da thread corrente)
+def iniciar_rerun():
+    if not ATIVADO:
+        return
+    _local.spans = []
+    _local.profundidade = 0
+    _local.inicio_rerun = time.perf_counter()
+    _iniciar_servidor()
+
+
+# Função para encerrar o rerun: registra o tempo total e exporta
+def finalizar_rerun():
+    if not ATIVADO or getattr(_local, "inicio_rerun", None) is None:
+        return []
+    _registrar("rerun", time.perf_counter() - _local.inicio_rerun, 0)
+    _local.inicio_rerun = None
+    spans = spans_do_rerun()
+    if ARQUIVO_EXPORTACAO:
+        try:
+            exportar(ARQUIVO_EXPORTACAO, spans)
+        except OSError as e:
+            print(f"Erro ao exportar métricas: {e}")
+    return spans
+
+
+# Função para obter os spans registrados no rerun corrente
+def spans_do_rerun():
+    return list(getattr(_local, "spans", None) or [])
+
+
+# Função para acrescentar as métricas de outro módulo à exposição do Prometheus
+def registrar_coletor(funcao):
+    if funcao not in _coletores:
+        _coletores.append(funcao)
+
+
+# Função para gerar o texto no formato de exposição do Prometheus
+def exportar_prometheus():
+    linhas = [
+        "# HELP stf_etapa_duracao_segundos Duração das etapas do dashboard.",
+        "# TYPE stf_etapa_duracao_segundos histogram",
+    ]
+    with _trava:
+        itens = sorted((nome, list(h.contagens), h.soma, h.total) for nome, h in _histogramas.items())
+    for nome, contagens, soma, total in itens:
+        acumulado = 0
+        for limite, contagem in zip(BUCKETS, contagens):
+            acumulado += contagem
+            le = "+Inf" if math.isinf(limite) else repr(limite)
+            linhas.append(f'stf_etapa_duracao_segundos_bucket{{etapa="{nome}",le="{le}"}} {acumulado}')
+        linhas.append(f'stf_etapa_duracao_segundos_sum{{etapa="{nome}"}} {soma:.6f}')
+        linhas.append(f'stf_etapa_duracao_segundos_count{{etapa="{nome}"}} {total}')
+    for coletor in _coletores:
+        linhas.extend(coletor())
+    return "\n".join(linhas) + "\n"
+
+
+# Função para exportar as métricas para arquivo (.prom ou .jsonl)
+def exportar(caminho, spans=None):
+    if caminho.endswith(".jsonl"):
+        with open(caminho, "a", encoding="utf-8") as f:
+            for span in spans if spans is not None else spans_do_rerun():
+                f.write(json.dumps(span, ensure_ascii=False) + "\n")
+    else:
+        # Um temporário por chamada: reruns simultâneos (threads do mesmo processo) não se sobrepõem
+        descritor, temporario = tempfile.mkstemp(prefix=os.path.basename(caminho) + ".", suffix=".tmp",
+                                                 dir=os.path.dirname(caminho) or ".")
+        try:
+            with os.fdopen(descritor, "w", encoding="utf-8") as f:
+                f.write(exportar_prometheus())
+            os.replace(temporario, caminho)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+
+
+class _ManipuladorMetricas(BaseHTTPRequestHandler):
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        corpo = exportar_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+_servidor = None
+
+
+def _iniciar_servidor():
+    global _servidor
+    if not PORTA_EXPORTACAO or _servidor is not None:
+        return
+    with _trava:
+        if _servidor is None:
+            try:
+                _servidor = ThreadingHTTPServer(("127.0.0.1", int(PORTA_EXPORTACAO)), _ManipuladorMetricas)
+            except OSError as e:
+                print(f"Erro ao iniciar o endpoint de métricas: {e}")
+                _servidor = False
+                return
+            threading.Thread(target=_servidor.serve_forever, daemon=True).start()
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+import busca
+import metricas
+import resumos
+import roteamento
+
+# Contexto das perguntas sobre os informativos: recuperação dos registros relevantes, montagem
+# do contexto e dos parâmetros da chamada à API. Usado pelo app.py e pelo lote_perguntas.py,
+# por isso fica fora do app.py (importá-lo executaria a página do Streamlit).
+
+# Pesos de cada campo na pontuação dos registros relevantes para a pergunta
+PESOS_CONTEXTO = {"Título": 3, "Resumo": 2, "Matéria": 1, "Ramo Direito": 1, "Legislação": 1, "Notícia completa": 1}
+
+
+# Palavras-chave da pergunta (normalizadas: a pergunta sem acentos acha os textos acentuados)
+def palavras_chave(pergunta):
+    return [palavra for palavra in busca.palavras(pergunta) if len(palavra) > 3]
+
+
+# Função para escolher os registros de maior pontuação, um por grupo de decisões duplicadas
+# (empates na ordem do DataFrame)
+def selecionar(pontuacao, df, max_registros=3):
+    candidatos = np.flatnonzero(pontuacao)
+    candidatos = candidatos[np.argsort(-pontuacao[candidatos], kind="stable")]
+    grupos_canonicos = df["ID Canônico"] if "ID Canônico" in df.columns else None
+    selecionados = []
+    grupos = set()
+    for posicao in candidatos:
+        grupo = grupos_canonicos.iat[posicao] if grupos_canonicos is not None else df.index[posicao]
+        if grupo in grupos:
+            continue
+        grupos.add(grupo)
+        selecionados.append(df.iloc[posicao])
+        if len(selecionados) >= max_registros:
+            break
+    return selecionados
+
+
+# Função para encontrar registros relevantes para a pergunta, pelo índice de busca. As posições
+# do índice correspondem às linhas de df (dados.carregar_dados e dados.obter_indice_busca).
+@metricas.medido()
+def encontrar_registros_relevantes(pergunta, df, indice, max_registros=3):
+    chaves = palavras_chave(pergunta)
+    if not chaves:
+        return []
+    return selecionar(indice.pontuar(chaves, PESOS_CONTEXTO), df, max_registros)
+
+
+# Função para obter o resumo extrativo da notícia completa (pré-calculado pelo construir-indices
+# ou, se a versão não tiver os índices, calculado na hora)
+def resumo_noticia(registro):
+    if 'Notícia completa' not in registro or pd.isna(registro["Notícia completa"]):
+        return None
+    if resumos.COLUNA in registro and pd.notna(registro[resumos.COLUNA]):
+        return registro[resumos.COLUNA]
+    return resumos.resumir(registro["Notícia completa"])
+
+
+# Função para criar um contexto baseado nos registros relevantes
+# (com o resumo da notícia; noticia_completa=True envia o texto inteiro)
+@metricas.medido()
+def criar_contexto(registros_relevantes, noticia_completa=False):
+    if not registros_relevantes:
+        return ""
+
+    contexto = "Contexto dos informativos do STF:\n\n"
+
+    for i, registro in enumerate(registros_relevantes):
+        informativo = registro["Informativo"]
+        data = registro["Data Julgamento"].strftime("%d/%m/%Y") if pd.notna(registro["Data Julgamento"]) else "data não especificada"
+        titulo = registro["Título"] if pd.notna(registro["Título"]) else "Título não disponível"
+
+        contexto += f"Informativo {informativo} ({data}): {titulo}\n"
+
+        if pd.notna(registro["Resumo"]):
+            contexto += f"Resumo: {registro['Resumo']}\n"
+
+        if pd.notna(registro["Tese Julgado"]):
+            contexto += f"Tese: {registro['Tese Julgado']}\n"
+
+        if 'Legislação' in registro and pd.notna(registro["Legislação"]):
+            contexto += f"Legislação: {registro['Legislação']}\n"
+
+        if noticia_completa and 'Notícia completa' in registro and pd.notna(registro["Notícia completa"]):
+            contexto += f"Notícia Completa: {registro['Notícia completa']}\n"
+        elif resumo_noticia(registro):
+            contexto += f"Notícia (resumo): {resumo_noticia(registro)}\n"
+
+        contexto += "\n"
+
+    return contexto
+
+
+# Função para montar os parâmetros da chamada à API para uma pergunta.
+# Sem rota, usa a rota fixa do tipo "pergunta" (ver roteamento.py).
+def parametros_pergunta(pergunta, contexto, rota=None):
+    rota = rota or roteamento.rota_padrao("pergunta")
+    # Construir o prompt
+    prompt = f"""Você é um assistente especializado em informativos do Supremo Tribunal Federal do Brasil.
+Responda à pergunta do usuário com base apenas nas informações fornecidas abaixo.
+Se as informações não forem suficientes para responder à pergunta, diga que não há informações suficientes nos informativos entre 2021 e 2025.
+
+CONTEXTO DOS INFORMATIVOS:
+{contexto}
+
+PERGUNTA DO USUÁRIO:
+{pergunta}
+
+RESPOSTA:"""
+    return dict(
+        model=rota.modelo,
+        messages=[
+            {"role": "system", "content": "Você é um assistente especializado em informativos do STF."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=rota.max_tokens,  # Limitar o tamanho da resposta
+        temperature=rota.temperatura, # Controlar a criatividade da resposta
+    )
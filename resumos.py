@@ -0,0 +1,100 @@
+import functools
+import re
+
+import numpy as np
+
+from busca import normalizar, palavras
+
+# Coluna com o resumo pré-calculado (ver indices.py); a notícia completa só é exibida sob demanda
+COLUNA = "Resumo da Notícia"
+# Tamanho máximo do resumo extrativo da notícia, em caracteres
+TAMANHO_RESUMO = 600
+# TextRank: fator de amortecimento, iterações e tolerância da iteração de potência
+AMORTECIMENTO = 0.85
+MAX_ITERACOES = 50
+TOLERANCIA = 1e-6
+
+# Abreviações comuns nos informativos que terminam em ponto sem encerrar a frase, em qualquer
+# caixa ("art.", "Art.", "ART.")
+_ABREVIACOES = "".join(rf"(?<!\b(?i:{abreviacao})\.)" for abreviacao in (
+    "art", "arts", "inc", "incs", "min", "rel", "n", "nº", "des", "p", "fl", "fls", "al", "dr", "dra", "sr", "sra"))
+_FIM_SENTENCA = re.compile(_ABREVIACOES + r"(?<=[.!?])\s+(?=[\"“(]?[A-ZÀ-Ý0-9])|\n+")
+_STOPWORDS = frozenset(normalizar(
+    "a ao aos as com como da das de do dos e ela elas ele eles em entre era essa esse esta este foi for "
+    "isso isto ja lhe mais mas na nas nao no nos o os ou para pela pelas pelo pelos por que se sem ser "
+    "seu seus sua suas so tambem um uma umas uns ter tem sao sobre ate quando qual quais onde bem"
+).split())
+
+
+# Função para dividir um texto em sentenças (sem quebrar em "art.", "Min.", "n." etc.)
+def sentencas(texto):
+    return [s.strip() for s in _FIM_SENTENCA.split(texto) if s and s.strip()]
+
+
+def _pontuar(termos_sentencas):
+    # TextRank sobre o grafo de sentenças: peso da aresta = termos em comum normalizado
+    # pelo tamanho das sentenças (Mihalcea e Tarau, 2004)
+    vocabulario = {}
+    linhas = []
+    colunas = []
+    for linha, termos in enumerate(termos_sentencas):
+        for termo in termos:
+            linhas.append(linha)
+            colunas.append(vocabulario.setdefault(termo, len(vocabulario)))
+    presenca = np.zeros((len(termos_sentencas), max(len(vocabulario), 1)), dtype=np.float64)
+    presenca[linhas, colunas] = 1.0
+    tamanhos = presenca.sum(axis=1)
+    logs = np.log(np.maximum(tamanhos, 1.0) + 1.0)
+    similaridade = (presenca @ presenca.T) / (logs[:, None] + logs[None, :])
+    np.fill_diagonal(similaridade, 0.0)
+    saida = similaridade.sum(axis=1, keepdims=True)
+    transicao = np.divide(similaridade, saida, out=np.zeros_like(similaridade), where=saida > 0)
+
+    total = len(termos_sentencas)
+    pontuacao = np.full(total, 1.0 / total)
+    for _ in range(MAX_ITERACOES):
+        nova = (1 - AMORTECIMENTO) / total + AMORTECIMENTO * (transicao.T @ pontuacao)
+        if np.abs(nova - pontuacao).sum() < TOLERANCIA:
+            pontuacao = nova
+            break
+        pontuacao = nova
+    return pontuacao
+
+
+def _cortar(texto, tamanho):
+    corte = texto.rfind(" ", 0, tamanho - 1)
+    return texto[:corte if corte > 0 else tamanho - 1].rstrip(" ,;:") + "…"
+
+
+# Função para gerar o resumo extrativo de um texto: as sentenças mais centrais (TextRank)
+# que cabem em `tamanho` caracteres, na ordem original. Textos curtos voltam inteiros.
+@functools.lru_cache(maxsize=4096)
+def resumir(texto, tamanho=TAMANHO_RESUMO):
+    texto = texto.strip()
+    if len(texto) <= tamanho:
+        return texto
+    # Fragmentos sem ao menos duas palavras ("(...)", "I.") não entram no ranking
+    lista = [s for s in sentencas(texto) if len(palavras(s)) > 1]
+    if len(lista) < 2:
+        return _cortar(lista[0] if lista else texto, tamanho)
+    termos = [{t for t in palavras(s) if len(t) > 2 and t not in _STOPWORDS} for s in lista]
+    pontuacao = _pontuar(termos)
+    # Desempate pela posição: a abertura da notícia costuma trazer a tese
+    ordem = sorted(range(len(lista)), key=lambda i: (-round(pontuacao[i], 9), i))
+    escolhidas = []
+    restante = tamanho
+    for i in ordem:
+        custo = len(lista[i]) + (1 if escolhidas else 0)
+        if custo <= restante:
+            escolhidas.append(i)
+            restante -= custo
+    if not escolhidas:
+        return _cortar(lista[ordem[0]], tamanho)
+    return " ".join(lista[i] for i in sorted(escolhidas))
+
+
+# Função para resumir uma coluna de textos (None para valores ausentes). Não passa pelo
+# lru_cache de resumir: uma coluna inteira o esvaziaria, e quem chama guarda o resultado
+def resumir_textos(textos, tamanho=TAMANHO_RESUMO):
+    return [resumir.__wrapped__(t, tamanho) if isinstance(t, str) and t.strip() else None for t in textos]
+
@@ -0,0 +1,213 @@
+import heapq
+import math
+import random
+import time
+
+import numpy as np
+
+# Revisão espaçada das assertivas: cada assertiva do banco recebe um peso que cresce com a
+# taxa de erro do usuário e com o tempo desde a última vez em que foi exibida; o sorteio é
+# proporcional ao peso. Os pesos ficam numa árvore de Fenwick, de modo que cada sorteio e
+# cada atualização de peso custam O(log n), mesmo com centenas de milhares de assertivas.
+
+# Peso das assertivas que o usuário nunca viu (as já vistas valem de 0 a 1)
+PESO_NOVA = 1.0
+# Intervalo de revisão de uma assertiva sem acertos; dobra a cada acerto líquido (acertos - erros)
+INTERVALO_BASE_S = 600.0
+MAX_DOBRAS = 12
+# Peso de revisão acumulado, por assertiva pedida, a partir do qual uma rodada dispensa assertivas
+# novas (ver Amostrador.precisa_de_novas)
+LIMIAR_REVISAO = 0.5
+# O peso de uma assertiva vista cresce com o tempo; a árvore guarda o valor da última atualização,
+# refeita a cada FRACAO_REPESAGEM do intervalo da assertiva (até SATURACAO intervalos, quando o
+# peso já passa de 99% do máximo). Cada sorteio atualiza no máximo LIMITE_REPESAGEM assertivas.
+FRACAO_REPESAGEM = 0.25
+SATURACAO = 5
+LIMITE_REPESAGEM = 256
+
+
+# Função para calcular o intervalo de revisão (vetorizada; aceita escalares)
+def intervalos(acertos, erros):
+    saldo = np.asarray(acertos, dtype=np.float64) - np.asarray(erros, dtype=np.float64)
+    return INTERVALO_BASE_S * 2 ** np.clip(saldo, 0, MAX_DOBRAS)
+
+
+# Função para calcular os pesos (vetorizada; aceita escalares). ultima_vez NaN = nunca vista.
+# peso = taxa de erro (com suavização de Laplace) x (1 - e^(-tempo desde a última vez / intervalo))
+def pesos(acertos, erros, ultima_vez, agora=None):
+    agora = agora or time.time()
+    acertos = np.asarray(acertos, dtype=np.float64)
+    erros = np.asarray(erros, dtype=np.float64)
+    ultima_vez = np.asarray(ultima_vez, dtype=np.float64)
+    taxa_erro = (erros + 1) / (acertos + erros + 2)
+    recencia = -np.expm1(-np.maximum(agora - ultima_vez, 0) / intervalos(acertos, erros))
+    return np.where(np.isnan(ultima_vez), PESO_NOVA, taxa_erro * recencia)
+
+
+# Função para calcular quando o peso de uma assertiva deve ser atualizado de novo (None: nunca
+# vista, com peso fixo, ou já saturada)
+def proxima_repesagem(acertos, erros, ultima_vez, agora):
+    if math.isnan(ultima_vez):
+        return None
+    intervalo = float(intervalos(acertos, erros))
+    if agora - ultima_vez >= SATURACAO * intervalo:
+        return None
+    return agora + FRACAO_REPESAGEM * intervalo
+
+
+class ArvoreFenwick:
+    # Árvore de Fenwick (binary indexed tree) de pesos não negativos: soma de prefixos,
+    # atualização e busca pelo prefixo acumulado em O(log n); acréscimo ao final em O(log n).
+    # Os pesos exatos ficam em `pesos` (as atualizações aplicam a diferença).
+
+    def __init__(self, pesos_iniciais=()):
+        pesos_iniciais = np.asarray(pesos_iniciais, dtype=np.float64)
+        n = len(pesos_iniciais)
+        # Construção em O(n): arvore[i] = soma dos pesos em (i - lowbit(i), i]
+        acumulado = np.concatenate(([0.0], np.cumsum(pesos_iniciais)))
+        posicoes = np.arange(1, n + 1)
+        self.arvore = [0.0] + (acumulado[posicoes] - acumulado[posicoes - (posicoes & -posicoes)]).tolist()
+        self.pesos = pesos_iniciais.tolist()
+
+    def __len__(self):
+        return len(self.pesos)
+
+    # Soma dos `i` primeiros pesos
+    def prefixo(self, i):
+        soma = 0.0
+        while i > 0:
+            soma += self.arvore[i]
+            i -= i & -i
+        return soma
+
+    def total(self):
+        return self.prefixo(len(self.pesos))
+
+    def atualizar(self, posicao, peso):
+        diferenca = peso - self.pesos[posicao]
+        self.pesos[posicao] = peso
+        i = posicao + 1
+        while i < len(self.arvore):
+            self.arvore[i] += diferenca
+            i += i & -i
+
+    def acrescentar(self, peso):
+        i = len(self.arvore)
+        self.arvore.append(peso + self.prefixo(i - 1) - self.prefixo(i - (i & -i)))
+        self.pesos.append(peso)
+
+    # Função para achar a posição cujo intervalo acumulado contém `alvo` (0 <= alvo < total)
+    def buscar(self, alvo):
+        posicao = 0
+        passo = 1 << (len(self.arvore) - 1).bit_length()
+        while passo:
+            proxima = posicao + passo
+            if proxima < len(self.arvore) and self.arvore[proxima] <= alvo:
+                posicao = proxima
+                alvo -= self.arvore[proxima]
+            passo >>= 1
+        # Arredondamentos podem apontar para além do fim ou para um peso zerado
+        posicao = min(posicao, len(self.pesos) - 1)
+        while posicao > 0 and self.pesos[posicao] <= 0:
+            posicao -= 1
+        return posicao
+
+
+class Amostrador:
+    # Sorteio ponderado das assertivas de um usuário (com um filtro de matérias). Guarda o
+    # progresso do usuário em memória, espelhando o que é gravado no historico.Historico.
+    # Os pesos das assertivas vistas são atualizados aos poucos, a cada sorteio: uma fila de
+    # prioridade guarda quando cada uma vence (proxima_repesagem); entradas antigas de uma
+    # assertiva repesada depois são descartadas ao sair da fila.
+
+    def __init__(self, ids, acertos, erros, ultima_vez, agora=None):
+        agora = agora or time.time()
+        self.ids = list(ids)
+        self.posicoes = {assertiva_id: i for i, assertiva_id in enumerate(self.ids)}
+        self.acertos = list(acertos)
+        self.erros = list(erros)
+        self.ultima_vez = [math.nan if valor is None else valor for valor in ultima_vez]
+        self.nao_vistas = sum(1 for valor in self.ultima_vez if math.isnan(valor))
+        self.arvore = ArvoreFenwick(pesos(self.acertos, self.erros, self.ultima_vez, agora))
+        self.vencimentos = [proxima_repesagem(self.acertos[i], self.erros[i], self.ultima_vez[i], agora)
+                            for i in range(len(self.ids))]
+        self.fila = [(vencimento, i) for i, vencimento in enumerate(self.vencimentos) if vencimento is not None]
+        heapq.heapify(self.fila)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Função para atualizar os pesos vencidos (no máximo `limite`, os mais atrasados primeiro)
+    def atualizar_pesos(self, agora=None, limite=LIMITE_REPESAGEM):
+        agora = agora or time.time()
+        while self.fila and self.fila[0][0] <= agora and limite > 0:
+            vencimento, posicao = heapq.heappop(self.fila)
+            if vencimento != self.vencimentos[posicao]:
+                continue  # assertiva repesada depois de entrar na fila
+            self._repesar(posicao, agora)
+            limite -= 1
+
+    # Função para decidir se vale gerar assertivas novas antes do sorteio: faltam inéditas e o
+    # peso das revisões pendentes (já vistas) não chega a LIMIAR_REVISAO por assertiva pedida
+    def precisa_de_novas(self, quantidade, agora=None):
+        self.atualizar_pesos(agora)
+        peso_revisoes = self.arvore.total() - self.nao_vistas * PESO_NOVA
+        return self.nao_vistas < quantidade and peso_revisoes < quantidade * LIMIAR_REVISAO
+
+    def _repesar(self, posicao, agora=None):
+        agora = agora or time.time()
+        self.arvore.atualizar(posicao, float(pesos(self.acertos[posicao], self.erros[posicao],
+                                                   self.ultima_vez[posicao], agora)))
+        vencimento = proxima_repesagem(self.acertos[posicao], self.erros[posicao], self.ultima_vez[posicao], agora)
+        self.vencimentos[posicao] = vencimento
+        if vencimento is not None:
+            heapq.heappush(self.fila, (vencimento, posicao))
+
+    # Função para incluir assertivas novas no banco do amostrador (nunca vistas)
+    def acrescentar(self, ids):
+        for assertiva_id in ids:
+            if assertiva_id in self.posicoes:
+                continue
+            self.posicoes[assertiva_id] = len(self.ids)
+            self.ids.append(assertiva_id)
+            self.acertos.append(0)
+            self.erros.append(0)
+            self.ultima_vez.append(math.nan)
+            self.vencimentos.append(None)
+            self.nao_vistas += 1
+            self.arvore.acrescentar(PESO_NOVA)
+
+    # Função para sortear até `quantidade` assertivas distintas, com probabilidade proporcional
+    # ao peso (atualizado antes, ver atualizar_pesos). As sorteadas passam a contar como vistas
+    # agora (o peso delas vai a zero e volta a crescer nas próximas atualizações).
+    def sortear(self, quantidade, gerador=random, agora=None):
+        agora = agora or time.time()
+        self.atualizar_pesos(agora)
+        sorteadas = []
+        while len(sorteadas) < quantidade:
+            total = self.arvore.total()
+            if total <= 1e-12:
+                break
+            posicao = self.arvore.buscar(gerador.random() * total)
+            if self.arvore.pesos[posicao] <= 0:
+                break
+            sorteadas.append(self.ids[posicao])
+            self.marcar_vista(self.ids[posicao], agora)
+        return sorteadas
+
+    def marcar_vista(self, assertiva_id, agora=None):
+        posicao = self.posicoes[assertiva_id]
+        if math.isnan(self.ultima_vez[posicao]):
+            self.nao_vistas -= 1
+        self.ultima_vez[posicao] = agora or time.time()
+        self._repesar(posicao, agora)
+
+    def registrar_resposta(self, assertiva_id, correta, agora=None):
+        posicao = self.posicoes.get(assertiva_id)
+        if posicao is None:
+            return
+        if correta:
+            self.acertos[posicao] += 1
+        else:
+            self.erros[posicao] += 1
+        self.marcar_vista(assertiva_id, agora)
@@ -0,0 +1,186 @@
+import math
+import threading
+import time
+
+import telemetria
+
+# Política de roteamento das chamadas à API de chat, por tipo de requisição, a partir
+# da telemetria (telemetria.py). Sem histórico, a rota é a de sempre (primeiro modelo,
+# max_tokens máximo, contexto inteiro). Com histórico:
+#   - max_tokens acompanha o p95 dos tokens de resposta observados (com folga), e volta
+#     ao máximo se as respostas começam a ser truncadas;
+#   - se o p95 da latência recente passa do SLO, o contexto encolhe um nível (menos
+#     informativos no prompt); volta a crescer quando fica abaixo de RECUPERACAO * SLO;
+#   - um modelo com muitos erros, ou lento mesmo com o contexto mínimo, é trocado pelo
+#     próximo da lista e só volta a ser tentado depois de QUARENTENA_S.
+
+# Amostras mínimas antes de ajustar max_tokens
+MIN_AMOSTRAS_TOKENS = 20
+# Folga sobre o p95 dos tokens de resposta
+FOLGA_TOKENS = 1.3
+# Acima desta fração de respostas truncadas, max_tokens volta ao máximo
+LIMITE_TRUNCAMENTO = 0.02
+# Chamadas recentes consideradas no SLO de latência e na taxa de erros
+JANELA_SLO = 20
+# Novas chamadas entre dois ajustes do nível de contexto (evita reagir a cada chamada)
+AJUSTE_A_CADA = 5
+RECUPERACAO = 0.8
+# Acima desta taxa de erros recentes o modelo é considerado degradado
+LIMITE_ERROS = 0.5
+QUARENTENA_S = 300.0
+
+
+class Politica:
+    # Modelos em ordem de preferência, limites de max_tokens, temperatura, SLO de latência (p95)
+    # e quantos informativos entram no contexto em cada nível (do contexto inteiro ao mínimo)
+    __slots__ = ("modelos", "max_tokens", "min_tokens", "temperatura", "slo_latencia_s", "registros")
+
+    def __init__(self, modelos, max_tokens, min_tokens, temperatura, slo_latencia_s, registros):
+        self.modelos = modelos
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.temperatura = temperatura
+        self.slo_latencia_s = slo_latencia_s
+        self.registros = registros
+
+
+POLITICAS = {
+    # O JSON das 5 assertivas precisa de folga: truncado, vira fallback para a simulação
+    "assertivas": Politica(("gpt-3.5-turbo", "gpt-4o-mini"), max_tokens=1500, min_tokens=600,
+                           temperatura=0.6, slo_latencia_s=20.0, registros=(5, 3, 2)),
+    "pergunta": Politica(("gpt-3.5-turbo", "gpt-4o-mini"), max_tokens=300, min_tokens=150,
+                         temperatura=0.5, slo_latencia_s=8.0, registros=(3, 2, 1)),
+}
+
+
+class Rota:
+    __slots__ = ("modelo", "max_tokens", "temperatura", "max_registros", "nivel_contexto", "motivo")
+
+    def __init__(self, modelo, max_tokens, temperatura, max_registros, nivel_contexto=0, motivo=""):
+        self.modelo = modelo
+        self.max_tokens = max_tokens
+        self.temperatura = temperatura
+        self.max_registros = max_registros
+        self.nivel_contexto = nivel_contexto
+        self.motivo = motivo
+
+    def __repr__(self):
+        return (f"Rota({self.modelo}, max_tokens={self.max_tokens}, registros={self.max_registros}, "
+                f"nivel={self.nivel_contexto}, motivo={self.motivo!r})")
+
+
+# Função para obter a rota fixa de um tipo (sem telemetria; ex.: jobs em lote com cache por parâmetros)
+def rota_padrao(tipo):
+    politica = POLITICAS[tipo]
+    return Rota(politica.modelos[0], politica.max_tokens, politica.temperatura, politica.registros[0])
+
+
+class Roteador:
+    # Estado do roteamento no processo (compartilhado pelas sessões): nível de contexto por
+    # tipo, modelos em quarentena e, por tipo/modelo, quantas chamadas já tinham sido vistas
+    # no último ajuste do nível
+
+    def __init__(self, politicas=None):
+        self.politicas = politicas or POLITICAS
+        self.niveis = {}
+        self.vistas = {}
+        # (tipo, modelo) -> (fim da quarentena, motivo)
+        self.quarentenas = {}
+        self.trava = threading.Lock()
+
+    def _estatisticas(self, tipo, modelo):
+        return telemetria.estatisticas(tipo, modelo)
+
+    def _degradado(self, tipo, modelo, politica, nivel):
+        estatisticas = self._estatisticas(tipo, modelo)
+        if estatisticas is None or len(estatisticas.recentes) < AJUSTE_A_CADA:
+            return None
+        if estatisticas.taxa_erros(JANELA_SLO) > LIMITE_ERROS:
+            return f"erros {estatisticas.taxa_erros(JANELA_SLO):.0%}"
+        p95 = estatisticas.percentil_latencia(0.95, JANELA_SLO)
+        if nivel == len(politica.registros) - 1 and p95 > politica.slo_latencia_s:
+            return f"p95 {p95:.1f}s com o contexto mínimo"
+        return None
+
+    def _escolher_modelo(self, tipo, politica, nivel):
+        agora = time.time()
+        motivos = []
+        for modelo in politica.modelos:
+            quarentena = self.quarentenas.get((tipo, modelo))
+            if quarentena and agora >= quarentena[0]:
+                # Fim da quarentena: o histórico antigo não conta, o modelo é tentado de novo
+                del self.quarentenas[(tipo, modelo)]
+                estatisticas = self._estatisticas(tipo, modelo)
+                estatisticas.reiniciar_janela()
+                # O próximo ajuste do nível espera AJUSTE_A_CADA chamadas novas
+                self.vistas[(tipo, modelo)] = estatisticas.chamadas
+                quarentena = None
+            if quarentena is None:
+                motivo = self._degradado(tipo, modelo, politica, nivel)
+                if motivo is None:
+                    return modelo, "; ".join(motivos)
+                quarentena = self.quarentenas[(tipo, modelo)] = (agora + QUARENTENA_S, motivo)
+            motivos.append(f"{modelo} em quarentena ({quarentena[1]})")
+        # Todos em quarentena: o de menor latência recente
+        def p95(modelo):
+            estatisticas = self._estatisticas(tipo, modelo)
+            return estatisticas.percentil_latencia(0.95, JANELA_SLO) or 0.0
+        return min(politica.modelos, key=p95), "; ".join(motivos)
+
+    def _ajustar_nivel(self, tipo, modelo, politica):
+        nivel = self.niveis.get(tipo, 0)
+        estatisticas = self._estatisticas(tipo, modelo)
+        if estatisticas is None:
+            return nivel
+        vistas = self.vistas.get((tipo, modelo), 0)
+        if estatisticas.chamadas - vistas < AJUSTE_A_CADA:
+            return nivel
+        self.vistas[(tipo, modelo)] = estatisticas.chamadas
+        p95 = estatisticas.percentil_latencia(0.95, JANELA_SLO)
+        if p95 is None:
+            return nivel
+        if p95 > politica.slo_latencia_s:
+            nivel = min(nivel + 1, len(politica.registros) - 1)
+        elif p95 < RECUPERACAO * politica.slo_latencia_s:
+            nivel = max(nivel - 1, 0)
+        self.niveis[tipo] = nivel
+        return nivel
+
+    def _max_tokens(self, tipo, modelo, politica):
+        estatisticas = self._estatisticas(tipo, modelo)
+        if estatisticas is None or estatisticas.taxa_truncamento() > LIMITE_TRUNCAMENTO:
+            return politica.max_tokens
+        if estatisticas.amostras_tokens() < MIN_AMOSTRAS_TOKENS:
+            return politica.max_tokens
+        p95 = estatisticas.percentil_tokens(0.95)
+        return max(politica.min_tokens, min(politica.max_tokens, math.ceil(p95 * FOLGA_TOKENS)))
+
+    # Função para decidir a rota da próxima chamada de um tipo
+    def rota(self, tipo):
+        politica = self.politicas[tipo]
+        with self.trava:
+            modelo, motivo = self._escolher_modelo(tipo, politica, self.niveis.get(tipo, 0))
+            nivel = self._ajustar_nivel(tipo, modelo, politica)
+            max_tokens = self._max_tokens(tipo, modelo, politica)
+        if nivel:
+            motivo = "; ".join(m for m in (motivo, f"contexto reduzido (nível {nivel}) pelo SLO de "
+                                                   f"{politica.slo_latencia_s:g}s") if m)
+        return Rota(modelo, max_tokens, politica.temperatura, politica.registros[nivel], nivel, motivo)
+
+    # Função para descrever o estado atual do roteamento (painel do desenvolvedor)
+    def situacao(self):
+        with self.trava:
+            return {tipo: self.niveis.get(tipo, 0) for tipo in self.politicas}
+
+
+_roteador = Roteador()
+
+
+# Função para decidir a rota da próxima chamada de um tipo (roteador compartilhado pelo processo)
+def rota(tipo):
+    return _roteador.rota(tipo)
+
+
+# Função para obter o nível de contexto atual de cada tipo
+def situacao():
+    return _roteador.situacao()
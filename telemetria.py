@@ -0,0 +1,253 @@
+import collections
+import json
+import math
+import os
+import threading
+import time
+
+import metricas
+
+# Telemetria das chamadas à API de chat: tokens do prompt e da resposta, latência,
+# tentativas e o motivo de cada fallback para a simulação, agregados por endpoint
+# (tipo de requisição: "assertivas", "pergunta", "pergunta_lote") e modelo. Sempre
+# ligada, ao contrário de metricas.py: o custo é desprezível perto da chamada e o
+# roteamento (roteamento.py) decide a partir destes números.
+
+# Chamadas recentes guardadas por endpoint/modelo (percentis e taxas vêm desta janela)
+JANELA = 200
+# Destino opcional: um registro JSONL por chamada
+ARQUIVO_EXPORTACAO = os.environ.get("STF_TELEMETRIA_ARQUIVO")
+
+# Motivos de fallback para a simulação
+SEM_CHAVE = "sem_chave"
+AUTENTICACAO = "autenticacao"
+ERRO_API = "erro_api"
+JSON_AUSENTE = "json_ausente"
+JSON_INVALIDO = "json_invalido"
+FORMATO_INVALIDO = "formato_invalido"
+QUANTIDADE_INESPERADA = "quantidade_inesperada"
+
+
+class Estatisticas:
+    # Agregado de um endpoint/modelo: totais desde a partida do processo e a janela das
+    # chamadas recentes, como tuplas (latencia_s, tokens_completion, erro, truncada)
+    __slots__ = ("chamadas", "fallbacks", "tentativas", "tokens_prompt", "tokens_completion",
+                 "latencia_total_s", "truncadas", "erros", "motivos", "recentes", "ultima_chamada")
+
+    def __init__(self):
+        self.chamadas = 0
+        self.fallbacks = 0
+        self.tentativas = 0
+        self.tokens_prompt = 0
+        self.tokens_completion = 0
+        self.latencia_total_s = 0.0
+        self.truncadas = 0
+        self.erros = 0
+        self.motivos = collections.Counter()
+        self.recentes = collections.deque(maxlen=JANELA)
+        self.ultima_chamada = None
+
+    def observar(self, registro):
+        if registro["motivo_fallback"]:
+            self.fallbacks += 1
+            self.motivos[registro["motivo_fallback"]] += 1
+        if registro["latencia_s"] is None:
+            return  # fallback sem chamada à API (ex.: chave não configurada)
+        self.chamadas += 1
+        self.tentativas += registro["tentativas"]
+        self.tokens_prompt += registro["tokens_prompt"] or 0
+        self.tokens_completion += registro["tokens_completion"] or 0
+        self.latencia_total_s += registro["latencia_s"]
+        self.truncadas += registro["truncada"]
+        self.erros += registro["erro"] is not None
+        self.recentes.append((registro["latencia_s"], registro["tokens_completion"],
+                              registro["erro"] is not None, registro["truncada"]))
+        self.ultima_chamada = registro["ts"]
+
+    # Cópia das últimas `ultimas` chamadas (todas da janela se None), tirada sob a trava:
+    # registrar() acrescenta à janela a partir de outras threads
+    def janela(self, ultimas=None):
+        with _trava:
+            recentes = list(self.recentes)
+        return recentes[-(ultimas or JANELA):]
+
+    # Percentil (0-1) da latência nas últimas `ultimas` chamadas (todas da janela se None)
+    def percentil_latencia(self, p, ultimas=None):
+        return _percentil([r[0] for r in self.janela(ultimas)], p)
+
+    def _tokens(self):
+        return [r[1] for r in self.janela() if not r[2] and r[1] is not None]
+
+    # Percentil dos tokens de resposta (só chamadas bem-sucedidas com uso informado)
+    def percentil_tokens(self, p):
+        return _percentil(self._tokens(), p)
+
+    def amostras_tokens(self):
+        return len(self._tokens())
+
+    def taxa_erros(self, ultimas=None):
+        recentes = self.janela(ultimas)
+        return sum(r[2] for r in recentes) / len(recentes) if recentes else 0.0
+
+    def taxa_truncamento(self):
+        recentes = self.janela()
+        return sum(r[3] for r in recentes) / len(recentes) if recentes else 0.0
+
+    def reiniciar_janela(self):
+        with _trava:
+            self.recentes.clear()
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return valores[max(0, math.ceil(p * len(valores)) - 1)]
+
+
+_estatisticas = {}
+# Reentrante: resumo() lê os percentis (que tiram a cópia da janela) segurando a trava
+_trava = threading.RLock()
+
+
+class Chamada:
+    # Uma chamada à API em andamento. `detalhes` é preenchido por
+    # cliente_openai.criar_chat_completion (número de tentativas); registrar() agrega.
+    __slots__ = ("endpoint", "modelo", "nivel_contexto", "inicio", "latencia_s", "detalhes", "tokens_prompt",
+                 "tokens_completion", "truncada", "motivo_fallback", "erro")
+
+    def __init__(self, endpoint, modelo, nivel_contexto=0):
+        self.endpoint = endpoint
+        self.modelo = modelo
+        self.nivel_contexto = nivel_contexto
+        self.inicio = time.perf_counter()
+        self.latencia_s = None
+        self.detalhes = {}
+        self.tokens_prompt = None
+        self.tokens_completion = None
+        self.truncada = False
+        self.motivo_fallback = None
+        self.erro = None
+
+    # Função para anotar a resposta recebida (latência, uso de tokens e truncamento)
+    def resposta(self, completion):
+        self.latencia_s = time.perf_counter() - self.inicio
+        uso = getattr(completion, "usage", None)
+        if uso is not None:
+            self.tokens_prompt = uso.prompt_tokens
+            self.tokens_completion = uso.completion_tokens
+        self.truncada = completion.choices[0].finish_reason == "length"
+
+    # Função para anotar o fallback para a simulação (com a exceção, se a chamada falhou)
+    def fallback(self, motivo, excecao=None):
+        self.motivo_fallback = motivo
+        if excecao is not None:
+            self.erro = type(excecao).__name__
+            if self.latencia_s is None:
+                self.latencia_s = time.perf_counter() - self.inicio
+
+    def registrar(self):
+        registrar({
+            "endpoint": self.endpoint,
+            "modelo": self.modelo,
+            "nivel_contexto": self.nivel_contexto,
+            "latencia_s": self.latencia_s,
+            "tentativas": self.detalhes.get("tentativas", 1),
+            "tokens_prompt": self.tokens_prompt,
+            "tokens_completion": self.tokens_completion,
+            "truncada": self.truncada,
+            "motivo_fallback": self.motivo_fallback,
+            "erro": self.erro,
+            "ts": time.time(),
+        })
+
+
+# Função para agregar o registro de uma chamada (e gravá-lo, se houver arquivo configurado)
+def registrar(registro):
+    with _trava:
+        chave = (registro["endpoint"], registro["modelo"])
+        estatisticas = _estatisticas.get(chave)
+        if estatisticas is None:
+            estatisticas = _estatisticas[chave] = Estatisticas()
+        estatisticas.observar(registro)
+        if ARQUIVO_EXPORTACAO:
+            try:
+                with open(ARQUIVO_EXPORTACAO, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"Erro ao exportar a telemetria: {e}")
+
+
+# Função para registrar um fallback que não chegou a chamar a API
+def registrar_fallback(endpoint, motivo):
+    registrar({"endpoint": endpoint, "modelo": None, "nivel_contexto": 0, "latencia_s": None, "tentativas": 0,
+               "tokens_prompt": None, "tokens_completion": None, "truncada": False,
+               "motivo_fallback": motivo, "erro": None, "ts": time.time()})
+
+
+# Função para obter o agregado de um endpoint/modelo (None se ainda não houve chamadas)
+def estatisticas(endpoint, modelo):
+    with _trava:
+        return _estatisticas.get((endpoint, modelo))
+
+
+# Função para resumir os agregados, uma linha por endpoint/modelo
+def resumo():
+    with _trava:
+        itens = sorted(_estatisticas.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+        linhas = []
+        for (endpoint, modelo), e in itens:
+            linhas.append({
+                "endpoint": endpoint,
+                "modelo": modelo or "-",
+                "chamadas": e.chamadas,
+                "tentativas_extras": e.tentativas - e.chamadas,
+                "erros": e.erros,
+                "fallbacks": e.fallbacks,
+                "motivos_fallback": dict(e.motivos),
+                "tokens_prompt": e.tokens_prompt,
+                "tokens_completion": e.tokens_completion,
+                "latencia_total_s": round(e.latencia_total_s, 6),
+                "latencia_media_s": round(e.latencia_total_s / e.chamadas, 3) if e.chamadas else None,
+                "latencia_p95_s": e.percentil_latencia(0.95),
+                "truncadas": e.truncadas,
+            })
+    return linhas
+
+
+# Função para zerar os agregados (benchmarks)
+def limpar():
+    with _trava:
+        _estatisticas.clear()
+
+
+# Linhas no formato do Prometheus, acrescentadas ao /metrics de metricas.py
+def linhas_prometheus():
+    linhas = [
+        "# HELP stf_llm_chamadas_total Chamadas à API de chat por endpoint e modelo.",
+        "# TYPE stf_llm_chamadas_total counter",
+        "# HELP stf_llm_tentativas_total Tentativas (incluindo as novas tentativas) por endpoint e modelo.",
+        "# TYPE stf_llm_tentativas_total counter",
+        "# HELP stf_llm_tokens_total Tokens consumidos por endpoint, modelo e tipo (prompt/completion).",
+        "# TYPE stf_llm_tokens_total counter",
+        "# HELP stf_llm_latencia_segundos Latência das chamadas (soma e contagem; p95 da janela recente).",
+        "# TYPE stf_llm_latencia_segundos summary",
+        "# HELP stf_llm_fallbacks_total Fallbacks para a simulação por endpoint e motivo.",
+        "# TYPE stf_llm_fallbacks_total counter",
+    ]
+    for linha in resumo():
+        rotulos = f'endpoint="{linha["endpoint"]}",modelo="{linha["modelo"]}"'
+        linhas.append(f"stf_llm_chamadas_total{{{rotulos}}} {linha['chamadas']}")
+        linhas.append(f"stf_llm_tentativas_total{{{rotulos}}} {linha['chamadas'] + linha['tentativas_extras']}")
+        linhas.append(f'stf_llm_tokens_total{{{rotulos},tipo="prompt"}} {linha["tokens_prompt"]}')
+        linhas.append(f'stf_llm_tokens_total{{{rotulos},tipo="completion"}} {linha["tokens_completion"]}')
+        if linha["latencia_p95_s"] is not None:
+            linhas.append(f'stf_llm_latencia_segundos{{{rotulos},quantile="0.95"}} {linha["latencia_p95_s"]:.6f}')
+            linhas.append(f"stf_llm_latencia_segundos_sum{{{rotulos}}} {linha['latencia_total_s']:.6f}")
+            linhas.append(f"stf_llm_latencia_segundos_count{{{rotulos}}} {linha['chamadas']}")
+        for motivo, contagem in sorted(linha["motivos_fallback"].items()):
+            linhas.append(f'stf_llm_fallbacks_total{{{rotulos},motivo="{motivo}"}} {contagem}')
+    return linhas
+
+
+metricas.registrar_coletor(linhas_prometheus)
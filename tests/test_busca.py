@@ -0,0 +1,56 @@
+import pandas as pd
+
+import busca
+
+
+def _df(linhas):
+    return pd.DataFrame([{**{campo: None for campo in busca.CAMPOS_TEXTO}, "Ramo Direito": None,
+                          "Classe Processo": "RE", "Repercussão Geral": "Não", "Data Julgamento": "01/01/2023",
+                          "Informativo": 1000 + i, **linha} for i, linha in enumerate(linhas)])
+
+
+def _indice(linhas):
+    return busca.IndiceBusca(_df(linhas))
+
+
+def test_frase_exige_palavras_consecutivas_no_mesmo_campo():
+    indice = _indice([
+        {"Título": "Imunidade tributária recíproca"},
+        {"Título": "Imunidade", "Resumo": "tributária"},
+        {"Título": "Tributária imunidade"},
+        {"Resumo": "A imunidade tributária das autarquias"},
+    ])
+    assert indice.buscar('"imunidade tributária"').tolist() == [0, 3]
+
+
+def test_frase_nao_atravessa_linhas():
+    indice = _indice([{"Notícia completa": "termina em imunidade"}, {"Título": "tributária no início"}])
+    assert indice.buscar('"imunidade tributaria"').tolist() == []
+
+
+def test_pontuar_soma_o_peso_de_cada_campo_sem_acentos():
+    indice = _indice([
+        {"Título": "Repercussão geral", "Resumo": "tema de repercussão"},
+        {"Notícia completa": "sem repercussão"},
+        {"Título": "Outro assunto", "Ramo Direito": "Direito Tributário;Direito Constitucional"},
+    ])
+    pesos = {"Título": 3, "Resumo": 2, "Notícia completa": 1, "Ramo Direito": 1}
+    assert indice.pontuar(["repercussao"], pesos).tolist() == [5, 1, 0]
+    assert indice.pontuar(["tributario"], pesos).tolist() == [0, 0, 1]
+
+
+def test_filtrar_ocorrencias_equivale_a_indexar_so_as_vigentes():
+    df = _df([{"Título": "Imunidade recíproca", "Ramo Direito": "Direito Tributário", "Matéria": "Imunidade"},
+              {"Título": "Removida", "Resumo": "palavra exclusiva", "Matéria": "Outra"},
+              {"Resumo": "imunidade recíproca das autarquias", "Matéria": "Imunidade"}])
+    vigentes = [0, 2]
+    df_vigentes = df.iloc[vigentes].reset_index(drop=True)
+    filtrado = busca.IndiceBusca(
+        df_vigentes,
+        textos=busca.mesclar_ocorrencias([busca.filtrar_ocorrencias(busca.ocorrencias_textos(df), vigentes)]),
+        facetas={campo: busca.mesclar_ocorrencias([busca.filtrar_ocorrencias(ocorrencias, vigentes)])
+                 for campo, ocorrencias in busca.ocorrencias_facetas(df).items()})
+    direto = busca.IndiceBusca(df_vigentes)
+    assert filtrado.vocabulario == direto.vocabulario and "exclusiva" not in filtrado.vocabulario
+    for consulta in ('"imunidade reciproca"', "autarquias", "ramo:tributario", "materia:imunidade", "-materia:outra"):
+        assert filtrado.buscar(consulta).tolist() == direto.buscar(consulta).tolist()
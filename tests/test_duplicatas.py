@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+import duplicatas
+
+RESUMO = ("O Plenário do Supremo Tribunal Federal, por maioria, declarou a inconstitucionalidade da lei estadual "
+          "que concedia benefício fiscal de ICMS sem prévia deliberação dos estados e do Distrito Federal no "
+          "âmbito do Confaz, nos termos do voto do relator, vencidos os ministros que modulavam os efeitos.")
+
+
+def test_quase_duplicatas_compartilham_o_id_canonico_e_vazios_nunca_se_agrupam():
+    df = pd.DataFrame({
+        "Resumo": [
+            RESUMO,
+            "Em sessão virtual, o Tribunal julgou o tema de repercussão geral sobre a contribuição previdenciária "
+            "incidente sobre o terço constitucional de férias e fixou a tese proposta pelo relator.",
+            RESUMO + " Acórdão publicado no DJe.",  # a mesma decisão em outro informativo
+            None,
+            RESUMO.replace("ICMS", "ISS").replace("estadual", "municipal").replace("estados", "municípios")
+            .replace("Confaz", "comitê gestor").replace("maioria", "unanimidade").replace("relator", "revisor"),
+            "",
+            None,
+        ],
+        "Tese Julgado": [None, None, None, None, None, "   ", None],
+    })
+    canonicos = duplicatas.ids_canonicos(df)
+    assert canonicos[2] == canonicos[0] == 0
+    assert canonicos[1] == 1 and canonicos[4] == 4
+    # Linhas sem texto apontam para si mesmas
+    assert canonicos[[3, 5, 6]].tolist() == [3, 5, 6]
+    # Determinístico: as permutações têm semente fixa
+    assert np.array_equal(duplicatas.assinaturas(df), duplicatas.assinaturas(df.copy()))
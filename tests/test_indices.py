@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import busca
+import indices
+import ingestao
+import legislacao
+
+TEMAS = [
+    ("Imunidade tributária recíproca", "Direito Tributário", "CF/1988, art. 150, VI, a"),
+    ("ICMS na base de cálculo do PIS", "Direito Tributário", "Lei 9.718/1998, art. 3º"),
+    ("Prisão preventiva e audiência de custódia", "Direito Processual Penal", "CPP, art. 312"),
+    ("Aposentadoria especial do servidor público", "Direito Administrativo", "CF/1988, art. 40, § 4º"),
+]
+
+
+def _planilha(caminho, alterado=None):
+    linhas = []
+    for i in range(12):
+        titulo, ramo, legislacao_citada = TEMAS[i % len(TEMAS)]
+        linhas.append({"Informativo": 1100 + i // 3, "Classe Processo": ["RE", "ADI"][i % 2],
+                       "Data Julgamento": f"{1 + i:02d}/03/2023", "Título": f"{titulo} ({i})", "Tese Julgado": None,
+                       "Resumo": f"Resumo {i} sobre {titulo.lower()}" + (" retificado" if i == alterado else ""),
+                       "Ramo Direito": ramo, "Matéria": None if i % 5 == 0 else titulo.split()[0],
+                       "Repercussão Geral": ["Sim", "Não"][i % 3 == 0], "Legislação": legislacao_citada})
+    pd.DataFrame(linhas).to_excel(caminho, index=False)
+    return caminho
+
+
+def test_construcao_paralela_igual_ao_indice_em_processo(tmp_path, monkeypatch):
+    diretorio = str(tmp_path / "snapshots")
+    ingestao.importar(_planilha(tmp_path / "base.xlsx"), diretorio)
+    # Um alterado: a versão tem um segmento com uma linha removida
+    manifesto = ingestao.anexar(_planilha(tmp_path / "novo.xlsx", alterado=4), diretorio)
+    caminho_versao = os.path.join(diretorio, manifesto["versao"])
+    monkeypatch.setattr(indices, "MIN_LINHAS_PARTE", 1)  # várias partes mesmo com poucas linhas
+
+    manifesto_indices = indices.construir_indices(caminho_versao, processos=2, diretorio=diretorio)
+    assert manifesto_indices["partes"] > 2
+
+    df = ingestao.ler_snapshot(caminho_versao).assign(
+        **{busca.CAMPO_MATERIA: lambda d: d[busca.CAMPO_MATERIA].fillna(busca.MATERIA_PADRAO)})
+    pronto = indices.carregar_indice_busca(caminho_versao, df)
+    direto = busca.IndiceBusca(df)
+    assert pronto.vocabulario == direto.vocabulario
+    for consulta in ("retificado", '"imunidade tributaria"', "ramo:tributario -classe:adi", "materia:especificada",
+                     "repercussao:sim", "informativo:1101..1102 custodia"):
+        assert np.array_equal(pronto.buscar(consulta), direto.buscar(consulta)), consulta
+
+    citacoes = indices.carregar_indice_citacoes(caminho_versao, len(df))
+    citacoes_direto = legislacao.IndiceCitacoes.construir(df["Legislação"])
+    for consulta in ("CF art. 150", "CF art. 40", "CPP art. 312", "Lei 9.718/1998"):
+        assert np.array_equal(citacoes.consultar(consulta)[1], citacoes_direto.consultar(consulta)[1]), consulta
@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import busca
+import indices
+import ingestao
+
+
+def _planilha(caminho, titulos, classe="RE"):
+    pd.DataFrame([{"Informativo": 1100, "Classe Processo": classe, "Data Julgamento": "01/03/2023", "Título": titulo,
+                   "Tese Julgado": None, "Resumo": f"Resumo {i}", "Ramo Direito": "Direito Tributário",
+                   "Matéria": None, "Repercussão Geral": "Sim"}
+                  for i, titulo in enumerate(titulos)]).to_excel(caminho, index=False)
+    return caminho
+
+
+def test_titulo_corrigido_e_alteracao_e_indices_da_versao_vem_mesclados(tmp_path):
+    diretorio = str(tmp_path / "snapshots")
+    ingestao.importar(_planilha(tmp_path / "base.xlsx", ["Imunidade recíproca", "ICMS na base"]), diretorio)
+    manifesto = ingestao.anexar(_planilha(tmp_path / "novo.xlsx", ["Imunidade recíproca", "ICMS fora da base"]),
+                                diretorio)
+    assert (manifesto["operacao"]["novos"], manifesto["operacao"]["alterados"], manifesto["linhas"]) == (0, 1, 2)
+
+    caminho_versao = os.path.join(diretorio, manifesto["versao"])
+    df = ingestao.ler_snapshot(caminho_versao).assign(**{busca.CAMPO_MATERIA: busca.MATERIA_PADRAO})
+    mesclado = indices.carregar_indice_busca(caminho_versao, df)
+    direto = busca.IndiceBusca(df)
+    assert mesclado is not None and mesclado.vocabulario == direto.vocabulario
+    for consulta in ("fora", "base", "materia:especificada", "ramo:tributario"):
+        assert np.array_equal(mesclado.buscar(consulta), direto.buscar(consulta))
+
+
+def test_anexo_com_parte_de_uma_edicao_e_rejeitado(tmp_path):
+    diretorio = str(tmp_path / "snapshots")
+    titulos = ["Vaquejada", "Piso salarial", "Lei dos Caminhoneiros"]
+    manifesto = ingestao.importar(_planilha(tmp_path / "base.xlsx", titulos, "ADI"), diretorio)
+    # Só a terceira ADI, com o resumo corrigido: como ADI #1 ela substituiria a decisão errada
+    with pytest.raises(ingestao.ErroEsquema, match="1 na planilha, 3 no snapshot"):
+        ingestao.anexar(_planilha(tmp_path / "parcial.xlsx", titulos[2:], "ADI"), diretorio)
+    assert ingestao.versao_atual(diretorio) == manifesto["versao"]
+    assert ingestao.ler_snapshot(os.path.join(diretorio, manifesto["versao"]))["Título"].tolist() == titulos
@@ -0,0 +1,43 @@
+import legislacao
+
+
+def test_intervalo_de_incisos():
+    chaves = legislacao.extrair_citacoes("CF/1988, art. 5º, incisos I a IV")
+    assert [c for c in chaves if ":inc" in c] == [f"cf88:art5:inc{n}" for n in (1, 2, 3, 4)]
+
+
+def test_intervalo_com_ate():
+    chaves = legislacao.extrair_citacoes("Lei 12.527/2011, art. 3º, I até III")
+    assert "lei:12527/2011:art3:inc2" in chaves
+
+
+def test_intervalo_de_artigos_e_paragrafos():
+    chaves = legislacao.extrair_citacoes("Lei 8.906/1994, arts. 18 a 21; CF/1988: art. 127, §§ 3º a 6º")
+    assert {f"lei:8906/1994:art{n}" for n in range(18, 22)} <= set(chaves)
+    assert {f"cf88:art127:par{n}" for n in range(3, 7)} <= set(chaves)
+
+
+def test_intervalo_longo_guarda_so_os_extremos():
+    chaves = legislacao.extrair_citacoes("Lei 8.112/1990, arts. 1 a 200")
+    assert [c for c in chaves if ":art" in c] == ["lei:8112/1990:art1", "lei:8112/1990:art200"]
+
+
+def test_artigos_antes_do_diploma():
+    chaves = legislacao.extrair_citacoes("CF/1988, art. 5º; arts. 1º e 2º da Lei 8.112/1990")
+    assert chaves == ["cf88", "cf88:art5", "lei:8112/1990", "lei:8112/1990:art1", "lei:8112/1990:art2"]
+
+
+def test_artigo_antes_do_primeiro_diploma():
+    chaves = legislacao.extrair_citacoes("Art. 6º, III, “d”, da Lei 2.778/1989, do Estado do Sergipe.")
+    assert "lei:2778/1989:art6:inc3" in chaves
+
+
+def test_ano_por_extenso():
+    assert legislacao.extrair_citacoes("Lei nº 8.112, de 1990, art. 3º") == ["lei:8112/1990", "lei:8112/1990:art3"]
+    assert legislacao.extrair_citacoes("Lei nº 11.284, de 2 de março de 2006, art. 39")[:2] == [
+        "lei:11284/2006", "lei:11284/2006:art39"]
+
+
+def test_consulta_com_intervalo():
+    assert legislacao.interpretar_consulta("CF art. 5º, I a III") == [
+        "cf88:art5:inc1", "cf88:art5:inc2", "cf88:art5:inc3"]
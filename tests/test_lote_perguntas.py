@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+import types
+
+import pandas as pd
+
+import busca
+import cliente_openai
+import lote_perguntas
+import perguntas
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importar_nao_executa_o_app():
+    # Importar app.py executaria set_page_config e a página inteira do Streamlit
+    codigo = "import sys, lote_perguntas; print('app' in sys.modules)"
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    assert saida.stdout.strip() == "False"
+
+
+def _df():
+    linhas = [
+        {"Título": "Imunidade tributária recíproca", "Resumo": "Empresa pública", "ID Canônico": 0},
+        {"Título": "Imunidade recíproca", "Resumo": "Repetida em outro informativo", "ID Canônico": 0},
+        {"Título": "ICMS na base do PIS", "Resumo": "Exclusão do ICMS", "ID Canônico": 2},
+        {"Título": "Prisão preventiva", "Resumo": "Imunidade parlamentar", "ID Canônico": 3},
+        {"Título": "Servidor público", "Resumo": "Aposentadoria especial", "ID Canônico": 4},
+    ]
+    return pd.DataFrame([{**{campo: None for campo in busca.CAMPOS_TEXTO}, "Matéria": "Tributário",
+                          "Ramo Direito": "Direito Tributário", "Classe Processo": "RE", "Repercussão Geral": "Sim",
+                          "Data Julgamento": "01/03/2023", "Informativo": 1100 + i, "Tese Julgado": None, **linha}
+                         for i, linha in enumerate(linhas)])
+
+
+def test_recuperar_em_lote_igual_a_uma_pergunta_por_vez(monkeypatch):
+    df = _df()
+    indice = busca.IndiceBusca(df)
+    lista = ["Imunidade recíproca de empresa pública?", "ICMS ICMS", "o que é?", "", "tributario aposentadoria",
+             "imunidade parlamentar na prisao"]
+    esperado = [[r.name for r in perguntas.encontrar_registros_relevantes(p, df, indice, 2)] for p in lista]
+    assert esperado[0] == [0, 3]  # a repetida (mesmo ID Canônico) não volta
+    for limite in (lote_perguntas.LIMITE_ENTRADAS, 1):
+        monkeypatch.setattr(lote_perguntas, "LIMITE_ENTRADAS", limite)
+        lote = lote_perguntas.recuperar_em_lote(lista, df, indice, 2)
+        assert [[r.name for r in registros] for registros in lote] == esperado
+
+
+def test_retomada_pula_respondidas_refaz_erros_e_usa_o_cache(tmp_path, monkeypatch):
+    _df().to_parquet(tmp_path / "dados.parquet")
+    (tmp_path / "perguntas.txt").write_text("Imunidade recíproca?\nICMS na base do PIS?\nServidor público?\n",
+                                            encoding="utf-8")
+    monkeypatch.setenv("OPENAI_API_KEY", "chave-mock")
+    chamadas = []
+    falhar = {"ICMS"}
+
+    async def completion(cliente, detalhes=None, **parametros):
+        pergunta = parametros["messages"][-1]["content"].split("PERGUNTA DO USUÁRIO:\n")[1].split("\n")[0]
+        chamadas.append(pergunta)
+        if any(termo in pergunta for termo in falhar):
+            raise RuntimeError("falha simulada")
+        mensagem = types.SimpleNamespace(content=f"Resposta: {pergunta}")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=mensagem, finish_reason="stop")],
+                                     usage=None)
+
+    monkeypatch.setattr(cliente_openai, "criar_chat_completion_async", completion)
+    saida, cache = str(tmp_path / "respostas.jsonl"), str(tmp_path / "cache.jsonl")
+    argv = ["perguntas.txt", "--saida", saida, "--cache", cache, "--dados", str(tmp_path / "dados.parquet"),
+            "--rpm", "0"]
+    monkeypatch.chdir(tmp_path)
+
+    lote_perguntas.main(argv)
+    assert len(chamadas) == 3
+    assert lote_perguntas.respondidas(saida) == {"1", "3"}
+
+    # Retomada: só a pergunta com erro volta à API
+    falhar.clear()
+    lote_perguntas.main(argv)
+    assert chamadas[3:] == ["ICMS na base do PIS?"]
+    assert lote_perguntas.respondidas(saida) == {"1", "2", "3"}
+
+    # Recomeçando, as respostas vêm do cache persistente
+    lote_perguntas.main(argv + ["--recomecar"])
+    assert len(chamadas) == 4
+    with open(saida, encoding="utf-8") as f:
+        assert sorted(json.loads(linha)["fonte"] for linha in f) == ["cache"] * 3
+    cache_relido = lote_perguntas.CacheRespostas(cache)
+    cache_relido.fechar()
+    assert len(cache_relido.respostas) == 3
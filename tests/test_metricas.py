@@ -0,0 +1,24 @@
+import os
+import threading
+
+import metricas
+
+
+def test_exportar_prom_de_varias_threads_ao_mesmo_tempo(tmp_path):
+    caminho = str(tmp_path / "metricas.prom")
+    erros = []
+
+    def exportar():
+        for _ in range(100):
+            try:
+                metricas.exportar(caminho)
+            except OSError as e:
+                erros.append(e)
+
+    threads = [threading.Thread(target=exportar) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert erros == []
+    assert os.listdir(tmp_path) == ["metricas.prom"]  # nenhum temporário esquecido
@@ -0,0 +1,24 @@
+import resumos
+
+PARAGRAFO = (
+    "O ingresso forçado em domicílio sem mandado judicial só é lícito quando amparado em fundadas razões, "
+    "devidamente justificadas a posteriori (Art. 5º, Inc. XI, da CF). A Corte reafirmou a tese fixada no Tema 280 "
+    "da repercussão geral. Nos termos dos Arts. 157 e 564 do CPP, as provas assim obtidas são nulas."
+)
+
+
+def test_sentencas_nao_quebram_em_abreviacoes_com_maiuscula():
+    assert resumos.sentencas(PARAGRAFO) == [
+        "O ingresso forçado em domicílio sem mandado judicial só é lícito quando amparado em fundadas razões, "
+        "devidamente justificadas a posteriori (Art. 5º, Inc. XI, da CF).",
+        "A Corte reafirmou a tese fixada no Tema 280 da repercussão geral.",
+        "Nos termos dos Arts. 157 e 564 do CPP, as provas assim obtidas são nulas.",
+    ]
+
+
+def test_resumo_descarta_fragmentos_de_uma_palavra():
+    texto = "\n".join([PARAGRAFO, "(...)", "I.", PARAGRAFO.replace("Tema 280", "Tema 1.238")] * 2)
+    resumo = resumos.resumir(texto, 400)
+    assert "(...)" not in resumo
+    assert "I." not in resumos.sentencas(resumo)
+    assert "Art. 5º, Inc. XI, da CF" in resumo
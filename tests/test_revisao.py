@@ -0,0 +1,23 @@
+import random
+
+import revisao
+
+
+def test_assertiva_sorteada_volta_ao_sorteio_depois_do_intervalo():
+    inicio = 1_000_000.0
+    amostrador = revisao.Amostrador(["a"], [0], [1], [None], agora=inicio)
+    gerador = random.Random(0)
+    assert amostrador.sortear(1, gerador, agora=inicio) == ["a"]
+    # Recém-vista: peso zero até a próxima atualização
+    assert amostrador.sortear(1, gerador, agora=inicio + 1) == []
+    assert amostrador.sortear(1, gerador, agora=inicio + 2 * revisao.INTERVALO_BASE_S) == ["a"]
+
+
+def test_atualizacao_dos_pesos_e_limitada_por_sorteio():
+    inicio = 1_000_000.0
+    total = 3 * revisao.LIMITE_REPESAGEM
+    amostrador = revisao.Amostrador([str(i) for i in range(total)], [0] * total, [1] * total,
+                                    [inicio] * total, agora=inicio)
+    assert amostrador.arvore.total() == 0
+    amostrador.atualizar_pesos(agora=inicio + revisao.INTERVALO_BASE_S)
+    assert sum(peso > 0 for peso in amostrador.arvore.pesos) == revisao.LIMITE_REPESAGEM
@@ -0,0 +1,29 @@
+import time
+
+import roteamento
+import telemetria
+
+
+def _registrar(modelo, latencia_s, erro=None):
+    telemetria.registrar({"endpoint": "pergunta", "modelo": modelo, "nivel_contexto": 0, "latencia_s": latencia_s,
+                          "tentativas": 1, "tokens_prompt": 100, "tokens_completion": 50, "truncada": False,
+                          "motivo_fallback": telemetria.ERRO_API if erro else None, "erro": erro, "ts": time.time()})
+
+
+def test_fim_da_quarentena_nao_quebra_o_ajuste_do_nivel(monkeypatch):
+    telemetria.limpar()
+    roteador = roteamento.Roteador()
+    modelo = roteamento.POLITICAS["pergunta"].modelos[0]
+    for _ in range(5):
+        _registrar(modelo, 0.5)
+    for _ in range(10):
+        _registrar(modelo, 0.5, erro="APIError")
+    assert roteador.rota("pergunta").modelo != modelo
+
+    # Fim da quarentena: a janela do modelo é reiniciada (sem latências para o p95)
+    agora = time.time() + roteamento.QUARENTENA_S + 1
+    monkeypatch.setattr(roteamento.time, "time", lambda: agora)
+    rota = roteador.rota("pergunta")
+    assert rota.modelo == modelo
+    assert rota.nivel_contexto == 0
+    telemetria.limpar()